@@ -2,26 +2,42 @@
 import tkinter
 import tkinter.messagebox
 import customtkinter as ctk
-import clipboard
 import threading
 import sys
 import os
 
 # Import core components
 import config_manager
+from history_store import HistoryStore
+from history_archive import HistoryArchive, archive_rows
 from clipboard_handler import ClipboardHandler
-
-# Imports for system tray functionality
-from pystray import MenuItem as item
-import pystray
-from PIL import Image
+from clipboard_backends import SystemClipboardBackend
+from search_index import HistorySearchIndex
+from near_duplicates import NearDuplicateIndex
+from search_worker import SearchWorker, SearchJob, ResultStreamJob
+from global_search import collect_rows, rank_rows, rank_batches, merge_ranked
+from query_planner import parse_query, build_matcher
+from virtual_list import VirtualHistoryList
+from chunked_renderer import ChunkedRenderer
+from startup_profile import StartupProfiler
+from loop_watchdog import EventLoopWatchdog
+from metrics import registry as metrics, MetricsFileWriter
+from transforms import TransformRunner, finish_transform
+
+# pystray, PIL and clipboard (via SystemClipboardBackend) are imported where they are first used,
+# after the window has painted, so they do not delay the first frame. So are the modules only needed
+# for the diagnostics window, profiling, the scripting API and attaching to a daemon.
 
 # Configuration constants
-HISTORY_LIMIT_PER_CATEGORY = 50
 TRAY_ICON_PATH = "icon.png"
 WINDOW_ICON_PATH = "my_icon.ico"
 HIGHLIGHT_BORDER_WIDTH = 2
 HIGHLIGHT_BORDER_COLOR = "yellow"
+DRAG_MOTION_INTERVAL_MS = 16 # Drag hit-testing runs at most once per display frame (~60 Hz)
+SEARCH_DEBOUNCE_MS = 250 # Delay after the last keystroke before a search starts
+GLOBAL_SEARCH_KEY = "__global__" # Search worker and renderer key for the all-categories search
+RULES_RENDER_KEY = "__rules__" # Renderer key for the rule list
+API_CALL_TIMEOUT_S = 30.0 # Longest a scripting API request waits for the Tk thread
 
 # Helper to get resource path for bundled application
 def resource_path(relative_path):
@@ -36,8 +52,31 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 class ClipboardManagerApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, startup_profiler=None, on_startup_complete=None, watchdog_enabled=False, clipboard_backend=None,
+                 daemon_client=None, api_enabled=True, selection_backends=(), socket_path=None):
         super().__init__()
+        # Clipboard used for monitoring and copying (the load harness passes a fake one)
+        self.clipboard_backend = clipboard_backend or SystemClipboardBackend()
+        # Extra selections monitored alongside it (the Linux PRIMARY selection with --primary-selection)
+        self.selection_backends = selection_backends
+        # Connected DaemonClient when attached to a running daemon (main.py --attach); the daemon
+        # then owns monitoring and storage, and this window only mirrors and edits its state
+        self.daemon_client = daemon_client
+        # A standalone window serves the scripting API itself (attached ones leave it to the daemon)
+        self.api_enabled = api_enabled and daemon_client is None
+        self.socket_path = socket_path # Where the scripting API listens (None for the default path)
+        self.api_server = None
+        self.api_changed_categories = set() # Categories edited by the API call running on the Tk thread
+        self.api_save_needed = False
+        # Startup timing (a disabled profiler unless main.py runs with --profile-startup)
+        self.startup_profiler = startup_profiler or StartupProfiler()
+        self.on_startup_complete = on_startup_complete
+        self.startup_complete = False
+        # Optional event loop lag monitor (--watchdog or the CLIPBOARD_MANAGER_WATCHDOG env var)
+        self.loop_watchdog = None
+        if watchdog_enabled:
+            self.loop_watchdog = EventLoopWatchdog(self)
+            self.loop_watchdog.start()
 
         self.title("Clipboard Category Manager")
         self.geometry("850x650")
@@ -50,49 +89,152 @@ class ClipboardManagerApp(ctk.CTk):
             print(f"Warning: Could not set window icon '{WINDOW_ICON_PATH}': {e}")
 
         # --- Application Data ---
-        # Load configuration (categories, rules, history)
-        self.categories = config_manager.load_config()
+        # Load configuration (categories, rules, history), from the daemon when attached
+        if self.daemon_client:
+            # Subscribed together with the snapshot; changes made before the window is ready are
+            # queued and applied once it is, so none is lost in between
+            self.pending_daemon_events = []
+            self.pending_daemon_events_lock = threading.Lock()
+            self.categories = self.daemon_client.attach(
+                self._queue_daemon_event,
+                on_disconnect=lambda: self._queue_daemon_event({"event": "closed"})
+            )
+        else:
+            self.categories = config_manager.load_config()
+        self.startup_profiler.mark("load config")
+        # Trigram index used to narrow history searches
+        self.search_index = HistorySearchIndex()
+        self.search_index.rebuild(self.categories)
+        # Items trimmed from the history are archived on disk and stay searchable (the daemon
+        # writes the archive when attached, so this window only reads it)
+        self.history_archive = HistoryArchive(read_only=self.daemon_client is not None)
+        # All history edits go through the store, which keeps the index and copy times in step
+        # (and, when attached, forwards them to the daemon)
+        # Optional learned category for clips no rule matches (trained after startup, off the Tk thread)
+        self.fallback_classifier = None
+        if self.categories.get("Uncategorized", {}).get("fallback_classifier") and not self.daemon_client:
+            import fallback_classifier # Loads NumPy, so only imported when the config asks for it
+            if fallback_classifier.is_enabled(self.categories):
+                self.fallback_classifier = fallback_classifier.FallbackClassifier()
+        # Categories with "collapse_near_duplicates" are fingerprinted off the Tk thread after startup
+        # (when attached, the daemon decides what collapses)
+        self.near_duplicate_index = NearDuplicateIndex()
+        if self.daemon_client:
+            from ipc_client import RemoteHistoryStore
+            self.history_store = RemoteHistoryStore(self.categories, self.search_index, self.daemon_client)
+        else:
+            self.history_store = HistoryStore(self.categories, self.search_index, archive=self.history_archive,
+                                              near_duplicates=self.near_duplicate_index)
+        self.startup_profiler.mark("build search index")
         # Dictionary to hold references to UI elements for each category (e.g., scroll frames)
         self.ui_elements = {}
         # Dictionary to hold search queries for each category
         self.search_queries = {}
+        # Off-thread search state: worker, pending debounce timers and streamed result rows
+        self.search_worker = SearchWorker()
+        self.search_after_ids = {} # {category: after id of the debounced search}
+        self.search_render_state = {} # {category: SearchJob currently streaming into the list}
+        self.shown_archived_items = {} # {category: set(items)} archived rows of the latest search
+        self.global_search_query = ""
+        # Builds long widget lists (global results, rules) in time slices
+        self.renderer = ChunkedRenderer(self)
+        self.current_tab = None # Category whose tab was last shown
         # Drag and drop state
         self.drag_data = None
         self.drag_window = None
         self.previously_highlighted_category = None # Track highlighted tab
+        self.drop_targets = {} # {widget path: category} for tab frames, history lists and tab buttons
+        self.drag_pointer = None # Latest (x_root, y_root) seen during a drag
+        self.drag_motion_after_id = None # Pending throttled motion update
         self.selected_items = {} # Track selected items {category: set(items)}
+        self.dirty_categories = set() # Categories whose (hidden or unbuilt) tab needs a re-render
+        self.metrics_writer = MetricsFileWriter(metrics) # Periodically writes clipboard_metrics.json
+        self.diagnostics_window = None
+        self.allocation_tracker = None # On-demand tracemalloc snapshots, created on first use
+        self.profiling_session = None # Active runtime ProfilingSession, if any
+        # Per-category transforms run on a thread pool; finished clips are stored in arrival order
+        self.transform_runner = TransformRunner(self.categories, on_ready=lambda: self.after(0, self._store_transformed))
 
         # --- UI Setup ---
         self.selected_category_var = ctk.StringVar(value="")
         self._build_ui()
 
-        # Initialize UI state based on loaded data
+        # Only the tab shells are created here; contents are built once the window is up
         self.update_category_tabs()
         self.update_category_dropdown()
-        self.update_all_history_displays()
+        self.startup_profiler.mark("build window")
+
+        # Subsystems started after the first paint (see _deferred_startup)
+        self.clipboard_handler = None
+        self.tray_icon = None
+        self.help_overlay_frame = None
+        self.status_label.configure(text="Status: Starting...")
+
+        # --- Window Protocol ---
+        # Change window close behavior to hide instead of quit
+        self.protocol("WM_DELETE_WINDOW", self.hide_window_to_tray)
+
+        # after_idle runs once the initial geometry and drawing is done; the nested after(0)
+        # lets the first frame reach the screen before the deferred work starts
+        self.after_idle(lambda: self.after(0, self._deferred_startup))
+
+    def _deferred_startup(self):
+        """Renders history and starts clipboard monitoring and the tray icon after the first paint."""
+        self.startup_profiler.mark("first paint")
+
+        # Initialize UI state based on loaded data
+        self._on_tab_selected() # Only the visible tab is built and rendered
         self._select_initial_category()
+        self.startup_profiler.mark("render visible tab")
 
         # Create help overlay frame (initially hidden)
         self.create_help_overlay()
+        self.startup_profiler.mark("create help overlay")
 
         # --- Clipboard Monitoring ---
-        # Initialize and start the clipboard monitoring thread
-        self.clipboard_handler = ClipboardHandler(
-            categories_ref=self.categories,
-            process_callback=self._schedule_process_clipboard # Callback to process in main thread
-        )
-        self.clipboard_handler.start_monitoring()
-        self.status_label.configure(text="Status: Monitoring Clipboard")
+        if self.daemon_client:
+            # The daemon monitors the clipboard; its change events are applied on the Tk thread
+            self.status_label.configure(text="Status: Attached to Clipboard Daemon")
+            with self.pending_daemon_events_lock:
+                pending, self.pending_daemon_events = self.pending_daemon_events, None
+            for event in pending:
+                self._on_daemon_event(event)
+        else:
+            # Initialize and start the clipboard monitoring thread
+            self.clipboard_handler = ClipboardHandler(
+                categories_ref=self.categories,
+                process_callback=self._schedule_process_clipboard, # Callback to process in main thread
+                backend=self.clipboard_backend,
+                echo_callback=lambda text, context: self.after(0, self._on_clipboard_echo, context),
+                selection_backends=self.selection_backends
+            )
+            self.clipboard_handler.start_monitoring()
+            self.status_label.configure(text="Status: Monitoring Clipboard")
+            self.history_store.prepare_near_duplicates()
+            if self.fallback_classifier:
+                from fallback_classifier import history_examples
+                threading.Thread(target=self.fallback_classifier.train, args=(history_examples(self.categories),),
+                                 daemon=True).start()
+            if self.api_enabled:
+                self._start_api_server()
+        self.metrics_writer.start()
+        self.startup_profiler.mark("start clipboard monitor")
 
         # --- System Tray Setup ---
-        self.tray_icon = None
         self.setup_tray_icon()
         # Run the tray icon loop in a separate thread to avoid blocking the main UI
         threading.Thread(target=self.run_tray_icon, daemon=True).start()
+        self.startup_profiler.mark("start tray icon")
 
-        # --- Window Protocol ---
-        # Change window close behavior to hide instead of quit
-        self.protocol("WM_DELETE_WINDOW", self.hide_window_to_tray)
+        # Profiling requested through the environment covers the first N seconds of the run
+        from runtime_profiler import duration_from_env
+        profile_duration = duration_from_env()
+        if profile_duration:
+            self.toggle_profiling(profile_duration)
+
+        self.startup_complete = True
+        if self.on_startup_complete:
+            self.on_startup_complete(self)
 
     def _build_ui(self):
         """Configures the main window layout and creates UI widgets."""
@@ -105,7 +247,7 @@ class ClipboardManagerApp(ctk.CTk):
         self.left_frame.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
         self.left_frame.grid_columnconfigure(0, weight=1)
         self.left_frame.grid_columnconfigure(1, weight=0)
-        self.left_frame.grid_rowconfigure(10, weight=1) # Push status label down
+        self.left_frame.grid_rowconfigure(11, weight=1) # Push status label down
 
         ctk.CTkLabel(self.left_frame, text="Manage Categories", font=ctk.CTkFont(size=16, weight="bold")).grid(row=0, column=0, padx=(20,5), pady=(20, 10), sticky="w")
         ctk.CTkButton(self.left_frame, text="?", width=25, command=self.show_help_overlay).grid(row=0, column=1, padx=(5, 20), pady=(20, 10), sticky="e")
@@ -134,22 +276,40 @@ class ClipboardManagerApp(ctk.CTk):
         self.rule_display_frame.grid(row=8, column=0, columnspan=2, padx=20, pady=10, sticky="nsew")
         self.rule_display_frame.grid_columnconfigure(0, weight=1)
 
+        # Per-category option: replace near duplicates of new items instead of keeping both
+        self.collapse_near_duplicates_var = ctk.StringVar(value="off")
+        self.collapse_near_duplicates_checkbox = ctk.CTkCheckBox(
+            self.left_frame, text="Collapse near-duplicates", variable=self.collapse_near_duplicates_var,
+            onvalue="on", offvalue="off", command=self.toggle_collapse_near_duplicates)
+        self.collapse_near_duplicates_checkbox.grid(row=9, column=0, columnspan=2, padx=20, pady=(0, 5), sticky="w")
+
         # Save Button
-        ctk.CTkButton(self.left_frame, text="Save Config", command=self.trigger_save_config).grid(row=9, column=0, columnspan=2, padx=20, pady=(20, 10))
+        ctk.CTkButton(self.left_frame, text="Save Config", command=self.trigger_save_config).grid(row=10, column=0, padx=(20, 5), pady=(20, 10), sticky="ew")
+        ctk.CTkButton(self.left_frame, text="Stats", width=60, command=self.show_diagnostics).grid(row=10, column=1, padx=(5, 20), pady=(20, 10), sticky="e")
 
         # Status Label
         self.status_label = ctk.CTkLabel(self.left_frame, text="Status: Initializing...", anchor="w")
-        self.status_label.grid(row=11, column=0, columnspan=2, padx=20, pady=(10, 10), sticky="sew")
+        self.status_label.grid(row=12, column=0, columnspan=2, padx=20, pady=(10, 10), sticky="sew")
 
         # Right Frame (History Display)
         self.right_frame = ctk.CTkFrame(self, corner_radius=10)
         self.right_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
-        self.right_frame.grid_rowconfigure(0, weight=1)
+        self.right_frame.grid_rowconfigure(0, weight=0) # Global search row
+        self.right_frame.grid_rowconfigure(1, weight=1)
         self.right_frame.grid_columnconfigure(0, weight=1)
 
+        # Global search across all categories
+        self.global_search_entry = ctk.CTkEntry(self.right_frame, placeholder_text="Search all categories...")
+        self.global_search_entry.grid(row=0, column=0, padx=10, pady=(10, 0), sticky="ew")
+        self.global_search_entry.bind("<KeyRelease>", lambda event: self._global_search_callback())
+
         # Tab view for categories
-        self.tab_view = ctk.CTkTabview(self.right_frame, corner_radius=10)
-        self.tab_view.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        self.tab_view = ctk.CTkTabview(self.right_frame, corner_radius=10, command=self._on_tab_selected)
+        self.tab_view.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+
+        # Global search results (shown in place of the tab view while a global query is active)
+        self.global_results_frame = ctk.CTkScrollableFrame(self.right_frame, label_text="Results in All Categories")
+        self.global_results_frame.grid_columnconfigure(0, weight=1)
 
     def _select_initial_category(self):
         """Selects the first category in the dropdown and updates the rule display."""
@@ -199,6 +359,8 @@ How it works:
     * Use the checkboxes to select one or more items in the history list.
     * Use the action buttons below the list ('Copy Sel.', 'Delete Sel.', 'Pin Sel.', 'Unpin Sel.') to act on the selected items.
     * Alternatively, use the individual 'Pin'/'Unpin', 'Copy', or 'X' buttons on each row for single-item actions.
+    * The search boxes also accept filters: `cat:Links`, `pinned:yes`, `since:2h`, `size:>10k` and `re:/pattern/` (add `i` after the closing slash to ignore case). Filters can be combined with plain text.
+    * Use the search box above the tabs to search every category at once. Results are ranked by how well they match and how recent they are; 'Show' jumps to the item's tab.
 
 4.  Saving:
     * Click 'Save Config' (Left Panel) to manually save your categories and rules.
@@ -215,7 +377,8 @@ How it works:
     * Pinned items (marked with 📌) always appear at the top of their category's history list.
     * Use the 'Pin Sel.' button to pin selected items.
     * Use the 'Unpin Sel.' button to unpin selected items.
-    * Copying an item again (pinned or not) will move it to the top of the *regular* history list.
+    * Copying an item with its 'Copy' button moves it to the top of its history; pinned items stay where they are.
+    * Copying the same text again from another app moves it to the top of the *regular* history list, even if it was pinned.
 
 7.  Moving Items:
     * Click and drag an item to move it to another category, but only if *no items are selected* in the source category via checkbox.
@@ -231,9 +394,77 @@ Enjoy managing your clipboard!
 
     def show_help_overlay(self):
         """Displays the help overlay frame."""
+        if self.help_overlay_frame is None:
+            return # Still starting up
         self.help_overlay_frame.grid(row=0, column=0, columnspan=2, padx=20, pady=20, sticky="nsew")
         self.help_overlay_frame.tkraise()
 
+    # --- Diagnostics ---
+    def show_diagnostics(self):
+        """Opens (or raises) the diagnostics window with live metrics and memory usage."""
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.lift()
+            self.diagnostics_window.focus_force()
+            return
+        from diagnostics_view import DiagnosticsWindow
+        from memory_report import AllocationTracker
+        if self.allocation_tracker is None:
+            self.allocation_tracker = AllocationTracker()
+        self.diagnostics_window = DiagnosticsWindow(
+            self,
+            sections=[("Metrics", metrics.format_report),
+                      ("Memory", self._memory_report_text),
+                      ("Allocations", lambda: self.allocation_tracker.last_text)],
+            actions=[("Write Metrics File", lambda: metrics.write_json()),
+                     ("Allocations Snapshot", self._take_allocation_snapshot)]
+        )
+
+    def _memory_report_text(self):
+        """Builds the per-category memory report shown in the diagnostics window."""
+        from memory_report import build_memory_report, format_memory_report
+        report = build_memory_report(self.categories, self.ui_elements, self.search_index, root=self)
+        return format_memory_report(report)
+
+    def _take_allocation_snapshot(self):
+        """Takes a tracemalloc snapshot (starting tracing the first time) and shows it."""
+        self.allocation_tracker.snapshot()
+        if self.diagnostics_window is not None and self.diagnostics_window.winfo_exists():
+            self.diagnostics_window.show_section("Allocations")
+
+    # --- Runtime Profiling ---
+    def toggle_profiling(self, duration_s=None):
+        """Starts a profiling session, or stops the running one early (runs in main thread)."""
+        if self.profiling_session:
+            self.profiling_session.finish()
+            return
+        from runtime_profiler import ProfilingSession, PROFILE_DURATION_S
+        duration_s = duration_s or PROFILE_DURATION_S
+        self.profiling_session = ProfilingSession(
+            self, self.clipboard_handler, duration_s, self._profile_tags(),
+            on_done=lambda path_prefix: self.after(0, self._on_profile_written, path_prefix)
+        )
+        self.profiling_session.start()
+        self.status_label.configure(text=f"Status: Profiling for {duration_s:g} s...")
+
+    def _profile_tags(self):
+        """Describes the data size a profile was taken with."""
+        return {
+            "history_items": sum(len(cat_data.get("history", [])) for cat_data in self.categories.values()),
+            "pinned_items": sum(len(cat_data.get("pinned_history", [])) for cat_data in self.categories.values()),
+            "rules": sum(len(cat_data.get("rules", [])) for cat_data in self.categories.values()),
+            "categories": len(self.categories),
+        }
+
+    def _on_profile_written(self, path_prefix):
+        """Clears the finished session and reports where its output went."""
+        self.profiling_session = None
+        if self.tray_icon:
+            self.tray_icon.update_menu() # Refresh the Profile/Stop menu text
+        if path_prefix:
+            self.status_label.configure(text=f"Status: Profile saved to {path_prefix}-*")
+        else:
+            self.status_label.configure(text="Status: Error writing profile.")
+
     def hide_help_overlay(self):
         """Hides the help overlay frame."""
         self.help_overlay_frame.grid_forget()
@@ -241,6 +472,11 @@ Enjoy managing your clipboard!
     # --- System Tray Functions ---
     def setup_tray_icon(self):
         """Creates the pystray Icon object with menu."""
+        from pystray import MenuItem as item
+        import pystray
+        from PIL import Image
+        from runtime_profiler import PROFILE_DURATION_S
+
         icon_full_path = resource_path(TRAY_ICON_PATH)
         try:
             image = Image.open(icon_full_path)
@@ -253,6 +489,8 @@ Enjoy managing your clipboard!
 
         menu = (
             item('Show', self.show_window, default=True),
+            item(lambda menu_item: 'Stop Profiling' if self.profiling_session else f'Profile for {PROFILE_DURATION_S} s',
+                 lambda: self.after(0, self.toggle_profiling)),
             item('Exit', self.quit_application)
         )
         self.tray_icon = pystray.Icon("ClipboardManager", image, "Clipboard Manager", menu)
@@ -283,8 +521,29 @@ Enjoy managing your clipboard!
             self.clipboard_handler.stop()
             self.clipboard_handler.join() # Wait for thread to finish
 
-        # Save configuration
-        self.trigger_save_config()
+        # Stop the background search worker, the transform pool and the scripting API
+        self.search_worker.stop()
+        self.transform_runner.shutdown()
+        if self.api_server:
+            self.api_server.stop()
+
+        # End a running profiling session (its output is written in the background)
+        if self.profiling_session:
+            self.profiling_session.finish()
+
+        # Write the final metrics snapshot
+        self.metrics_writer.stop()
+
+        # Stop the event loop watchdog and print what it saw
+        if self.loop_watchdog:
+            self.loop_watchdog.stop()
+            print(self.loop_watchdog.report())
+
+        # Save configuration (an attached window leaves saving to the daemon)
+        if self.daemon_client:
+            self.daemon_client.close()
+        else:
+            self.trigger_save_config()
 
         # Stop the system tray icon loop
         if self.tray_icon:
@@ -330,28 +589,40 @@ Enjoy managing your clipboard!
         confirm = tkinter.messagebox.askyesno("Confirm Delete",
                                              f"Delete category '{cat_to_delete}' and its history?")
         if confirm:
-            if cat_to_delete in self.categories:
-                del self.categories[cat_to_delete]
-            if cat_to_delete in self.ui_elements:
-                 del self.ui_elements[cat_to_delete]
-            # Also remove the search query for the deleted category
-            if cat_to_delete in self.search_queries:
-                del self.search_queries[cat_to_delete]
-            # Also remove selection data for the deleted category
-            if cat_to_delete in self.selected_items:
-                del self.selected_items[cat_to_delete]
-            try:
-                self.tab_view.delete(cat_to_delete)
-            except ValueError:
-                 print(f"Warning: Tab '{cat_to_delete}' might have already been removed.")
-            except Exception as e:
-                 print(f"Error deleting tab '{cat_to_delete}': {e}")
-
+            self._remove_category(cat_to_delete)
             self.update_category_dropdown()
             self._select_initial_category()
+            self._on_tab_selected() # Deleting the visible tab selects another one
             self.status_label.configure(text=f"Status: Deleted category '{cat_to_delete}'.")
             self.trigger_save_config()
 
+    def _remove_category(self, cat_to_delete):
+        """Drops a category's data, tab and per-category UI state."""
+        if cat_to_delete in self.categories:
+            del self.categories[cat_to_delete]
+        self.search_index.remove_category(cat_to_delete)
+        self.near_duplicate_index.remove_category(cat_to_delete)
+        if self.fallback_classifier:
+            self.fallback_classifier.remove_category(cat_to_delete)
+        self.history_archive.remove_category(cat_to_delete)
+        if cat_to_delete in self.ui_elements:
+             del self.ui_elements[cat_to_delete]
+        self._unregister_drop_targets(cat_to_delete)
+        self.dirty_categories.discard(cat_to_delete)
+        # Also remove the search query and any running search for the deleted category
+        if cat_to_delete in self.search_queries:
+            del self.search_queries[cat_to_delete]
+        self._cancel_search(cat_to_delete)
+        # Also remove selection data for the deleted category
+        if cat_to_delete in self.selected_items:
+            del self.selected_items[cat_to_delete]
+        try:
+            self.tab_view.delete(cat_to_delete)
+        except ValueError:
+             print(f"Warning: Tab '{cat_to_delete}' might have already been removed.")
+        except Exception as e:
+             print(f"Error deleting tab '{cat_to_delete}': {e}")
+
     def update_category_dropdown(self):
         """Refreshes the list of categories in the selection dropdown."""
         category_names = list(self.categories.keys())
@@ -364,59 +635,19 @@ Enjoy managing your clipboard!
                  self.selected_category_var.set("")
 
     def update_category_tabs(self):
-        """Creates UI tabs for categories that don't have them yet."""
+        """Creates UI tabs for categories that don't have them yet.
+        Only the tab itself is created here; its contents are built the first time it is selected."""
         for cat_name in self.categories:
             if cat_name not in self.ui_elements:
                 try:
                     self.tab_view.add(cat_name)
                     tab_content = self.tab_view.tab(cat_name)
-                    tab_content.grid_columnconfigure(0, weight=1)
-                    # Configure rows: 0 for search, 1 for history frame, 2 for action buttons
-                    tab_content.grid_rowconfigure(0, weight=0) # Search entry row
-                    tab_content.grid_rowconfigure(1, weight=1) # History frame row
-                    tab_content.grid_rowconfigure(2, weight=0) # Action buttons row
-
-                    # Search Entry
-                    search_entry = ctk.CTkEntry(tab_content, placeholder_text=f"Search in {cat_name} history...")
-                    search_entry.grid(row=0, column=0, padx=5, pady=(5, 0), sticky="ew")
-                    # Trigger search on key release
-                    search_entry.bind("<KeyRelease>", lambda event, c=cat_name: self._filter_history_callback(c))
-
-                    # History Scroll Frame
-                    scroll_frame = ctk.CTkScrollableFrame(tab_content, label_text=f"{cat_name} History")
-                    scroll_frame.grid(row=1, column=0, padx=5, pady=5, sticky="nsew") # Changed row to 1
-                    scroll_frame.grid_columnconfigure(0, weight=1)
-
-                    # Action Buttons Frame
-                    action_button_frame = ctk.CTkFrame(tab_content, fg_color="transparent")
-                    action_button_frame.grid(row=2, column=0, padx=5, pady=(0, 5), sticky="ew")
-                    # Configure columns to space out buttons
-                    action_button_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
-
-                    # Action Buttons (Initially disabled)
-                    copy_selected_btn = ctk.CTkButton(action_button_frame, text="Copy Sel.", state="disabled", command=lambda c=cat_name: self._copy_selected(c))
-                    copy_selected_btn.grid(row=0, column=0, padx=2, pady=2, sticky="ew")
-
-                    delete_selected_btn = ctk.CTkButton(action_button_frame, text="Delete Sel.", state="disabled", fg_color="red", hover_color="darkred", command=lambda c=cat_name: self._delete_selected(c))
-                    delete_selected_btn.grid(row=0, column=1, padx=2, pady=2, sticky="ew")
-
-                    pin_selected_btn = ctk.CTkButton(action_button_frame, text="Pin Sel.", state="disabled", command=lambda c=cat_name: self._pin_selected(c))
-                    pin_selected_btn.grid(row=0, column=2, padx=2, pady=2, sticky="ew")
-
-                    unpin_selected_btn = ctk.CTkButton(action_button_frame, text="Unpin Sel.", state="disabled", command=lambda c=cat_name: self._unpin_selected(c))
-                    unpin_selected_btn.grid(row=0, column=3, padx=2, pady=2, sticky="ew")
 
                     # Store references to the UI elements for this category
                     self.ui_elements[cat_name] = {
                         "tab": tab_content,
-                        "scroll_frame": scroll_frame,
-                        "search_entry": search_entry,
                         "tab_button": None, # Placeholder for the actual tab button
-                        # Action buttons
-                        "copy_selected_button": copy_selected_btn,
-                        "delete_selected_button": delete_selected_btn,
-                        "pin_selected_button": pin_selected_btn,
-                        "unpin_selected_button": unpin_selected_btn
+                        "built": False # Search entry, history list and action buttons not created yet
                     }
                     # Attempt to find and store the corresponding tab button widget
                     # NOTE: This relies on internal CTkTabview structure (_segmented_button)
@@ -433,15 +664,19 @@ Enjoy managing your clipboard!
                     except Exception as e_btn:
                         print(f"Warning: Could not find/store tab button for {cat_name}: {e_btn}")
 
-                    self.update_history_display(cat_name) # Initial population
+                    self._register_drop_target(tab_content, cat_name)
+                    self._register_drop_target(self.ui_elements[cat_name]["tab_button"], cat_name)
+
+                    # Contents are built lazily; mark dirty so the first visit renders the history
+                    self.dirty_categories.add(cat_name)
                 except ValueError:
                      print(f"Tab '{cat_name}' might already exist unexpectedly.")
                      # Attempt to re-link existing UI elements if they weren't properly removed
                      try:
                           tab_widget = self.tab_view.tab(cat_name)
-                          scroll_frame_widget = tab_widget.winfo_children()[0]
-                          if isinstance(scroll_frame_widget, ctk.CTkScrollableFrame):
-                              self.ui_elements[cat_name] = {"tab": tab_widget, "scroll_frame": scroll_frame_widget}
+                          history_list_widget = next((w for w in tab_widget.winfo_children() if isinstance(w, VirtualHistoryList)), None)
+                          if history_list_widget:
+                              self.ui_elements[cat_name] = {"tab": tab_widget, "history_list": history_list_widget, "built": True}
                               print(f"Re-linked existing UI for tab: {cat_name}")
                           else: print(f"Could not re-link UI for tab: {cat_name}")
                      except Exception: print(f"Failed to re-link UI for tab: {cat_name}")
@@ -449,6 +684,87 @@ Enjoy managing your clipboard!
                 except Exception as e:
                      print(f"Error creating UI for tab '{cat_name}': {e}")
 
+    def _build_tab_contents(self, cat_name):
+        """Creates the search entry, history list and action buttons of a category's tab."""
+        elements = self.ui_elements.get(cat_name)
+        if not elements or elements.get("built"):
+            return
+        tab_content = elements["tab"]
+        tab_content.grid_columnconfigure(0, weight=1)
+        # Configure rows: 0 for search, 1 for history frame, 2 for action buttons
+        tab_content.grid_rowconfigure(0, weight=0) # Search entry row
+        tab_content.grid_rowconfigure(1, weight=1) # History frame row
+        tab_content.grid_rowconfigure(2, weight=0) # Action buttons row
+
+        # Search Entry
+        search_entry = ctk.CTkEntry(tab_content, placeholder_text=f"Search in {cat_name} history...")
+        search_entry.grid(row=0, column=0, padx=5, pady=(5, 0), sticky="ew")
+        # Trigger search on key release
+        search_entry.bind("<KeyRelease>", lambda event, c=cat_name: self._filter_history_callback(c))
+
+        # History List (virtualized: only visible rows get widgets)
+        history_list = VirtualHistoryList(
+            tab_content, label_text=f"{cat_name} History",
+            is_selected=lambda item, c=cat_name: item in self.selected_items.get(c, set()),
+            on_toggle=lambda item, c=cat_name: self._toggle_item_selection(c, item),
+            on_pin=lambda item, c=cat_name: self.pin_item(c, item),
+            on_unpin=lambda item, c=cat_name: self.unpin_item(c, item),
+            on_copy=lambda item, c=cat_name: self.copy_item_to_clipboard(item, c),
+            on_delete=lambda item, c=cat_name: self.delete_history_item(c, item),
+            on_drag_start=lambda event, item, frame, c=cat_name: self._on_drag_start(event, c, item, frame),
+            on_drag_motion=self._on_drag_motion,
+            on_drag_drop=self._on_drag_drop,
+            version_count=lambda item, c=cat_name: self.history_store.version_count(c, item)
+        )
+        history_list.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+        self._register_drop_target(history_list, cat_name)
+
+        # Action Buttons Frame
+        action_button_frame = ctk.CTkFrame(tab_content, fg_color="transparent")
+        action_button_frame.grid(row=2, column=0, padx=5, pady=(0, 5), sticky="ew")
+        # Configure columns to space out buttons
+        action_button_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
+
+        # Action Buttons (Initially disabled)
+        copy_selected_btn = ctk.CTkButton(action_button_frame, text="Copy Sel.", state="disabled", command=lambda c=cat_name: self._copy_selected(c))
+        copy_selected_btn.grid(row=0, column=0, padx=2, pady=2, sticky="ew")
+
+        delete_selected_btn = ctk.CTkButton(action_button_frame, text="Delete Sel.", state="disabled", fg_color="red", hover_color="darkred", command=lambda c=cat_name: self._delete_selected(c))
+        delete_selected_btn.grid(row=0, column=1, padx=2, pady=2, sticky="ew")
+
+        pin_selected_btn = ctk.CTkButton(action_button_frame, text="Pin Sel.", state="disabled", command=lambda c=cat_name: self._pin_selected(c))
+        pin_selected_btn.grid(row=0, column=2, padx=2, pady=2, sticky="ew")
+
+        unpin_selected_btn = ctk.CTkButton(action_button_frame, text="Unpin Sel.", state="disabled", command=lambda c=cat_name: self._unpin_selected(c))
+        unpin_selected_btn.grid(row=0, column=3, padx=2, pady=2, sticky="ew")
+
+        elements.update({
+            "history_list": history_list,
+            "search_entry": search_entry,
+            # Action buttons
+            "copy_selected_button": copy_selected_btn,
+            "delete_selected_button": delete_selected_btn,
+            "pin_selected_button": pin_selected_btn,
+            "unpin_selected_button": unpin_selected_btn,
+            "built": True
+        })
+        self._update_action_buttons_state(cat_name)
+
+    def _on_tab_selected(self):
+        """Builds the newly selected tab on first visit and renders it if clips arrived while hidden."""
+        cat_name = self.tab_view.get()
+        if cat_name not in self.ui_elements:
+            return
+        # Stop building rows for the tab being left; they are resumed when it is shown again
+        previous_list = self.ui_elements.get(self.current_tab, {}).get("history_list")
+        if previous_list and self.current_tab != cat_name:
+            previous_list.cancel_pending_render()
+        self.current_tab = cat_name
+
+        self._build_tab_contents(cat_name)
+        if cat_name in self.dirty_categories:
+            self.update_history_display(cat_name)
+        self.ui_elements[cat_name]["history_list"].ensure_pool()
 
     # --- Rule Management ---
     def add_rule(self):
@@ -485,12 +801,31 @@ Enjoy managing your clipboard!
             print(f"Warning: Rule '{rule_to_delete}' not found in '{category_name}'.")
             self.status_label.configure(text="Status: Rule not found error.")
 
+    def toggle_collapse_near_duplicates(self):
+        """Switches near-duplicate collapsing on or off for the selected category."""
+        selected_cat = self.selected_category_var.get()
+        if selected_cat not in self.categories:
+            self.collapse_near_duplicates_var.set("off")
+            return
+        enabled = self.collapse_near_duplicates_var.get() == "on"
+        self.categories[selected_cat]["collapse_near_duplicates"] = enabled
+        if enabled:
+            self.history_store.prepare_near_duplicates(selected_cat)
+        else:
+            self.near_duplicate_index.remove_category(selected_cat)
+        state = "collapses" if enabled else "keeps"
+        self.status_label.configure(text=f"Status: '{selected_cat}' now {state} near duplicates.")
+        self.trigger_save_config()
+
     def update_rule_display(self, selected_category_name=None):
         """Clears and repopulates the rule display frame for the selected category."""
         if selected_category_name is None:
             selected_category_name = self.selected_category_var.get()
+        collapse = self.categories.get(selected_category_name, {}).get("collapse_near_duplicates", False)
+        self.collapse_near_duplicates_var.set("on" if collapse else "off")
 
         # Clear current rule display widgets
+        self.renderer.cancel(RULES_RENDER_KEY)
         for widget in self.rule_display_frame.winfo_children(): widget.destroy()
 
         if selected_category_name and selected_category_name in self.categories:
@@ -498,205 +833,383 @@ Enjoy managing your clipboard!
             if not rules:
                  ctk.CTkLabel(self.rule_display_frame, text="(No rules defined)", text_color="gray").grid(row=0, column=0, padx=5, pady=5)
             else:
-                for index, rule_text in enumerate(rules):
-                    rule_frame = ctk.CTkFrame(self.rule_display_frame, fg_color="transparent")
-                    rule_frame.grid(row=index, column=0, padx=5, pady=2, sticky="ew")
-                    rule_frame.grid_columnconfigure(0, weight=1)
-                    ctk.CTkLabel(rule_frame, text=rule_text, anchor="w").grid(row=0, column=0, sticky="ew", padx=(0, 5))
-                    ctk.CTkButton(rule_frame, text="X", width=25, fg_color="red", hover_color="darkred",
-                                  command=lambda cat=selected_category_name, rule=rule_text: self.delete_rule(cat, rule)).grid(row=0, column=1, sticky="e")
+                # Long rule lists are built in time slices; switching category cancels the rest
+                self.renderer.render(RULES_RENDER_KEY, rules,
+                                     lambda rule_text, index, cat=selected_category_name: self._create_rule_widget(cat, rule_text, index))
         else:
              ctk.CTkLabel(self.rule_display_frame, text="(Select a category)", text_color="gray").grid(row=0, column=0, padx=5, pady=5)
 
+    def _create_rule_widget(self, category_name, rule_text, index):
+        """Creates the row for a single rule with its delete button."""
+        rule_frame = ctk.CTkFrame(self.rule_display_frame, fg_color="transparent")
+        rule_frame.grid(row=index, column=0, padx=5, pady=2, sticky="ew")
+        rule_frame.grid_columnconfigure(0, weight=1)
+        ctk.CTkLabel(rule_frame, text=rule_text, anchor="w").grid(row=0, column=0, sticky="ew", padx=(0, 5))
+        ctk.CTkButton(rule_frame, text="X", width=25, fg_color="red", hover_color="darkred",
+                      command=lambda cat=category_name, rule=rule_text: self.delete_rule(cat, rule)).grid(row=0, column=1, sticky="e")
+
     # --- Filtering and Clipboard Processing ---
     def _filter_history_callback(self, category_name):
-        """Called when the search entry text changes for a category."""
+        """Called when the search entry text changes for a category. Debounces the search."""
         if category_name in self.ui_elements:
             search_entry = self.ui_elements[category_name].get("search_entry")
             if search_entry:
-                self.search_queries[category_name] = search_entry.get().strip()
-                self.update_history_display(category_name) # Refresh display with filter
+                query = search_entry.get().strip()
+                if query == self.search_queries.get(category_name, ""):
+                    return # Navigation keys etc. don't change the query
+                self.search_queries[category_name] = query
+                # Restart the debounce timer on every keystroke
+                pending_id = self.search_after_ids.pop(category_name, None)
+                if pending_id:
+                    self.after_cancel(pending_id)
+                self.search_after_ids[category_name] = self.after(SEARCH_DEBOUNCE_MS, self._start_search, category_name)
+
+    def _start_search(self, category_name):
+        """Submits the category's current query to the search worker, replacing any older search."""
+        self.search_after_ids.pop(category_name, None)
+        if category_name not in self.categories or not self.ui_elements.get(category_name, {}).get("built"):
+            return
 
-    def _schedule_process_clipboard(self, content):
-        """Schedules the processing of new clipboard content in the main Tkinter thread."""
-        self.after(50, self.process_clipboard_content, content)
+        parsed_query = parse_query(self.search_queries.get(category_name, ""))
+        if parsed_query.is_empty or parsed_query.errors:
+            # Nothing to filter (or nothing valid), let the synchronous path render and report it
+            self.update_history_display(category_name)
+            return
 
-    def process_clipboard_content(self, content):
-        """Categorizes and adds new clipboard content to history (runs in main thread)."""
-        assigned_category = ClipboardHandler.categorize_content(content, self.categories)
+        # Snapshot the rows in display order so the worker never touches live lists
+        cat_data = self.categories[category_name]
+        rows = [(item, True) for item in cat_data.get("pinned_history", [])] + \
+               [(item, False) for item in cat_data.get("history", [])]
+
+        def make_predicate(c=category_name, d=cat_data, q=parsed_query):
+            # The planner runs indexed predicates first and regex verification last
+            matcher = build_matcher(q, c, d, self.search_index)
+            return matcher if matcher is not None else (lambda item, is_pinned: False)
+
+        self.search_worker.submit(
+            category_name, rows,
+            make_predicate=make_predicate,
+            # Results are handed back to the main thread, stale ones are dropped there
+            on_batch=lambda job, batch: self.after(0, self._apply_search_batch, job, batch),
+            on_done=lambda job, count: self.after(0, self._finish_search, job, count),
+            # Archived items are scanned after the hot history
+            more_batches=self._archive_batches(category_name, parsed_query, {item for item, _ in rows})
+        )
 
-        if assigned_category:
-            self.add_to_history(assigned_category, content)
-            self.update_history_display(assigned_category)
-            self.status_label.configure(text=f"Status: Added item to '{assigned_category}'")
+    def _archive_batches(self, category_name, parsed_query, hot_items):
+        """Returns a SearchJob `more_batches` callable streaming a category's archived matches,
+        or None if nothing of the category has been archived."""
+        if not self.history_archive.count(category_name):
+            return None
+        def batches(job):
+            shown = self.shown_archived_items[category_name] = set()
+            for rows in archive_rows(self.history_archive, category_name, parsed_query, exclude=hot_items,
+                                     should_stop=lambda: job.cancelled):
+                shown.update(item for _, item, _, _ in rows)
+                yield [(item, is_pinned) for _, item, is_pinned, _ in rows]
+        return batches
+
+    def _restore_archived(self, category_name, item):
+        """Puts an archived item shown in the search results back at the top of the history, so pinning
+        and moving work on it as on any other row. Returns True if it was restored."""
+        if item not in self.shown_archived_items.get(category_name, ()):
+            return False
+        cat_data = self.categories.get(category_name, {})
+        if item in cat_data.get("history", []) or item in cat_data.get("pinned_history", []):
+            return False
+        self.history_store.add(category_name, item)
+        return True
+
+    def _search_archive(self, category_name, parsed_query, shown_rows):
+        """Appends a category's archived matches below the hot rows just rendered."""
+        cat_data = self.categories[category_name]
+        hot_items = set(cat_data.get("history", [])) | set(cat_data.get("pinned_history", []))
+        more_batches = self._archive_batches(category_name, parsed_query, hot_items)
+        if more_batches is None:
+            return
+        job = SearchJob(category_name, [], lambda: (lambda item, is_pinned: False),
+                        on_batch=lambda job, batch: self.after(0, self._apply_search_batch, job, batch),
+                        on_done=lambda job, count: self.after(0, self._finish_search, job, count),
+                        more_batches=more_batches, initial_matches=len(shown_rows))
+        self.search_worker.submit_job(job)
+        self.search_render_state[category_name] = job # Its batches extend the rendered rows instead of replacing them
+
+    def _cancel_search(self, category_name):
+        """Cancels any pending or running search for a category."""
+        pending_id = self.search_after_ids.pop(category_name, None)
+        if pending_id:
+            self.after_cancel(pending_id)
+        self.search_worker.cancel(category_name)
+        self.search_render_state.pop(category_name, None)
+        self.shown_archived_items.pop(category_name, None)
+
+    def _apply_search_batch(self, job, batch):
+        """Renders a batch of streamed search matches, if they belong to the latest search."""
+        history_list = self.ui_elements.get(job.key, {}).get("history_list")
+        if not self.search_worker.is_current(job) or not history_list:
+            return
+        if self.search_render_state.get(job.key) is not job:
+            # First batch of a new search replaces the previous results
+            self.search_render_state[job.key] = job
+            history_list.set_rows(batch)
         else:
-            print(f"Warning: Could not categorize content: {content[:50]}...")
+            history_list.append_rows(batch)
+
+    def _finish_search(self, job, match_count):
+        """Completes a streamed search, showing the empty message when nothing matched."""
+        history_list = self.ui_elements.get(job.key, {}).get("history_list")
+        if not self.search_worker.is_current(job) or not history_list:
+            return
+        self.search_worker.cancel(job.key) # Search is complete, no longer active
+        self.search_render_state.pop(job.key, None)
+        if match_count == 0:
+            search_query = self.search_queries.get(job.key, "")
+            history_list.set_rows([], empty_text=f"(No results for '{search_query}')")
 
+    def _schedule_process_clipboard(self, content, selection=None):
+        """Schedules the processing of new clipboard content in the main Tkinter thread."""
+        self.after(50, self.process_clipboard_content, content, selection)
 
-    # --- History Management ---
-    def add_to_history(self, category_name, item):
-        """Adds an item to a category's history, handling duplicates and limits."""
-        if category_name in self.categories:
-            cat_data = self.categories[category_name]
-            if not isinstance(cat_data.get("history"), list):
-                 cat_data["history"] = []
-            if not isinstance(cat_data.get("pinned_history"), list):
-                 cat_data["pinned_history"] = []
+    def process_clipboard_content(self, content, selection=None):
+        """Categorizes new clipboard content and queues it for its category's transforms (runs in main thread).
+        `selection` names the selection it came from (None for the clipboard)."""
+        assigned_category = self._categorize_content(content)
+        if assigned_category:
+            self.transform_runner.submit(assigned_category, content, selection)
+            self._store_transformed() # Clips without transforms are stored right away
+
+    def _categorize_content(self, content):
+        """Returns the category the rules (or, failing them, the fallback classifier) assign to content."""
+        with metrics.timer("ingest.categorize_ms"):
+            assigned_category = ClipboardHandler.categorize_content(content, self.categories)
+        if self.fallback_classifier:
+            assigned_category = self.fallback_classifier.categorize(content, assigned_category, self.categories)
+        metrics.ingest_stage(content, "categorized", assigned_category)
+        if not assigned_category:
+            print(f"Warning: Could not categorize content: {content[:50]}...")
+        return assigned_category
+
+    def _store_transformed(self):
+        """Adds clips whose transforms have finished to history, oldest first (runs in main thread)."""
+        changed_categories = []
+        last_selection = None
+        for category_name, content, transformed, selection in self.transform_runner.drain_ready():
+            if self._store_clip(category_name, content, transformed):
+                last_selection = selection
+                if category_name not in changed_categories:
+                    changed_categories.append(category_name)
+        for category_name in changed_categories:
+            self.update_history_display(category_name)
+        if changed_categories:
+            self.status_label.configure(text=self._added_status(changed_categories[-1], last_selection))
+
+    def _added_status(self, category_name, selection=None):
+        """Status text for a stored clip, naming the selection it came from, if any."""
+        if selection:
+            return f"Status: Added item to '{category_name}' (from the {selection} selection)"
+        return f"Status: Added item to '{category_name}'"
+
+    def _store_clip(self, category_name, content, transformed):
+        """Adds one transformed clip without re-rendering; returns False if the transforms emptied it."""
+        item = finish_transform(content, transformed, category_name)
+        if item is None:
+            return False
+        self.add_to_history(category_name, item)
+        return True
+
+    # --- Global Search ---
+    def _global_search_callback(self):
+        """Called when the global search text changes. Debounces the search."""
+        query = self.global_search_entry.get().strip()
+        if query == self.global_search_query:
+            return
+        self.global_search_query = query
+        pending_id = self.search_after_ids.pop(GLOBAL_SEARCH_KEY, None)
+        if pending_id:
+            self.after_cancel(pending_id)
+        self.search_after_ids[GLOBAL_SEARCH_KEY] = self.after(SEARCH_DEBOUNCE_MS, self._start_global_search)
+
+    def _start_global_search(self):
+        """Submits a ranked search over every category, or returns to the tab view if the query is empty."""
+        self.search_after_ids.pop(GLOBAL_SEARCH_KEY, None)
+        query = self.global_search_query
+        parsed_query = parse_query(query)
+        if parsed_query.errors:
+            self.status_label.configure(text=f"Status: {parsed_query.errors[0]}")
+            return
+        if parsed_query.is_empty:
+            self.search_worker.cancel(GLOBAL_SEARCH_KEY)
+            self._cancel_global_render()
+            self.global_results_frame.grid_forget()
+            self.tab_view.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+            return
 
-            history = cat_data["history"]
-            pinned_history = cat_data["pinned_history"]
+        # Shallow copies of every list are cheap and keep the worker off the live data
+        snapshot = {
+            cat_name: {"history": list(cat_data.get("history", [])),
+                       "pinned_history": list(cat_data.get("pinned_history", [])),
+                       "added_at": cat_data.get("added_at", {})}
+            for cat_name, cat_data in self.categories.items()
+        }
 
-            # If item exists anywhere (pinned or not), remove it first
-            if item in history: history.remove(item)
-            if item in pinned_history: pinned_history.remove(item)
+        def produce(job):
+            # Structured filters narrow the rows, the free text is then fuzzy ranked
+            matchers = None
+            if parsed_query.has_filters:
+                matchers = {cat_name: build_matcher(parsed_query, cat_name, cat_data, include_text=False)
+                            for cat_name, cat_data in snapshot.items()}
+            rows = collect_rows(snapshot, matchers)
+            # Send the first batch's ranking right away, then only the final one
+            latest = None
+            hot_results = []
+            for index, results in enumerate(rank_rows(rows, parsed_query.text, should_stop=lambda: job.cancelled)):
+                if index == 0:
+                    yield results
+                latest = results if index > 0 else None
+                hot_results = results
+            if latest is not None:
+                yield latest
+
+            # Then the archive, streamed through its own ranking (only the top results are kept)
+            # and merged into the hot results
+            def archived_batches():
+                for cat_name, cat_data in snapshot.items():
+                    hot_items = set(cat_data["history"]) | set(cat_data["pinned_history"])
+                    yield from archive_rows(self.history_archive, cat_name, parsed_query, start_position=len(cat_data["history"]),
+                                            include_text=False, exclude=hot_items, should_stop=lambda: job.cancelled)
+            archived_results = []
+            for archived_results in rank_batches(archived_batches(), parsed_query.text, should_stop=lambda: job.cancelled):
+                pass
+            if archived_results and not job.cancelled:
+                yield merge_ranked(hot_results, archived_results)
+
+        self.search_worker.submit_job(ResultStreamJob(
+            GLOBAL_SEARCH_KEY, produce,
+            on_result=lambda job, results: self.after(0, self._show_global_results, job, results)
+        ))
+
+    def _cancel_global_render(self):
+        """Stops an in-progress incremental render of global results."""
+        self.renderer.cancel(GLOBAL_SEARCH_KEY)
+
+    def _show_global_results(self, job, results):
+        """Replaces the global results list, rendering it a chunk at a time."""
+        if not self.search_worker.is_current(job):
+            return
+        self._cancel_global_render()
+        self.tab_view.grid_forget()
+        self.global_results_frame.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+        for widget in self.global_results_frame.winfo_children(): widget.destroy()
 
-            # Prevent adding the same item consecutively TO THE TOP if it was already there
-            # Note: This check is less critical now items are always removed first,
-            # but kept for safety. Checking history[0] is sufficient as items
-            # copied again are unpinned and added to normal history.
-            # if history and history[0] == item: return # Less relevant now
+        if not results:
+            ctk.CTkLabel(self.global_results_frame, text=f"(No results for '{self.global_search_query}')", text_color="gray").grid(row=0, column=0, padx=5, pady=5)
+            return
+        # First screenful right away, the rest in time slices (a newer result cancels it)
+        self.renderer.render(GLOBAL_SEARCH_KEY, results,
+                             lambda result, row_index: self._create_global_result_widget(row_index, *result[1][:3]))
+
+    def _create_global_result_widget(self, row_index, category_name, item_text, is_pinned):
+        """Creates a row for a global search result with its category and copy/show buttons."""
+        display_text = item_text.replace('\n', ' ').strip()
+        max_len = 60
+        if len(display_text) > max_len: display_text = display_text[:max_len-3] + "..."
+        if is_pinned:
+            display_text = f"📌 {display_text}"
 
-            # Add new item to the beginning of the normal history
-            history.insert(0, item)
+        result_frame = ctk.CTkFrame(self.global_results_frame, fg_color="transparent")
+        result_frame.grid(row=row_index, column=0, padx=5, pady=(1, 2), sticky="ew")
+        result_frame.grid_columnconfigure(1, weight=1)
+
+        ctk.CTkLabel(result_frame, text=f"[{category_name}]", text_color="gray").grid(row=0, column=0, sticky="w", padx=(0, 5))
+        ctk.CTkLabel(result_frame, text=display_text, anchor="w").grid(row=0, column=1, sticky="ew", padx=(0, 5))
+        ctk.CTkButton(result_frame, text="Copy", width=45,
+                      command=lambda text=item_text, cat=category_name: self.copy_item_to_clipboard(text, cat)).grid(row=0, column=2, sticky="e", padx=(0, 5))
+        ctk.CTkButton(result_frame, text="Show", width=45,
+                      command=lambda cat=category_name: self._show_category_tab(cat)).grid(row=0, column=3, sticky="e")
+
+    def _show_category_tab(self, category_name):
+        """Clears the global search and switches to a category's tab."""
+        self.global_search_entry.delete(0, tkinter.END)
+        self.global_search_query = ""
+        self._start_global_search()
+        if category_name in self.ui_elements:
+            self.tab_view.set(category_name)
+            self._on_tab_selected() # set() doesn't fire the tab view's command
 
-            # Trim *normal* history if it exceeds the limit
-            if len(history) > HISTORY_LIMIT_PER_CATEGORY:
-                self.categories[category_name]["history"] = history[:HISTORY_LIMIT_PER_CATEGORY]
-            # Note: UI update is triggered separately
+    # --- History Management ---
+    def add_to_history(self, category_name, item):
+        """Adds an item to a category's history, handling duplicates and limits."""
+        with metrics.timer("history.add_ms"):
+            self._add_to_history(category_name, item)
+        metrics.ingest_stage(item, "stored", category_name)
 
-        else:
+    def _add_to_history(self, category_name, item):
+        if self.history_store.add(category_name, item) is None:
             print(f"Warning: Attempted to add history to non-existent category: {category_name}")
-
+        # Note: UI update is triggered separately
 
     def update_history_display(self, category_name):
-        """Clears and repopulates the history display frame for a specific category, applying search filter."""
-        if category_name not in self.ui_elements or \
-           "scroll_frame" not in self.ui_elements[category_name]:
+        """Refreshes the history list for a specific category, applying the search filter."""
+        if category_name not in self.ui_elements:
             print(f"Cannot update history display for '{category_name}', UI elements not ready.")
             return
+        # Hidden or not yet built tabs are only marked dirty and rendered when selected
+        if not self.ui_elements[category_name].get("built") or self.tab_view.get() != category_name:
+            self.dirty_categories.add(category_name)
+            return
+        self.dirty_categories.discard(category_name)
+
+        # A full render supersedes any search still streaming into this frame
+        self.search_worker.cancel(category_name)
+        self.search_render_state.pop(category_name, None)
+        self.shown_archived_items.pop(category_name, None)
 
-        scroll_frame = self.ui_elements[category_name]["scroll_frame"]
+        history_list = self.ui_elements[category_name]["history_list"]
         cat_data = self.categories[category_name]
         full_history = cat_data.get("history", [])
         pinned_history = cat_data.get("pinned_history", [])
-        search_query = self.search_queries.get(category_name, "").lower()
-
-        # Filter history based on search query
-        filtered_pinned = []
-        filtered_history = []
-        if search_query:
-            filtered_pinned = [item for item in pinned_history if search_query in str(item).lower()]
-            filtered_history = [item for item in full_history if search_query in str(item).lower()]
-        else:
+        search_query = self.search_queries.get(category_name, "")
+
+        # Filter history based on search query; the planner checks indexed predicates first
+        parsed_query = parse_query(search_query)
+        if parsed_query.errors:
+            self.status_label.configure(text=f"Status: {parsed_query.errors[0]}")
+        if parsed_query.is_empty:
             filtered_pinned = pinned_history[:]
             filtered_history = full_history[:]
-
-        # Clear current history widgets
-        for widget in scroll_frame.winfo_children(): widget.destroy()
-
-        if not filtered_pinned and not filtered_history:
-             if search_query:
-                 # Show different message if history is empty due to filtering
-                 ctk.CTkLabel(scroll_frame, text=f"(No results for '{search_query}')", text_color="gray").grid(row=0, column=0, padx=5, pady=5)
-             else:
-             ctk.CTkLabel(scroll_frame, text="(History is empty)", text_color="gray").grid(row=0, column=0, padx=5, pady=5)
         else:
-            # Display filtered history
-            current_row_index = 0
-
-            # Display Pinned Items First
-            for item_text in filtered_pinned:
-                self._create_history_item_widget(scroll_frame, category_name, item_text, current_row_index, is_pinned=True)
-                current_row_index += 1
-
-            # Display Regular History Items
-            for item_text in filtered_history:
-                self._create_history_item_widget(scroll_frame, category_name, item_text, current_row_index, is_pinned=False)
-                current_row_index += 1
-
-    def _create_history_item_widget(self, parent_frame, category_name, item_text, row_index, is_pinned):
-        """Creates the widget frame for a single history item with a checkbox and individual buttons."""
-                # Ensure item is string and truncate for display
-                if not isinstance(item_text, str): item_text = str(item_text)
-                display_text = item_text.replace('\n', ' ').strip()
-        # Adjust max_len based on available space with checkbox and 3 buttons
-        max_len = 55 
-                if len(display_text) > max_len: display_text = display_text[:max_len-3] + "..."
-
-        # Add pin indicator if pinned
-        if is_pinned:
-            display_text = f"📌 {display_text}"
-
-        # Check selection state
-        is_selected = item_text in self.selected_items.get(category_name, set())
-        frame_fg_color = ctk.ThemeManager.theme["CTkButton"]["fg_color"][0] if is_selected else "transparent"
-
-        # Create frame for each history item with checkbox and label
-        item_frame = ctk.CTkFrame(parent_frame, fg_color=frame_fg_color, corner_radius=3)
-        item_frame.grid(row=row_index, column=0, padx=5, pady=(1,2), sticky="ew") # Reduced pady
-        # Configure columns: Checkbox, Label (stretches), Pin, Copy, Delete
-        item_frame.grid_columnconfigure(0, weight=0) # Checkbox column
-        item_frame.grid_columnconfigure(1, weight=1) # Label column
-        item_frame.grid_columnconfigure(2, weight=0) # Pin/Unpin Button
-        item_frame.grid_columnconfigure(3, weight=0) # Copy Button
-        item_frame.grid_columnconfigure(4, weight=0) # Delete Button
-
-        # Checkbox for selection
-        checkbox_var = ctk.StringVar(value="on" if is_selected else "off")
-        checkbox = ctk.CTkCheckBox(item_frame, text="", variable=checkbox_var, onvalue="on", offvalue="off",
-                                   width=0,
-                                   command=lambda cat=category_name, item=item_text: self._toggle_item_selection(cat, item))
-        checkbox.grid(row=0, column=0, sticky="w", padx=(5, 5))
-
-        # Label (decreased padx slightly)
-        label_widget = ctk.CTkLabel(item_frame, text=display_text, anchor="w")
-        label_widget.grid(row=0, column=1, sticky="ew", padx=(0, 5))
-
-        # --- RE-ADD Individual Buttons --- 
-        button_width = 45 # Define common width
-
-        # Pin/Unpin Button
-        pin_button_text = "Unpin" if is_pinned else "Pin"
-        pin_button_command = lambda c=category_name, i=item_text: self.unpin_item(c, i) if is_pinned else self.pin_item(c, i)
-        pin_button = ctk.CTkButton(item_frame, text=pin_button_text, width=button_width,
-                      command=pin_button_command)
-        pin_button.grid(row=0, column=2, sticky="e", padx=(0, 5))
-
-        # Copy Button
-        copy_button = ctk.CTkButton(item_frame, text="Copy", width=button_width, 
-                      command=lambda text=item_text: self.copy_item_to_clipboard(text))
-        copy_button.grid(row=0, column=3, sticky="e", padx=(0, 5))
-
-        # Delete Button
-        delete_button = ctk.CTkButton(item_frame, text="X", width=25, # Keep delete narrow
-                      fg_color="red", hover_color="darkred",
-                      command=lambda cat=category_name, item=item_text: self.delete_history_item(cat, item))
-        delete_button.grid(row=0, column=4, sticky="e")
-
-        # --- RE-ADD Drag and Drop Bindings --- 
-        # We bind to the item_frame and the label inside it, as events might trigger on either
-        item_frame.bind("<ButtonPress-1>", lambda event, cat=category_name, item=item_text, frame=item_frame: self._on_drag_start(event, cat, item, frame))
-        item_frame.bind("<B1-Motion>", self._on_drag_motion)
-        item_frame.bind("<ButtonRelease-1>", self._on_drag_drop)
-        label_widget.bind("<ButtonPress-1>", lambda event, cat=category_name, item=item_text, frame=item_frame: self._on_drag_start(event, cat, item, frame))
-        label_widget.bind("<B1-Motion>", self._on_drag_motion)
-        label_widget.bind("<ButtonRelease-1>", self._on_drag_drop)
+            matcher = build_matcher(parsed_query, category_name, cat_data, self.search_index)
+            if matcher is None:
+                filtered_pinned, filtered_history = [], []
+            else:
+                filtered_pinned = [item for item in pinned_history if matcher(item, True)]
+                filtered_history = [item for item in full_history if matcher(item, False)]
+
+        # Hand the rows to the virtualized list; it reconciles them by item against the
+        # rows already shown, so a single new clip costs one row insert
+        rows = [(item, True) for item in filtered_pinned] + [(item, False) for item in filtered_history]
+        empty_text = f"(No results for '{search_query}')" if search_query else "(History is empty)"
+        with metrics.timer("history.render_ms"):
+            history_list.set_rows(rows, empty_text=empty_text)
+        metrics.ingest_rendered(category_name)
+        if not parsed_query.is_empty and not parsed_query.errors:
+            self._search_archive(category_name, parsed_query, rows)
+
+    def _refresh_history_rows(self, category_name):
+        """Re-applies selection state to a category's visible rows without rebuilding its item list."""
+        history_list = self.ui_elements.get(category_name, {}).get("history_list")
+        if history_list:
+            history_list.refresh()
 
     def pin_item(self, category_name, item_to_pin):
-        """Moves an item from history to pinned_history."""
+        """Moves an item from history (or the archive) to pinned_history."""
         if category_name in self.categories:
-            cat_data = self.categories[category_name]
-            history = cat_data.get("history", [])
-            pinned_history = cat_data.get("pinned_history", [])
-
-            if item_to_pin in history:
-                history.remove(item_to_pin)
-                if item_to_pin not in pinned_history:
-                    pinned_history.insert(0, item_to_pin) # Add to top of pinned
+            self._restore_archived(category_name, item_to_pin)
+            if self.history_store.pin(category_name, item_to_pin):
                 self.update_history_display(category_name)
                 self.status_label.configure(text=f"Status: Pinned item in '{category_name}'.")
                 self.trigger_save_config()
-            elif item_to_pin in pinned_history:
+            elif self.history_store.is_pinned(category_name, item_to_pin):
                 # Already pinned, maybe move to top? For now, do nothing.
                 self.status_label.configure(text="Status: Item already pinned.")
             else:
@@ -706,15 +1219,7 @@ Enjoy managing your clipboard!
     def unpin_item(self, category_name, item_to_unpin):
         """Moves an item from pinned_history back to the top of history."""
         if category_name in self.categories:
-            cat_data = self.categories[category_name]
-            history = cat_data.get("history", [])
-            pinned_history = cat_data.get("pinned_history", [])
-
-            if item_to_unpin in pinned_history:
-                pinned_history.remove(item_to_unpin)
-                if item_to_unpin in history:
-                    history.remove(item_to_unpin)
-                history.insert(0, item_to_unpin) # Add to top of normal history
+            if self.history_store.unpin(category_name, item_to_unpin):
                 self.update_history_display(category_name)
                 self.status_label.configure(text=f"Status: Unpinned item in '{category_name}'.")
                 self.trigger_save_config()
@@ -724,20 +1229,12 @@ Enjoy managing your clipboard!
 
     def delete_history_item(self, category_name, item_to_delete):
         """Removes a specific item from a category's history (both normal and pinned) and updates the UI."""
-        item_deleted = False
         if category_name in self.categories:
-            cat_data = self.categories[category_name]
-            history = cat_data.get("history", [])
-            pinned_history = cat_data.get("pinned_history", [])
-
-            # Try removing from pinned history
-            if item_to_delete in pinned_history:
-                pinned_history.remove(item_to_delete)
-                item_deleted = True
-
-            # Try removing from normal history
-            if item_to_delete in history:
-                history.remove(item_to_delete)
+            item_deleted = self.history_store.delete(category_name, item_to_delete)
+            # An archived row is only hidden in the archive (which delete() does as well)
+            archived_items = self.shown_archived_items.get(category_name, set())
+            if item_to_delete in archived_items:
+                archived_items.discard(item_to_delete)
                 item_deleted = True
 
             # Remove from selection if it was selected
@@ -745,36 +1242,63 @@ Enjoy managing your clipboard!
                 self.selected_items[category_name].remove(item_to_delete)
 
             if item_deleted:
-            self.update_history_display(category_name)
+                self.update_history_display(category_name)
                 # Update button states AFTER display update (which clears selection visually)
                 self._update_action_buttons_state(category_name)
-            self.status_label.configure(text=f"Status: Deleted item from '{category_name}'.")
-            self.trigger_save_config()
-        else:
+                self.status_label.configure(text=f"Status: Deleted item from '{category_name}'.")
+                self.trigger_save_config()
+            else:
                 print(f"Warning: Item to delete not found in history or pinned history for '{category_name}'.")
-            self.status_label.configure(text="Status: Item not found error.")
+                self.status_label.configure(text="Status: Item not found error.")
         else:
             print(f"Warning: Category '{category_name}' not found for deletion.")
             self.status_label.configure(text="Status: Category not found error.")
 
     def update_all_history_displays(self):
-        """Refreshes the history display for all categories."""
+        """Refreshes the history display for all categories (hidden ones are only marked dirty)."""
         for cat_name in self.categories:
              if cat_name in self.ui_elements:
                  self.update_history_display(cat_name)
 
-    def copy_item_to_clipboard(self, text):
+    def copy_item_to_clipboard(self, text, category_name=None):
         """Copies the given text to the system clipboard."""
         try:
-            clipboard.copy(text)
+            self._write_clipboard(text, (category_name, text) if category_name else None)
             self.status_label.configure(text="Status: Item copied to clipboard!")
         except Exception as e:
             print(f"Error copying to clipboard: {e}")
             self.status_label.configure(text="Status: Error copying item.")
 
+    def _write_clipboard(self, text, context=None):
+        """Writes text through the clipboard monitor, so it is recognized as our own copy when read back
+        instead of going through categorizing, storing and saving again. `context` is the
+        (category, item) it came from, moved to the top when the copy is seen."""
+        if self.daemon_client:
+            category_name, item = context or (None, None)
+            self.daemon_client.send_async("copy", text=text, category=category_name, item=item)
+        elif self.clipboard_handler:
+            self.clipboard_handler.write(text, context)
+        else:
+            self.clipboard_backend.write(text)
+
+    def _on_clipboard_echo(self, context):
+        """Our own copy came back from the clipboard: moves its item to the top without saving (runs in main thread)."""
+        if context is None:
+            return
+        category_name, item = context
+        if self.history_store.bump(category_name, item):
+            self.update_history_display(category_name)
+
     # --- Configuration Persistence ---
     def trigger_save_config(self):
         """Saves the current application configuration to a file."""
+        if self.daemon_client:
+            # History edits were already forwarded; only the category list, rules and options need syncing
+            rules = {cat_name: list(cat_data.get("rules", [])) for cat_name, cat_data in self.categories.items()}
+            options = {cat_name: {"collapse_near_duplicates": bool(cat_data.get("collapse_near_duplicates", False))}
+                       for cat_name, cat_data in self.categories.items()}
+            self.daemon_client.send_async("sync_config", rules=rules, options=options)
+            return
         if config_manager.save_config(self.categories):
             # Status updated elsewhere for specific actions (add/delete)
             pass
@@ -782,40 +1306,129 @@ Enjoy managing your clipboard!
             self.status_label.configure(text="Status: Error saving configuration!")
             tkinter.messagebox.showerror("Save Error", "Could not save configuration.")
 
+    # --- Daemon Events ---
+    def _queue_daemon_event(self, event):
+        """Hands a daemon event to the Tk thread, or queues it until the window is ready (called on the
+        client's reader thread)."""
+        with self.pending_daemon_events_lock:
+            if self.pending_daemon_events is not None:
+                self.pending_daemon_events.append(event)
+                return
+        self.after(0, self._on_daemon_event, event)
+
+    def _on_daemon_event(self, event):
+        """Applies a change made by the daemon or another client (runs in main thread)."""
+        kind = event.get("event")
+        if kind == "history":
+            op, args = event.get("op"), event.get("args", [])
+            try:
+                self.history_store.apply_remote(op, args)
+            except Exception as e:
+                print(f"Error applying daemon event '{op}': {e}")
+                return
+            self._refresh_categories(args[:2] if op == "move" else args[:1])
+            if op == "add" and args:
+                self.status_label.configure(text=self._added_status(args[0], event.get("selection")))
+        elif kind == "config":
+            rules_by_category = event.get("rules", {})
+            removed = [cat_name for cat_name in self.categories if cat_name not in rules_by_category]
+            for cat_name in removed:
+                self._remove_category(cat_name)
+            for cat_name, rules in rules_by_category.items():
+                self.categories.setdefault(cat_name, {"rules": [], "history": [], "pinned_history": []})["rules"] = list(rules)
+            for cat_name, options in event.get("options", {}).items():
+                if cat_name in self.categories:
+                    self.categories[cat_name]["collapse_near_duplicates"] = bool(options.get("collapse_near_duplicates", False))
+            self.update_category_tabs()
+            self.update_category_dropdown()
+            if removed:
+                self._select_initial_category()
+            self.update_rule_display()
+            self._on_tab_selected()
+        elif kind == "closed":
+            self.status_label.configure(text="Status: Lost connection to the clipboard daemon")
+
+    def _refresh_categories(self, category_names):
+        """Re-renders categories changed outside the UI, dropping selections of items that are gone."""
+        for cat_name in category_names:
+            if cat_name not in self.categories:
+                continue
+            if self.selected_items.get(cat_name):
+                cat_data = self.categories[cat_name]
+                present = set(cat_data.get("history", [])) | set(cat_data.get("pinned_history", []))
+                self.selected_items[cat_name] &= present
+                self._update_action_buttons_state(cat_name)
+            self.update_history_display(cat_name)
+
+    # --- Scripting API ---
+    def _start_api_server(self):
+        """Serves the scripting API (history_api.py) on the local socket, unless a daemon already does."""
+        from history_api import HistoryApi
+        from clipboard_daemon import DaemonServer
+        api = HistoryApi(self.categories, self._run_api_call, self._categorize_content,
+                         self.transform_runner.transform_many, self._api_store_clip, self._api_apply_op,
+                         self.history_archive)
+        server = DaemonServer(api, self.socket_path)
+        try:
+            server.start()
+        except OSError as e:
+            print(f"Scripting API not started: {e}")
+            return
+        self.api_server = server
+
+    def _run_api_call(self, fn):
+        """Runs fn on the Tk thread and waits for its result (called on an API connection thread)."""
+        import concurrent.futures
+        from ipc_protocol import RequestError
+        future = concurrent.futures.Future()
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return # Timed out before the Tk loop got to it
+            self.api_changed_categories = set()
+            self.api_save_needed = False
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+            # One re-render per changed category and one save per request, however many items it had
+            self._refresh_categories(self.api_changed_categories)
+            if self.api_save_needed:
+                self.trigger_save_config()
+        self.after(0, run)
+        try:
+            return future.result(timeout=API_CALL_TIMEOUT_S)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise RequestError("Timed out waiting for the window")
+
+    def _api_store_clip(self, category_name, content, transformed):
+        stored = self._store_clip(category_name, content, transformed)
+        if stored:
+            self.api_changed_categories.add(category_name)
+            self.status_label.configure(text=f"Status: Added item to '{category_name}'")
+        return stored
+
+    def _api_apply_op(self, op, args):
+        result = getattr(self.history_store, op)(*args)
+        self.api_changed_categories.update(args[:2] if op == "move" else args[:1])
+        self.api_save_needed = True
+        return result
+
     # --- Item Moving Logic ---
     def _move_item(self, source_category, destination_category, item_to_move):
-        """Moves an item from the source category to the destination category."""
-        item_removed_from_source = False
-        # Remove from source category (check both pinned and normal history)
-        if source_category in self.categories:
-            source_cat_data = self.categories[source_category]
-            if item_to_move in source_cat_data.get("pinned_history", []):
-                source_cat_data["pinned_history"].remove(item_to_move)
-                item_removed_from_source = True
-            if item_to_move in source_cat_data.get("history", []):
-                source_cat_data["history"].remove(item_to_move)
-                item_removed_from_source = True
+        """Moves an item (also an archived one) from the source category to the destination category."""
+        self._restore_archived(source_category, item_to_move)
+        item_removed_from_source, item_added = self.history_store.move(source_category, destination_category, item_to_move)
 
         if not item_removed_from_source:
             print(f"Warning: Item '{item_to_move[:20]}...' not found in source category '{source_category}' during move.")
-            # Continue anyway, maybe it was already removed somehow
-
-        # Add to destination category (always to the top of normal history)
-        if destination_category in self.categories:
-            dest_cat_data = self.categories[destination_category]
-            # Ensure lists exist
-            if not isinstance(dest_cat_data.get("history"), list): dest_cat_data["history"] = []
-            if not isinstance(dest_cat_data.get("pinned_history"), list): dest_cat_data["pinned_history"] = []
-
-            # Remove from destination if it exists (to avoid duplicates and ensure move to top)
-            if item_to_move in dest_cat_data.get("pinned_history", []):
-                dest_cat_data["pinned_history"].remove(item_to_move)
-            if item_to_move in dest_cat_data.get("history", []):
-                dest_cat_data["history"].remove(item_to_move)
-
-            # Add to the beginning of the normal history in the destination
-            dest_cat_data["history"].insert(0, item_to_move)
+            self.status_label.configure(text="Status: Item is no longer in its category.")
+            self.update_history_display(source_category)
+            return
 
+        if item_added:
+            if self.fallback_classifier:
+                self.fallback_classifier.relabel(source_category, destination_category, item_to_move) # Learn from the correction
             # Update UI for both categories
             self.update_history_display(source_category)
             self.update_history_display(destination_category)
@@ -825,9 +1438,8 @@ Enjoy managing your clipboard!
         else:
             print(f"Error: Destination category '{destination_category}' not found during move.")
             self.status_label.configure(text="Status: Error moving item (destination not found).")
-            # Re-update source display in case item was removed but couldn't be added
-            if item_removed_from_source:
-                self.update_history_display(source_category)
+            # Re-update source display, the item was removed but couldn't be added
+            self.update_history_display(source_category)
 
     # --- Multi-Select Actions ---
     def _toggle_item_selection(self, category_name, item_text):
@@ -841,8 +1453,8 @@ Enjoy managing your clipboard!
         else:
             selected_set.add(item_text)
 
-        # Update the visual state (background color)
-        self.update_history_display(category_name)
+        # Restyle just the toggled row; the list data itself is unchanged
+        self._refresh_history_rows(category_name)
         # Update the state of action buttons
         self._update_action_buttons_state(category_name)
 
@@ -898,12 +1510,12 @@ Enjoy managing your clipboard!
         concatenated_text = "\n\n".join(ordered_items_to_copy)
 
         try:
-            clipboard.copy(concatenated_text)
+            self._write_clipboard(concatenated_text) # Not an item of its own, so its echo is just ignored
             self.status_label.configure(text=f"Status: Copied {len(ordered_items_to_copy)} selected items.")
             
             # Deselect items after successful copy
             self.selected_items[category_name] = set()
-            self.update_history_display(category_name)
+            self._refresh_history_rows(category_name)
             self._update_action_buttons_state(category_name)
             # No need to save config for copy, unless deselecting is considered a state change worth saving
             # self.trigger_save_config() 
@@ -921,25 +1533,15 @@ Enjoy managing your clipboard!
             self.status_label.configure(text="Status: No items selected to delete.")
             return
 
-        items_deleted_count = 0
         if category_name in self.categories:
-            cat_data = self.categories[category_name]
-            history = cat_data.setdefault("history", [])
-            pinned_history = cat_data.setdefault("pinned_history", [])
-
-            for item in selected_items_to_delete:
-                item_was_found = False
-                if item in history:
-                    history.remove(item)
-                    item_was_found = True
-                if item in pinned_history:
-                    pinned_history.remove(item)
-                    item_was_found = True
-                
-                if item_was_found:
-                    items_deleted_count += 1
-                else:
-                     print(f"Warning: Selected item '{item[:20]}...' not found during mass delete.")
+            items_deleted_count, missing_items = self.history_store.delete_many(category_name, selected_items_to_delete)
+            # Archived rows are only hidden in the archive (which delete_many() does as well)
+            archived_items = self.shown_archived_items.get(category_name, set())
+            items_deleted_count += sum(1 for item in missing_items if item in archived_items)
+            missing_items = [item for item in missing_items if item not in archived_items]
+            archived_items.difference_update(selected_items_to_delete)
+            for item in missing_items:
+                print(f"Warning: Selected item '{item[:20]}...' not found during mass delete.")
 
             # Clear selection for this category AFTER iteration
             self.selected_items[category_name] = set()
@@ -967,33 +1569,12 @@ Enjoy managing your clipboard!
             self.status_label.configure(text="Status: No items selected to pin.")
             return
 
-        items_pinned_count = 0
         if category_name in self.categories:
-            cat_data = self.categories[category_name]
-            history = cat_data.setdefault("history", [])
-            pinned_history = cat_data.setdefault("pinned_history", [])
-
             for item in selected_items_to_pin:
-                item_was_moved_or_confirmed_pinned = False
-                # Check if it's in normal history
-                if item in history:
-                    history.remove(item)
-                    # Add to pinned only if not already there
-                    if item not in pinned_history:
-                        pinned_history.insert(0, item) # Add to top of pinned
-                    item_was_moved_or_confirmed_pinned = True
-                elif item in pinned_history:
-                    # It was already pinned, maybe move to top?
-                    # For simplicity, we just confirm it's pinned.
-                    # Optional: Move to top if desired: 
-                    # pinned_history.remove(item)
-                    # pinned_history.insert(0, item)
-                    item_was_moved_or_confirmed_pinned = True # Count it as processed
-                else:
-                     print(f"Warning: Selected item '{item[:20]}...' not found during mass pin.")
-                
-                if item_was_moved_or_confirmed_pinned:
-                     items_pinned_count += 1
+                self._restore_archived(category_name, item)
+            items_pinned_count, missing_items = self.history_store.pin_many(category_name, selected_items_to_pin)
+            for item in missing_items:
+                print(f"Warning: Selected item '{item[:20]}...' not found during mass pin.")
 
             # Clear selection after processing all items
             self.selected_items[category_name] = set()
@@ -1020,34 +1601,11 @@ Enjoy managing your clipboard!
             self.status_label.configure(text="Status: No items selected to unpin.")
             return
 
-        items_unpinned_count = 0
         if category_name in self.categories:
-            cat_data = self.categories[category_name]
-            history = cat_data.setdefault("history", [])
-            pinned_history = cat_data.setdefault("pinned_history", [])
-
-            for item in selected_items_to_unpin:
-                item_was_moved = False
-                # Check if it's in pinned history
-                if item in pinned_history:
-                    pinned_history.remove(item)
-                    # Remove from normal history if it exists there (to move to top)
-                    if item in history:
-                        history.remove(item)
-                    # Add to the top of normal history
-                    history.insert(0, item)
-                    item_was_moved = True
-                elif item in history:
-                    # Item was selected but wasn't pinned, maybe move to top?
-                    # For consistency with pin action, we do nothing here. 
-                    # User might have selected both pinned and unpinned.
-                    # We only act on the ones that *were* pinned.
-                    pass # Or we could count it as processed if needed
-                else:
-                     print(f"Warning: Selected item '{item[:20]}...' not found during mass unpin.")
-                
-                if item_was_moved:
-                    items_unpinned_count += 1
+            # Only items that were pinned are moved; selected unpinned items are left alone
+            items_unpinned_count, missing_items = self.history_store.unpin_many(category_name, selected_items_to_unpin)
+            for item in missing_items:
+                print(f"Warning: Selected item '{item[:20]}...' not found during mass unpin.")
 
             # Clear selection after processing all items
             self.selected_items[category_name] = set()
@@ -1100,46 +1658,50 @@ Enjoy managing your clipboard!
         label = ctk.CTkLabel(self.drag_window, text=preview_text, fg_color="gray20", corner_radius=5)
         label.pack(padx=5, pady=5)
 
+    def _register_drop_target(self, widget, category_name):
+        """Records a widget that, when hovered during a drag, targets a category."""
+        if widget is not None:
+            self.drop_targets[str(widget)] = category_name
+
+    def _unregister_drop_targets(self, category_name):
+        """Forgets every drop target widget of a deleted category."""
+        for path in [path for path, cat in self.drop_targets.items() if cat == category_name]:
+            del self.drop_targets[path]
+
+    def _find_drop_target(self, x_root, y_root):
+        """Returns the category under the pointer, walking up from the hovered widget.
+        Each level is a single dictionary lookup in the drop target map."""
+        current_widget = self.winfo_containing(x_root, y_root)
+        while current_widget is not None and current_widget != self:
+            category_name = self.drop_targets.get(str(current_widget))
+            if category_name in self.categories:
+                return category_name
+            current_widget = current_widget.master
+        return None
+
     def _on_drag_motion(self, event):
-        """Handles the dragging motion and highlights potential drop targets."""
-        # (Restored full logic)
+        """Records the pointer position; the actual update runs at most once per frame."""
         if not self.drag_data or not self.drag_window:
             return
+        self.drag_pointer = (event.x_root, event.y_root)
+        if self.drag_motion_after_id is None:
+            self.drag_motion_after_id = self.after(DRAG_MOTION_INTERVAL_MS, self._process_drag_motion)
+
+    def _process_drag_motion(self):
+        """Moves the drag preview and highlights the potential drop target for the latest pointer position."""
+        self.drag_motion_after_id = None
+        if not self.drag_data or not self.drag_window or not self.drag_pointer:
+            return
+        x_root, y_root = self.drag_pointer
         # Update drag window position
-        self.drag_window.geometry(f"+{(event.x_root + 10)}+{(event.y_root + 10)}")
+        self.drag_window.geometry(f"+{(x_root + 10)}+{(y_root + 10)}")
+
+        # --- Find Hover Target ---
+        hovered_category = self._find_drop_target(x_root, y_root)
+        if hovered_category == self.drag_data.get("source_category"):
+            hovered_category = None # Can't drop onto source
 
-        # --- Find Hover Target --- 
-        hovered_category = None
-        widget_under_cursor = self.winfo_containing(event.x_root, event.y_root)
-        source_category = self.drag_data.get("source_category")
-
-        if widget_under_cursor:
-            current_widget = widget_under_cursor
-            while current_widget is not None and current_widget != self:
-                # Check UI elements (tab content or scroll frame)
-                for cat_name, elements in self.ui_elements.items():
-                    if current_widget == elements.get("tab") or current_widget == elements.get("scroll_frame"):
-                        if cat_name != source_category: # Can't drop onto source
-                            hovered_category = cat_name
-                        break # Found potential category via content/scroll area
-                if hovered_category: break # Exit while loop if found via content/scroll
-
-                # Check Tab Buttons if not found via content area yet
-                potential_button = None
-                if isinstance(current_widget, ctk.CTkButton): potential_button = current_widget
-                elif isinstance(current_widget.master, ctk.CTkButton): potential_button = current_widget.master
-
-                if potential_button and \
-                   hasattr(potential_button, "master") and isinstance(potential_button.master, ctk.CTkSegmentedButton) and \
-                   hasattr(potential_button.master, "master") and potential_button.master.master == self.tab_view:
-                     button_text = potential_button.cget("text")
-                     if button_text in self.categories and button_text != source_category:
-                         hovered_category = button_text # Found potential category via tab button
-                         break # Exit while loop
-
-                current_widget = current_widget.master
-
-        # --- Apply/Remove Highlight --- 
+        # --- Apply/Remove Highlight ---
         if hovered_category != self.previously_highlighted_category:
             # Remove highlight from previous target
             if self.previously_highlighted_category:
@@ -1163,7 +1725,12 @@ Enjoy managing your clipboard!
 
     def _on_drag_drop(self, event):
         """Handles the drop action."""
-        # (Restored full logic)
+        # Drop any throttled motion update still pending
+        if self.drag_motion_after_id:
+            self.after_cancel(self.drag_motion_after_id)
+            self.drag_motion_after_id = None
+        self.drag_pointer = None
+
         # --- Clear Highlight --- 
         if self.previously_highlighted_category:
             prev_button = self.ui_elements.get(self.previously_highlighted_category, {}).get("tab_button")
@@ -1185,44 +1752,8 @@ Enjoy managing your clipboard!
             self.drag_window.destroy()
             self.drag_window = None
 
-        # --- Find Drop Target --- 
-        target_category = None
-        # Get widget under the cursor
-        widget_under_cursor = self.winfo_containing(event.x_root, event.y_root)
-
-        if widget_under_cursor:
-            print(f"Widget under cursor: {widget_under_cursor.winfo_class()} {widget_under_cursor}") # Debug
-            # Traverse up the widget hierarchy to find a recognizable container (tab or scroll_frame)
-            current_widget = widget_under_cursor
-            while current_widget is not None and current_widget != self:
-                # Check if it's one of our stored UI elements
-                for cat_name, elements in self.ui_elements.items():
-                    # Check if dropped onto the tab content area or the scroll frame within it
-                    if current_widget == elements.get("tab") or current_widget == elements.get("scroll_frame"): 
-                        target_category = cat_name
-                        print(f"Potential target found: {target_category}") # Debug
-                        break # Found target category
-                if target_category: break # Exit outer loop too
-                
-                # Check if dropped directly on a tab button or its contents
-                potential_button = None
-                if isinstance(current_widget, ctk.CTkButton):
-                    potential_button = current_widget
-                elif isinstance(current_widget.master, ctk.CTkButton):
-                     potential_button = current_widget.master
-
-                # Verify the button hierarchy: Button -> SegmentedButton -> Tabview
-                if potential_button and \
-                   hasattr(potential_button, "master") and isinstance(potential_button.master, ctk.CTkSegmentedButton) and \
-                   hasattr(potential_button.master, "master") and potential_button.master.master == self.tab_view:
-                     button_text = potential_button.cget("text")
-                     if button_text in self.categories:
-                         target_category = button_text
-                         print(f"Potential target (tab button identified) found: {target_category}") # Debug
-                         break # Exit while loop, target found
-
-                current_widget = current_widget.master # Go up one level
-        
+        # --- Find Drop Target ---
+        target_category = self._find_drop_target(event.x_root, event.y_root)
         print(f"Final Target Category: {target_category}") # Debug
 
         # Process the move if a valid target was found
@@ -1237,5 +1768,3 @@ Enjoy managing your clipboard!
 
         # Clear drag data
         self.drag_data = None
-
-
@@ -0,0 +1,266 @@
+# benchmark_suite.py
+"""
+Repeatable benchmarks for persistence, history operations and categorization.
+Runs config_manager.load_config/save_config, HistoryStore add/move/multi-delete (the data side of
+add_to_history, _move_item and _delete_selected) and ClipboardHandler.categorize_content over a grid
+of history sizes, item sizes and rule-set sizes. Results are saved as JSON and can be compared
+against a stored baseline; a slowdown beyond the threshold is reported as a regression (exit code 1).
+
+Examples:
+  python benchmark_suite.py --quick --output results.json
+  python benchmark_suite.py --baseline bench_baseline.json --threshold 0.2
+  python benchmark_suite.py --save-baseline bench_baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+import config_manager
+from clipboard_handler import ClipboardHandler
+from history_store import HistoryStore
+from search_index import HistorySearchIndex
+
+HISTORY_SIZES = (50, 1000, 10000, 100000, 1000000)
+ITEM_SIZES = (32, 1024, 16384) # Characters per history item
+RULE_COUNTS = (5, 50, 500)
+QUICK_HISTORY_SIZES = (50, 1000, 10000)
+QUICK_ITEM_SIZES = (32, 1024)
+QUICK_RULE_COUNTS = (5, 50)
+MAX_HISTORY_CHARS = 64 * 1024 * 1024 # Grid points holding more text than this are skipped
+REPEATS = 5
+TARGET_OP_WORK = 10 ** 7 # ops * history size per repetition, bounding the slow O(n) operations
+DEFAULT_THRESHOLD = 0.20 # Relative median slowdown counted as a regression
+CATEGORY_NAMES = ("Uncategorized", "Code", "Links", "Text")
+
+# --- Data Generation ---
+def make_items(count, item_size, rng, prefix="item"):
+    """Returns `count` unique strings of about `item_size` characters."""
+    filler = "".join(rng.choice(string.ascii_letters + " ") for _ in range(max(item_size, 1)))
+    items = []
+    for n in range(count):
+        head = f"{prefix}-{n} "
+        offset = n % len(filler)
+        body = (filler[offset:] + filler[:offset])[:max(item_size - len(head), 0)]
+        items.append(head + body)
+    return items
+
+def make_categories(history_size, item_size, rng):
+    """Builds a categories dictionary with `history_size` items spread over the default categories."""
+    categories = config_manager.initialize_default_categories()
+    items = make_items(history_size, item_size, rng)
+    for index, cat_name in enumerate(CATEGORY_NAMES):
+        history = items[index::len(CATEGORY_NAMES)]
+        now = time.time()
+        categories[cat_name]["history"] = history
+        categories[cat_name]["pinned_history"] = []
+        categories[cat_name]["added_at"] = {item: now for item in history}
+    return categories
+
+def make_rules(rule_count, rng):
+    """Returns keyword and regex rules that never match the benchmark items (the worst case)."""
+    rules = []
+    for n in range(rule_count):
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(6))
+        rules.append(f"regex:\\b{word}{n}\\d+" if n % 3 == 0 else f"{word}{n}#")
+    return rules
+
+def ops_for(history_size, maximum=1000):
+    """Operations per repetition: fewer on large histories, where each operation scans the lists."""
+    return max(10, min(maximum, TARGET_OP_WORK // max(history_size, 1)))
+
+def time_repeats(setup, run, repeats):
+    """Times `run(state)` on fresh `setup()` state `repeats` times; returns seconds per repetition."""
+    timings = []
+    for _ in range(repeats):
+        state = setup()
+        start_time = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+# --- Benchmarks ---
+def bench_save_config(history_size, item_size, repeats, with_index, rng):
+    categories = make_categories(history_size, item_size, rng)
+    return 1, time_repeats(lambda: categories, config_manager.save_config, repeats)
+
+def bench_load_config(history_size, item_size, repeats, with_index, rng):
+    config_manager.save_config(make_categories(history_size, item_size, rng))
+    return 1, time_repeats(lambda: None, lambda state: config_manager.load_config(), repeats)
+
+def _store_setup(history_size, item_size, with_index, rng):
+    base = make_categories(history_size, item_size, rng)
+    def setup():
+        categories = {name: {"rules": data["rules"], "history": list(data["history"]),
+                             "pinned_history": [], "added_at": dict(data["added_at"])}
+                      for name, data in base.items()}
+        search_index = None
+        if with_index:
+            search_index = HistorySearchIndex()
+            search_index.rebuild(categories)
+        return HistoryStore(categories, search_index, limit=max(history_size, 1))
+    return setup
+
+def bench_add_to_history(history_size, item_size, repeats, with_index, rng):
+    ops = ops_for(history_size)
+    new_items = make_items(ops, item_size, rng, prefix="new")
+    def run(store):
+        for item in new_items:
+            store.add("Text", item)
+    return ops, time_repeats(_store_setup(history_size, item_size, with_index, rng), run, repeats)
+
+def bench_move_item(history_size, item_size, repeats, with_index, rng):
+    ops = max(min(ops_for(history_size), history_size // len(CATEGORY_NAMES)), 1) # Moves come from one category
+    def run(store):
+        history = store.categories["Text"]["history"]
+        for item in history[:ops]:
+            store.move("Text", "Code", item)
+    return ops, time_repeats(_store_setup(history_size, item_size, with_index, rng), run, repeats)
+
+def bench_delete_selected(history_size, item_size, repeats, with_index, rng):
+    ops = ops_for(history_size, maximum=100)
+    def run(store):
+        history = store.categories["Text"]["history"]
+        selected = set(history[::max(len(history) // ops, 1)][:ops])
+        store.delete_many("Text", selected)
+    # One operation = deleting one selection of up to 100 items
+    return 1, time_repeats(_store_setup(history_size, item_size, with_index, rng), run, repeats)
+
+def bench_categorize(rule_count, item_size, repeats, rng):
+    categories = config_manager.initialize_default_categories()
+    for cat_name in ("Code", "Links", "Text"):
+        categories[cat_name]["rules"] = make_rules(rule_count, rng)
+    contents = make_items(200, item_size, rng, prefix="clip")
+    def run(state):
+        for content in contents:
+            ClipboardHandler.categorize_content(content, categories)
+    return len(contents), time_repeats(lambda: None, run, repeats)
+
+HISTORY_BENCHMARKS = (
+    ("save_config", bench_save_config),
+    ("load_config", bench_load_config),
+    ("add_to_history", bench_add_to_history),
+    ("move_item", bench_move_item),
+    ("delete_selected", bench_delete_selected),
+)
+
+# --- Running ---
+@contextlib.contextmanager
+def quiet():
+    """Silences the print-based logging of config_manager while a benchmark runs."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def summarize(ops, timings):
+    """Per-operation statistics of one grid point, in milliseconds."""
+    per_op = [timing * 1000 / ops for timing in timings]
+    return {"ops": ops, "repeats": len(timings), "median_ms": round(statistics.median(per_op), 6),
+            "min_ms": round(min(per_op), 6), "max_ms": round(max(per_op), 6)}
+
+def run_suite(history_sizes, item_sizes, rule_counts, repeats, with_index, only=None, seed=0):
+    """Runs the benchmark grid and returns {result key: statistics}."""
+    results = {}
+    temp_dir = tempfile.mkdtemp(prefix="clipboard-bench-")
+    original_config_file = config_manager.CONFIG_FILE
+    config_manager.CONFIG_FILE = os.path.join(temp_dir, "config.json") # Never touch the user's config
+    try:
+        for name, bench in HISTORY_BENCHMARKS:
+            if only and name not in only:
+                continue
+            for history_size in history_sizes:
+                for item_size in item_sizes:
+                    key = f"{name}|n={history_size}|size={item_size}"
+                    if history_size * item_size > MAX_HISTORY_CHARS:
+                        results[key] = {"skipped": "history too large"}
+                        continue
+                    with quiet():
+                        ops, timings = bench(history_size, item_size, repeats, with_index, random.Random(seed))
+                    results[key] = summarize(ops, timings)
+                    print(f"{key:<48}{results[key]['median_ms']:>14.4f} ms/op")
+        if not only or "categorize" in only:
+            for rule_count in rule_counts:
+                for item_size in item_sizes:
+                    key = f"categorize|rules={rule_count}|size={item_size}"
+                    with quiet():
+                        ops, timings = bench_categorize(rule_count, item_size, repeats, random.Random(seed))
+                    results[key] = summarize(ops, timings)
+                    print(f"{key:<48}{results[key]['median_ms']:>14.4f} ms/op")
+    finally:
+        config_manager.CONFIG_FILE = original_config_file
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def compare(results, baseline, threshold):
+    """Returns [(key, baseline ms, current ms, relative change)] for results slower than the threshold allows."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous or "median_ms" not in previous or "median_ms" not in current or previous["median_ms"] <= 0:
+            continue
+        change = current["median_ms"] / previous["median_ms"] - 1
+        if change > threshold:
+            regressions.append((key, previous["median_ms"], current["median_ms"], change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark persistence, history operations and categorization.")
+    parser.add_argument("--quick", action="store_true", help="Use a small grid (up to 10k items).")
+    parser.add_argument("--history-sizes", type=int, nargs="+", help="Override the history size grid.")
+    parser.add_argument("--item-sizes", type=int, nargs="+", help="Override the item size grid.")
+    parser.add_argument("--rule-counts", type=int, nargs="+", help="Override the rule count grid.")
+    parser.add_argument("--only", nargs="+", help="Run only these benchmarks (e.g. add_to_history categorize).")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--with-index", action="store_true", help="Keep a search index in step, as the app does.")
+    parser.add_argument("--output", metavar="PATH", help="Write results as JSON.")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a stored results file.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown (0.2 = 20%%).")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Store these results as the new baseline.")
+    args = parser.parse_args()
+
+    history_sizes = args.history_sizes or (QUICK_HISTORY_SIZES if args.quick else HISTORY_SIZES)
+    item_sizes = args.item_sizes or (QUICK_ITEM_SIZES if args.quick else ITEM_SIZES)
+    rule_counts = args.rule_counts or (QUICK_RULE_COUNTS if args.quick else RULE_COUNTS)
+
+    results = run_suite(history_sizes, item_sizes, rule_counts, args.repeats, args.with_index, args.only)
+    document = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeats": args.repeats,
+            "with_index": args.with_index,
+        },
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=4)
+            print(f"Results written to {path}")
+
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f).get("results", {})
+        except Exception as e:
+            print(f"Error reading baseline {args.baseline}: {e}")
+            sys.exit(2)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for key, previous, current, change in regressions:
+                print(f"  {key:<48}{previous:>12.4f} -> {current:.4f} ms/op (+{change:.0%})")
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# chunked_renderer.py
+"""
+Time-sliced widget building on the Tk event loop.
+Builds rows in small slices scheduled with `after`, each slice stopping once it has used up
+a per-frame time budget, so input keeps being handled while long lists are created.
+Renders are keyed, and starting a new render for a key cancels the previous one.
+"""
+
+import time
+
+FRAME_BUDGET_MS = 8 # Max time a single slice may spend building widgets
+FIRST_SCREEN_ROWS = 15 # Rows built synchronously so the first screenful shows immediately
+
+class ChunkedRender:
+    """State of one in-progress render."""
+
+    def __init__(self, key, items, build, on_done):
+        self.key = key
+        self.items = items
+        self.build = build # Called as build(item, index)
+        self.on_done = on_done
+        self.next_index = 0
+        self.after_id = None
+        self.cancelled = False
+
+class ChunkedRenderer:
+    """Schedules keyed, cancellable, time-budgeted widget builds on a Tk widget's event loop."""
+
+    def __init__(self, widget, budget_ms=FRAME_BUDGET_MS):
+        """Uses `widget` to schedule slices; all builds run on the Tk thread."""
+        self.widget = widget
+        self.budget = budget_ms / 1000.0
+        self._renders = {} # {key: ChunkedRender}
+
+    def render(self, key, items, build, first_count=FIRST_SCREEN_ROWS, on_done=None):
+        """Builds `items` with `build(item, index)`: the first `first_count` right away, the rest in slices.
+        Cancels any render already running for the same key."""
+        self.cancel(key)
+        render = ChunkedRender(key, list(items), build, on_done)
+        self._renders[key] = render
+        self._build_range(render, min(first_count, len(render.items)))
+        self._schedule_or_finish(render)
+        return render
+
+    def cancel(self, key):
+        """Stops a pending render; rows already built are left in place."""
+        render = self._renders.pop(key, None)
+        if render:
+            render.cancelled = True
+            if render.after_id:
+                try:
+                    self.widget.after_cancel(render.after_id)
+                except Exception:
+                    pass # Widget already destroyed
+
+    def cancel_all(self):
+        """Stops every pending render."""
+        for key in list(self._renders):
+            self.cancel(key)
+
+    def is_rendering(self, key):
+        """True while a render for the key still has items left to build."""
+        return key in self._renders
+
+    # --- Slicing ---
+    def _build_range(self, render, end_index):
+        while render.next_index < end_index and not render.cancelled:
+            render.build(render.items[render.next_index], render.next_index)
+            render.next_index += 1
+
+    def _schedule_or_finish(self, render):
+        if render.cancelled:
+            return
+        if render.next_index < len(render.items):
+            # after(0) lets pending input events run before the next slice
+            render.after_id = self.widget.after(0, self._run_slice, render)
+            return
+        if self._renders.get(render.key) is render:
+            del self._renders[render.key]
+        if render.on_done:
+            render.on_done()
+
+    def _run_slice(self, render):
+        """Builds items until the frame budget is used up, then yields back to the event loop."""
+        render.after_id = None
+        if render.cancelled:
+            return
+        deadline = time.perf_counter() + self.budget
+        while render.next_index < len(render.items) and not render.cancelled:
+            render.build(render.items[render.next_index], render.next_index)
+            render.next_index += 1
+            if time.perf_counter() >= deadline:
+                break
+        self._schedule_or_finish(render)
@@ -0,0 +1,135 @@
+# clipboard_backends.py
+"""
+Clipboard access used by ClipboardHandler and the GUI.
+SystemClipboardBackend talks to the real clipboard through the `clipboard` package;
+SelectionBackend reads one Linux selection (CLIPBOARD or PRIMARY) through wl-paste, xclip or xsel;
+FakeClipboardBackend is an in-memory clipboard for the load harness and benchmarks.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+SELECTION_COMMAND_TIMEOUT_S = 3.0 # A selection tool still running after this is killed
+# (tool, environment variable of its display server, read commands, write commands) per selection, in order of preference
+SELECTION_TOOLS = [
+    ("wl-paste", "WAYLAND_DISPLAY",
+     {"clipboard": ["wl-paste", "--no-newline", "--type", "text"],
+      "primary": ["wl-paste", "--no-newline", "--type", "text", "--primary"]},
+     {"clipboard": ["wl-copy"], "primary": ["wl-copy", "--primary"]}),
+    ("xclip", "DISPLAY",
+     {"clipboard": ["xclip", "-o", "-selection", "clipboard"], "primary": ["xclip", "-o", "-selection", "primary"]},
+     {"clipboard": ["xclip", "-i", "-selection", "clipboard"], "primary": ["xclip", "-i", "-selection", "primary"]}),
+    ("xsel", "DISPLAY",
+     {"clipboard": ["xsel", "-o", "--clipboard"], "primary": ["xsel", "-o", "--primary"]},
+     {"clipboard": ["xsel", "-i", "--clipboard"], "primary": ["xsel", "-i", "--primary"]}),
+]
+
+class ClipboardEmpty(Exception):
+    """Raised by read() when the clipboard holds no text."""
+
+class SystemClipboardBackend:
+    """The operating system clipboard."""
+
+    name = "system"
+
+    def __init__(self):
+        self._clipboard = None
+
+    def _module(self):
+        # Imported on first use to keep it off the app's startup path
+        if self._clipboard is None:
+            import clipboard
+            self._clipboard = clipboard
+        return self._clipboard
+
+    def read(self):
+        """Returns the clipboard content; raises ClipboardEmpty if there is none."""
+        clipboard = self._module()
+        try:
+            return clipboard.paste()
+        except clipboard.ClipboardEmpty:
+            raise ClipboardEmpty()
+
+    def write(self, text):
+        """Replaces the clipboard content with `text`."""
+        self._module().copy(text)
+
+class SelectionBackend:
+    """One X11/Wayland selection, read and written by running a command-line tool."""
+
+    def __init__(self, selection, read_command, write_command):
+        self.name = selection # "clipboard" or "primary"; tags the clips it produces
+        self.read_command = read_command
+        self.write_command = write_command
+
+    def read(self):
+        """Returns the selection's text; raises ClipboardEmpty if it holds none."""
+        result = subprocess.run(self.read_command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, timeout=SELECTION_COMMAND_TIMEOUT_S)
+        if result.returncode != 0 or not result.stdout:
+            raise ClipboardEmpty() # The tools exit with an error when the selection is empty or not text
+        # Anything that is not valid UTF-8 text (e.g. image data a tool passed through) is not a clip
+        if b"\x00" in result.stdout:
+            raise ClipboardEmpty()
+        try:
+            return result.stdout.decode("utf-8")
+        except UnicodeDecodeError:
+            raise ClipboardEmpty()
+
+    def write(self, text):
+        """Replaces the selection's content with `text`."""
+        # xclip and wl-copy stay in the background to serve the selection, so their output is not captured
+        subprocess.run(self.write_command, input=text.encode("utf-8"), stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=SELECTION_COMMAND_TIMEOUT_S, check=True)
+
+def linux_selection_backends():
+    """{"clipboard": SelectionBackend, "primary": SelectionBackend} using the first tool that is
+    installed and whose display server is running, or None if there is none."""
+    for tool, display_variable, read_commands, write_commands in SELECTION_TOOLS:
+        if os.environ.get(display_variable) and shutil.which(tool) and shutil.which(write_commands["clipboard"][0]):
+            return {selection: SelectionBackend(selection, read_commands[selection], write_commands[selection])
+                    for selection in ("clipboard", "primary")}
+    return None
+
+class FakeClipboardBackend:
+    """Thread-safe in-memory clipboard that records what was written and when it was first read."""
+
+    name = "fake"
+
+    def __init__(self, initial_value="", read_delay_s=0.0):
+        """`read_delay_s` simulates a slow clipboard owner on every read."""
+        self.read_delay_s = read_delay_s
+        self._lock = threading.Lock()
+        self._value = initial_value
+        self._current_write = None # Record of the write currently on the clipboard
+        self.writes = [] # [{"text", "written_at", "first_read_at"}] in write order
+        self.reads = 0
+
+    def write(self, text):
+        """Puts `text` on the fake clipboard, as if another application had copied it."""
+        record = {"text": text, "written_at": time.perf_counter(), "first_read_at": None}
+        with self._lock:
+            self._value = text
+            self._current_write = record
+            self.writes.append(record)
+
+    def read(self):
+        """Returns the current value; raises ClipboardEmpty if it is empty."""
+        if self.read_delay_s:
+            time.sleep(self.read_delay_s)
+        with self._lock:
+            self.reads += 1
+            if self._current_write is not None and self._current_write["first_read_at"] is None:
+                self._current_write["first_read_at"] = time.perf_counter()
+            value = self._value
+        if not value:
+            raise ClipboardEmpty()
+        return value
+
+    def unread_writes(self):
+        """Writes replaced before any read saw them, i.e. clips a poller would have dropped."""
+        with self._lock:
+            return [record for record in self.writes if record["first_read_at"] is None and record is not self._current_write]
@@ -0,0 +1,433 @@
+# clipboard_daemon.py
+"""
+Headless clipboard daemon: monitoring, categorization and storage without Tk.
+ClipboardCore owns the categories, the history store and the clipboard monitor; DaemonServer
+exposes it over a local socket (see ipc_protocol.py) so the GUI can attach as an optional client
+and receive incremental updates, and scripts can use the API in history_api.py.
+Run with `python main.py --daemon`.
+"""
+
+import queue
+import signal
+import socket
+import threading
+
+import config_manager
+from clipboard_handler import ClipboardHandler
+from history_store import HistoryStore
+from history_archive import HistoryArchive
+from search_index import HistorySearchIndex
+from near_duplicates import NearDuplicateIndex
+from metrics import registry as metrics
+from history_api import HistoryApi
+from transforms import TransformRunner, finish_transform
+import ipc_protocol
+from ipc_protocol import RequestError
+
+SAVE_INTERVAL_S = 5.0 # Changes are written to the config file at most this often
+OUTBOUND_QUEUE_LIMIT = 10000 # Messages buffered per client before it is considered stuck
+HISTORY_OPS = ("add", "bump", "pin", "unpin", "delete", "move", "delete_many", "pin_many", "unpin_many")
+
+# --- Core ---
+class ClipboardCore:
+    """Categories, history and clipboard monitoring, shared by every connected client."""
+
+    def __init__(self, save_interval=SAVE_INTERVAL_S, backend=None, selection_backends=()):
+        self.categories = config_manager.load_config()
+        self.lock = threading.RLock() # Guards self.categories against the monitor and client threads
+        self.search_index = HistorySearchIndex()
+        self.search_index.rebuild(self.categories)
+        self.archive = HistoryArchive() # Items trimmed from the history stay searchable on disk
+        self.near_duplicates = NearDuplicateIndex() # Fingerprints of categories that collapse near duplicates
+        self._collapsed = [] # (category, item, replaced item) of collapses not yet sent to the clients
+        self.store = HistoryStore(self.categories, self.search_index, archive=self.archive, near_duplicates=self.near_duplicates,
+                                  on_collapse=lambda *collapse: self._collapsed.append(collapse))
+        # Optional learned category for clips no rule matches
+        self.fallback_classifier = None
+        if self.categories.get("Uncategorized", {}).get("fallback_classifier"):
+            import fallback_classifier # Loads NumPy, so only imported when the config asks for it
+            if fallback_classifier.is_enabled(self.categories):
+                self.fallback_classifier = fallback_classifier.FallbackClassifier()
+        self.handler = ClipboardHandler(self.categories, self.ingest, backend=backend, echo_callback=self.on_echo,
+                                        selection_backends=selection_backends)
+        # Per-category transforms, run on a thread pool; finished clips are stored in copy order
+        self.transforms = TransformRunner(self.categories, on_ready=self._store_transformed)
+        # Scripting API (list, search, add, ...); its edits go through apply_op so attached windows see them
+        self.api = HistoryApi(self.categories, self.run_locked, self.categorize, self.transforms.transform_many,
+                              self.store_clip, self.apply_op, self.archive)
+        self.save_interval = save_interval
+        self.listeners = [] # Callables(event, origin) receiving change events
+        self.dirty = False
+        self.stopped = threading.Event()
+        self._saver = threading.Thread(target=self._save_loop, daemon=True)
+
+    def add_listener(self, listener):
+        """Registers a callable(event, origin) for change events."""
+        self.listeners.append(listener)
+
+    def publish(self, event, origin=None):
+        """Sends a change event to every listener; `origin` is the client that caused it.
+        Called with the lock held, so events go out in the order of the changes and a snapshot taken
+        under the lock is never followed by an event it already contains."""
+        for listener in self.listeners:
+            try:
+                listener(event, origin)
+            except Exception as e:
+                print(f"Error publishing event: {e}")
+
+    # --- Lifecycle ---
+    def start(self):
+        """Starts clipboard monitoring, the periodic saver, the fallback classifier's training and the
+        near-duplicate fingerprinting."""
+        with self.lock:
+            self.store.prepare_near_duplicates()
+        if self.fallback_classifier:
+            from fallback_classifier import history_examples
+            with self.lock:
+                examples = history_examples(self.categories)
+            threading.Thread(target=self.fallback_classifier.train, args=(examples,), daemon=True).start()
+        self.handler.start_monitoring()
+        self._saver.start()
+
+    def stop(self):
+        """Stops monitoring and writes any unsaved changes."""
+        self.stopped.set()
+        self.handler.stop()
+        self.handler.join()
+        self.transforms.shutdown(wait=True) # Clips still being transformed are stored before saving
+        self.save()
+
+    def save(self):
+        """Writes the configuration if anything changed since the last save."""
+        with self.lock:
+            if not self.dirty:
+                return True
+            saved = config_manager.save_config(self.categories)
+            if saved:
+                self.dirty = False
+            return saved
+
+    def _save_loop(self):
+        while not self.stopped.wait(self.save_interval):
+            self.save()
+
+    def run_locked(self, fn):
+        """Calls fn while holding the categories lock."""
+        with self.lock:
+            return fn()
+
+    # --- Ingest ---
+    def ingest(self, content, selection=None):
+        """Categorizes new clipboard content and queues it for its transforms (called on the monitor
+        thread, which goes back to polling while a pool thread transforms and stores it).
+        `selection` names the selection it came from (None for the clipboard)."""
+        category_name = self.categorize(content)
+        self.transforms.submit(category_name, content, selection)
+        return category_name
+
+    def _store_transformed(self):
+        """Stores the clips whose transforms finished (called from a transform thread, or the monitor
+        thread when a category has none). Draining under the lock keeps them in copy order."""
+        with self.lock:
+            for category_name, content, transformed, selection in self.transforms.drain_ready():
+                self.store_clip(category_name, content, transformed, selection)
+
+    def on_echo(self, content, context):
+        """A clip written by a client's Copy button came back: moves its item to the top, nothing else
+        (called on the monitor thread). The new order is saved with the next change."""
+        if context is None:
+            return # e.g. several items copied as one text; nothing in the history to move
+        category_name, item = context
+        with self.lock:
+            if self.store.bump(category_name, item):
+                self.publish({"event": "history", "op": "bump", "args": [category_name, item]})
+
+    def categorize(self, content):
+        """Returns the category the rules (or, failing them, the fallback classifier) assign to content."""
+        with self.lock:
+            with metrics.timer("ingest.categorize_ms"):
+                category_name = ClipboardHandler.categorize_content(content, self.categories)
+        if self.fallback_classifier:
+            category_name = self.fallback_classifier.categorize(content, category_name, self.categories)
+        metrics.ingest_stage(content, "categorized", category_name)
+        return category_name
+
+    def store_clip(self, category_name, content, transformed, selection=None):
+        """Adds a transformed clip to history and tells the listeners; returns False if it was dropped.
+        The event names the `selection` the clip came from, if any."""
+        item = finish_transform(content, transformed, category_name)
+        if item is None:
+            return False
+        with self.lock:
+            with metrics.timer("history.add_ms"):
+                self.store.add(category_name, item)
+            metrics.ingest_stage(item, "stored", category_name)
+            self.dirty = True
+            self._publish_collapsed()
+            event = {"event": "history", "op": "add", "args": [category_name, item]}
+            if selection:
+                event["selection"] = selection
+            self.publish(event)
+        return True
+
+    def _publish_collapsed(self):
+        """Sends the collapses made since the last call to every client, ahead of the edit that caused
+        them, so attached windows end up with the same history without deciding for themselves
+        (call with the lock held)."""
+        collapsed, self._collapsed = self._collapsed, []
+        for collapse in collapsed:
+            self.publish({"event": "history", "op": "absorb", "args": list(collapse)})
+
+    # --- Client Requests ---
+    def snapshot(self):
+        """Returns a copy of the categories for a newly attached client."""
+        with self.lock:
+            return {
+                cat_name: {
+                    "rules": list(cat_data.get("rules", [])),
+                    "history": list(cat_data.get("history", [])),
+                    "pinned_history": list(cat_data.get("pinned_history", [])),
+                    "added_at": dict(cat_data.get("added_at", {})),
+                    "versions": dict(cat_data.get("versions", {})),
+                    "collapse_near_duplicates": bool(cat_data.get("collapse_near_duplicates", False)),
+                }
+                for cat_name, cat_data in self.categories.items()
+            }
+
+    def apply_op(self, op, args, origin=None):
+        """Applies a HistoryStore operation sent by a client and forwards it to the others."""
+        if op not in HISTORY_OPS:
+            raise RequestError(f"Unknown history operation '{op}'")
+        with self.lock:
+            try:
+                result = getattr(self.store, op)(*args)
+            except TypeError as e:
+                raise RequestError(f"Bad arguments for '{op}': {e}")
+            self.dirty = True
+            self._publish_collapsed()
+            self.publish({"event": "history", "op": op, "args": args}, origin)
+        if op == "move" and self.fallback_classifier and result[1]:
+            self.fallback_classifier.relabel(*args) # Learn from the correction
+        return result
+
+    def sync_config(self, rules_by_category, origin=None, options=None):
+        """Makes the category list, rules and per-category options match a client's
+        (history is left to history ops)."""
+        with self.lock:
+            for cat_name in list(self.categories):
+                if cat_name not in rules_by_category and cat_name != "Uncategorized":
+                    del self.categories[cat_name]
+                    self.search_index.remove_category(cat_name)
+                    self.near_duplicates.remove_category(cat_name)
+                    if self.fallback_classifier:
+                        self.fallback_classifier.remove_category(cat_name)
+                    self.archive.remove_category(cat_name)
+            for cat_name, rules in rules_by_category.items():
+                cat_data = self.categories.setdefault(cat_name, {"rules": [], "history": [], "pinned_history": []})
+                cat_data["rules"] = list(rules)
+            for cat_name, cat_options in (options or {}).items():
+                if cat_name in self.categories and isinstance(cat_options, dict):
+                    self.categories[cat_name]["collapse_near_duplicates"] = bool(cat_options.get("collapse_near_duplicates", False))
+            self.store.prepare_near_duplicates() # Categories just switched to collapsing
+            self.dirty = True
+            rules_now = {cat_name: list(cat_data.get("rules", [])) for cat_name, cat_data in self.categories.items()}
+            options_now = {cat_name: {"collapse_near_duplicates": bool(cat_data.get("collapse_near_duplicates", False))}
+                           for cat_name, cat_data in self.categories.items()}
+            self.publish({"event": "config", "rules": rules_now, "options": options_now}, origin)
+        return True
+
+    def copy(self, message):
+        """Writes a client's Copy to the clipboard, so the monitor knows it is not a new clip.
+        `category` and `item` name the history item it came from, if any."""
+        text = message.get("text")
+        if not isinstance(text, str) or not text:
+            raise RequestError("'text' must be a non-empty string")
+        context = None
+        if isinstance(message.get("category"), str) and isinstance(message.get("item"), str):
+            context = (message["category"], message["item"])
+        try:
+            self.handler.write(text, context)
+        except Exception as e:
+            raise RequestError(f"Could not write to the clipboard: {e}")
+        return True
+
+    def handle(self, command, message, connection):
+        """Serves one client request; returns the result or raises RequestError."""
+        if command == "snapshot":
+            with self.lock:
+                if message.get("subscribe") and connection is not None:
+                    # Under the same lock as the snapshot: every later change reaches the client as an event
+                    connection.subscribed = True
+                return {"categories": self.snapshot()}
+        if command == "op":
+            return self.apply_op(message.get("op"), list(message.get("args", [])), connection)
+        if command == "sync_config":
+            rules = message.get("rules")
+            if not isinstance(rules, dict):
+                raise RequestError("'rules' must map category names to rule lists")
+            return self.sync_config(rules, connection, message.get("options"))
+        if command == "save":
+            return self.save()
+        if command == "copy":
+            return self.copy(message)
+        return self.api.handle(command, message, connection)
+
+# --- Server ---
+class ClientConnection:
+    """One connected client; outgoing messages are queued and written by a dedicated thread."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.subscribed = False
+        self.authenticated = False
+        self.closed = threading.Event()
+        self._outbound = queue.Queue(maxsize=OUTBOUND_QUEUE_LIMIT)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def send(self, message):
+        """Queues a message without blocking; a client that stops reading is disconnected."""
+        if self.closed.is_set():
+            return
+        try:
+            self._outbound.put_nowait(message)
+        except queue.Full:
+            print("Disconnecting a client that stopped reading.")
+            self.close()
+
+    def _write_loop(self):
+        while not self.closed.is_set():
+            try:
+                message = self._outbound.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.sock.sendall(ipc_protocol.encode_message(message))
+            except OSError:
+                self.close()
+
+    def close(self):
+        if not self.closed.is_set():
+            self.closed.set()
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+class DaemonServer:
+    """Accepts local clients and dispatches their JSON-lines requests to a service object.
+    The service implements handle(command, message, connection)."""
+
+    def __init__(self, service, path=None):
+        self.service = service
+        self.path = path or ipc_protocol.default_socket_path()
+        self.token = None
+        self.connections = []
+        self._lock = threading.Lock()
+        self._server_socket = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Starts listening in a background thread."""
+        self._server_socket, self.token = ipc_protocol.create_server_socket(self.path)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Listening for clients on {self.path}")
+
+    def stop(self):
+        """Closes the listening socket and every client connection."""
+        self._stopped.set()
+        try:
+            self._server_socket.close()
+        except Exception:
+            pass
+        with self._lock:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.close()
+        ipc_protocol.remove_server_address(self.path)
+
+    def broadcast(self, event, origin=None):
+        """Sends an event to every subscribed client except the one that caused it."""
+        with self._lock:
+            connections = [c for c in self.connections if c.subscribed and c is not origin]
+        for connection in connections:
+            connection.send(event)
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self._server_socket.accept()
+            except OSError:
+                return # Socket closed by stop()
+            connection = ClientConnection(sock)
+            connection.authenticated = self.token is None
+            with self._lock:
+                self.connections.append(connection)
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        """Reads requests from one client until it disconnects."""
+        try:
+            with connection.sock.makefile("rb") as sock_file:
+                for message in ipc_protocol.read_messages(sock_file):
+                    self._dispatch(connection, message)
+        except (OSError, ValueError) as e:
+            if not connection.closed.is_set():
+                print(f"Client connection error: {e}")
+        finally:
+            connection.close()
+            with self._lock:
+                if connection in self.connections:
+                    self.connections.remove(connection)
+
+    def _dispatch(self, connection, message):
+        request_id = message.get("id") if isinstance(message, dict) else None
+        command = message.get("cmd") if isinstance(message, dict) else None
+        try:
+            if command == "hello":
+                if self.token is not None and message.get("token") != self.token:
+                    raise RequestError("Invalid token")
+                connection.authenticated = True
+                result = {"protocol": ipc_protocol.PROTOCOL_VERSION}
+            elif not connection.authenticated:
+                raise RequestError("Send 'hello' with the access token first")
+            elif command == "ping":
+                result = "pong"
+            elif command == "subscribe":
+                connection.subscribed = True
+                result = True
+            else:
+                result = self.service.handle(command, message, connection)
+            connection.send({"id": request_id, "ok": True, "result": result})
+        except RequestError as e:
+            connection.send({"id": request_id, "ok": False, "error": str(e)})
+        except Exception as e:
+            print(f"Error handling '{command}' request: {e}")
+            connection.send({"id": request_id, "ok": False, "error": f"Internal error: {e}"})
+
+# --- Entry Point ---
+def run_daemon(path=None, backend=None, selection_backends=()):
+    """Runs the headless core and its socket server until interrupted."""
+    core = ClipboardCore(backend=backend, selection_backends=selection_backends)
+    server = DaemonServer(core, path)
+    core.add_listener(server.broadcast)
+    server.start()
+    core.start()
+    print("Clipboard daemon running. Press Ctrl+C to stop.")
+
+    stop_event = threading.Event()
+    def request_stop(signum, frame):
+        stop_event.set()
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, request_stop)
+    while not stop_event.wait(0.5):
+        pass
+
+    print("Stopping clipboard daemon...")
+    server.stop()
+    core.stop()
+
+if __name__ == "__main__":
+    run_daemon()
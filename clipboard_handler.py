@@ -1,36 +1,235 @@
-import clipboard
+import concurrent.futures
+import hashlib
+import queue
 import threading
 import time
 import re
 
+from metrics import registry as metrics
+from clipboard_backends import SystemClipboardBackend, ClipboardEmpty
+
+POLL_INTERVAL_S = 0.5 # Time between clipboard reads
+ECHO_WINDOW_S = 5.0 # How long a write made by the app itself is recognized when the monitor reads it back
+MAX_PENDING_ECHOES = 16 # Own writes remembered at once; older ones are forgotten
+READ_TIMEOUT_S = 2.0 # Longest the monitor waits for one clipboard read
+READ_ABANDON_S = 30.0 # A read hung this long gets its reader thread replaced
+WATCHDOG_INTERVAL_S = 5.0 # How often the watchdog checks the monitor thread
+MONITOR_STALL_S = 30.0 # A monitor loop silent this long (at least 4 polls) is restarted
+SELECTION_SETTLE_S = 0.6 # A selection (e.g. PRIMARY) must stay unchanged this long before it is ingested
+SELECTION_MIN_INTERVAL_S = 1.0 # Least time between two clips taken from the same selection
+DUPLICATE_WINDOW_S = 10.0 # Text seen on one source is not ingested again from another within this time
+
+def _fingerprint(text):
+    """Identifies clipboard text regardless of the line endings the clipboard may have converted."""
+    normalized = text.replace("\r\n", "\n").encode("utf-8", errors="replace")
+    return len(normalized), hashlib.blake2b(normalized, digest_size=16).digest()
+
+class ClipboardReadTimeout(Exception):
+    """Raised when the clipboard owner does not answer a read in time."""
+
+class GuardedReader:
+    """Runs backend reads on a dedicated daemon thread and waits at most `timeout` for each,
+    so a hung clipboard owner cannot block the caller. While a read is hung no other read is
+    queued behind it; after READ_ABANDON_S its thread is left behind and a new one is started."""
+
+    def __init__(self, backend, timeout=READ_TIMEOUT_S):
+        self.backend = backend
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._inflight = None # Future of the latest read
+        self._inflight_since = 0.0
+        self._requests = None
+        self._start_thread()
+
+    def _start_thread(self):
+        self._requests = queue.Queue()
+        threading.Thread(target=self._run, args=(self._requests,), daemon=True, name="clipboard-read").start()
+
+    def _run(self, requests):
+        while True:
+            future = requests.get()
+            if future is None:
+                return # Replaced by a new reader thread
+            try:
+                future.set_result(self.backend.read())
+            except BaseException as e:
+                future.set_exception(e)
+
+    def read(self):
+        """Returns the clipboard content; raises ClipboardEmpty, ClipboardReadTimeout or the backend's error."""
+        return self.wait(self.start(), time.monotonic() + self.timeout)
+
+    def start(self):
+        """Starts a read and returns its Future; raises ClipboardReadTimeout if the previous one is hung."""
+        with self._lock:
+            if self._inflight is not None and not self._inflight.done():
+                if time.monotonic() - self._inflight_since < READ_ABANDON_S:
+                    metrics.inc("monitor.reads_skipped")
+                    raise ClipboardReadTimeout("the previous clipboard read has not returned yet")
+                metrics.inc("monitor.readers_abandoned")
+                print(f"Clipboard read hung for over {READ_ABANDON_S:.0f} s; starting a new reader thread.")
+                self._requests.put(None) # The old thread exits if its read ever returns
+                self._start_thread()
+            future = concurrent.futures.Future()
+            self._inflight = future
+            self._inflight_since = time.monotonic()
+            self._requests.put(future)
+        return future
+
+    def wait(self, future, deadline):
+        """The result of a started read, waiting until `deadline` (time.monotonic()) at the latest."""
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except concurrent.futures.TimeoutError:
+            metrics.inc("monitor.read_timeouts")
+            raise ClipboardReadTimeout(f"clipboard read took longer than {self.timeout:.1f} s")
+
+class ClipboardSource:
+    """One watched clipboard or selection: its backend, its reader and the last value it showed."""
+
+    def __init__(self, backend, settle_s=0.0, min_interval_s=0.0):
+        """`settle_s`: how long a new value must stay unchanged before it is ingested (values replaced
+        sooner, like a selection growing during a mouse drag, are never ingested).
+        `min_interval_s`: least time between two clips from this source."""
+        self.backend = backend
+        self.name = getattr(backend, "name", "clipboard")
+        self.reader = GuardedReader(backend)
+        self.settle_s = settle_s
+        self.min_interval_s = min_interval_s
+        self.recent_value = ""
+        self.last_emitted_at = 0.0
+        self.timeouts_in_a_row = 0
+
+class ClipStream:
+    """Merges the changes of several sources into one time-ordered stream of clips, each tagged
+    with the source that showed it first. Text already taken from another source is dropped,
+    and a selection's value is held until it settles."""
+
+    def __init__(self):
+        self.pending = [] # [{"text", "source", "detected_at", "changed_at"}], oldest detection first
+        self.last_text = None
+        self.last_source = None
+        self.last_emitted_at = 0.0
+
+    def offer(self, source, text, now):
+        """Records a new value seen on a source."""
+        for entry in self.pending:
+            if entry["text"] == text:
+                return # Already waiting, seen first on another source
+        if source.settle_s:
+            for entry in self.pending:
+                if entry["source"] is source:
+                    # The selection changed again before it settled; only its final value counts
+                    entry["text"] = text
+                    entry["changed_at"] = now
+                    metrics.inc(f"monitor.{source.name}.superseded")
+                    return
+        self.pending.append({"text": text, "source": source, "detected_at": now, "changed_at": now})
+
+    def ready(self, now):
+        """Removes and returns the [(text, source)] that may be ingested now, in detection order.
+        An entry still settling (or rate limited) holds back the ones detected after it."""
+        ready = []
+        while self.pending:
+            entry = self.pending[0]
+            source = entry["source"]
+            if now - entry["changed_at"] < source.settle_s or now - source.last_emitted_at < source.min_interval_s:
+                break
+            self.pending.pop(0)
+            if (entry["text"] == self.last_text and source is not self.last_source
+                    and now - self.last_emitted_at < DUPLICATE_WINDOW_S):
+                metrics.inc("monitor.duplicates") # e.g. text selected (PRIMARY) and then copied (CLIPBOARD)
+                continue
+            source.last_emitted_at = now
+            self.last_text, self.last_source, self.last_emitted_at = entry["text"], source, now
+            ready.append((entry["text"], source))
+        return ready
+
 class ClipboardHandler:
     """Monitors the system clipboard and categorizes new content based on rules."""
 
-    def __init__(self, categories_ref, process_callback):
-        """Initializes the handler with category data and a processing callback."""
+    def __init__(self, categories_ref, process_callback, backend=None, poll_interval=POLL_INTERVAL_S, echo_callback=None,
+                 selection_backends=()):
+        """Initializes the handler with category data and a processing callback.
+        `process_callback(text, selection)` gets each new clip; `selection` names the selection it
+        came from, or is None for the clipboard itself.
+        `backend` defaults to the system clipboard; tests and the load harness pass a fake one.
+        `echo_callback(text, context)` is called instead of `process_callback` for text the app
+        wrote itself through write(). `selection_backends` are watched too (e.g. the Linux PRIMARY
+        selection), with settle and rate limits; their clips join the same stream."""
         self.categories = categories_ref
         self.process_callback = process_callback # Function to call in main thread
+        self.echo_callback = echo_callback
+        self._own_writes = {} # {fingerprint: (written at, context)} of writes not yet read back
+        self._own_writes_lock = threading.Lock()
+        self.backend = backend or SystemClipboardBackend()
+        # Each source is read with a timeout, off the monitor thread
+        self.sources = [ClipboardSource(self.backend)] + [
+            ClipboardSource(selection_backend, SELECTION_SETTLE_S, SELECTION_MIN_INTERVAL_S)
+            for selection_backend in selection_backends]
+        self.reader = self.sources[0].reader
+        self.stream = ClipStream()
+        self.poll_interval = poll_interval
         self.stop_monitoring = threading.Event()
         self.monitor_thread = None
-        self.recent_value = self._get_initial_clipboard()
+        self.watchdog_thread = None
+        self.monitor_generation = 0 # Bumped on each (re)start; older loops exit when they notice
+        self.last_heartbeat = time.monotonic() # Set by the monitor loop on every poll
+        self.profile_request = None # ThreadProfileRequest set by runtime_profiler while profiling
+        for source in self.sources:
+            source.recent_value = self._get_initial_clipboard(source=source)
+
+    @property
+    def recent_value(self):
+        """Last value seen on the clipboard itself (not on the extra selections)."""
+        return self.sources[0].recent_value
 
-    def _get_initial_clipboard(self):
-        """Safely retrieves the initial clipboard content."""
+    @recent_value.setter
+    def recent_value(self, value):
+        self.sources[0].recent_value = value
+
+    def _get_initial_clipboard(self, default="", source=None):
+        """Safely retrieves the initial clipboard (or `source`) content; `default` if the read times out."""
         try:
-            value = clipboard.paste()
+            value = (source or self.sources[0]).reader.read()
             return value if isinstance(value, str) else ""
+        except ClipboardEmpty:
+            return ""
+        except ClipboardReadTimeout as e:
+            print(f"Initial clipboard access timed out: {e}")
+            return default
         except Exception as e:
             print(f"Initial clipboard access failed: {e}")
             return ""
 
     # --- Monitoring Control ---
     def start_monitoring(self):
-        """Starts the background thread to monitor clipboard changes."""
+        """Starts the background thread to monitor clipboard changes, and the watchdog restarting it."""
         if self.monitor_thread is None or not self.monitor_thread.is_alive():
             self.stop_monitoring.clear()
-            self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-            self.monitor_thread.start()
+            self._start_monitor_thread()
             print("Clipboard monitor thread started.")
+        if self.watchdog_thread is None or not self.watchdog_thread.is_alive():
+            self.watchdog_thread = threading.Thread(target=self._watchdog_loop, daemon=True, name="clipboard-watchdog")
+            self.watchdog_thread.start()
+
+    def _start_monitor_thread(self):
+        self.monitor_generation += 1
+        self.last_heartbeat = time.monotonic()
+        self.monitor_thread = threading.Thread(target=self._monitor_loop, args=(self.monitor_generation,), daemon=True)
+        self.monitor_thread.start()
+
+    def _watchdog_loop(self):
+        """Restarts the monitor thread if it died or stopped polling (e.g. stuck in a callback)."""
+        while not self.stop_monitoring.wait(WATCHDOG_INTERVAL_S):
+            stall_limit = max(MONITOR_STALL_S, self.poll_interval * 4)
+            silent_for = time.monotonic() - self.last_heartbeat
+            if self.monitor_thread.is_alive() and silent_for < stall_limit:
+                continue
+            reason = f"stalled for {silent_for:.0f} s" if self.monitor_thread.is_alive() else "stopped unexpectedly"
+            metrics.inc("monitor.restarts")
+            print(f"Clipboard monitor {reason}; restarting it.")
+            self._start_monitor_thread()
 
     def stop(self):
         """Signals the monitoring thread to stop."""
@@ -43,35 +242,129 @@ class ClipboardHandler:
             self.monitor_thread.join(timeout=timeout)
             print("Clipboard monitor thread joined.")
 
+    # --- Writes by the App ---
+    def write(self, text, context=None):
+        """Puts text on the clipboard on behalf of the app (e.g. a Copy button). When the monitor
+        reads it back, it calls echo_callback(text, context) instead of treating it as a new clip."""
+        if text == self.recent_value:
+            # The clipboard will not change, so the monitor would never see it
+            self.backend.write(text)
+            if self.echo_callback:
+                self.echo_callback(text, context)
+            return
+        fingerprint = _fingerprint(text)
+        now = time.monotonic()
+        with self._own_writes_lock:
+            for key, (written_at, _) in list(self._own_writes.items()):
+                if now - written_at > ECHO_WINDOW_S:
+                    del self._own_writes[key]
+            while len(self._own_writes) >= MAX_PENDING_ECHOES:
+                del self._own_writes[next(iter(self._own_writes))] # Oldest first (dicts keep insertion order)
+            self._own_writes[fingerprint] = (now, context)
+        try:
+            self.backend.write(text)
+        except Exception:
+            with self._own_writes_lock:
+                self._own_writes.pop(fingerprint, None)
+            raise
+
+    def _take_own_write(self, text):
+        """Returns (True, context) and forgets the registration if text was written by write()."""
+        with self._own_writes_lock:
+            if not self._own_writes:
+                return False, None
+            registration = self._own_writes.pop(_fingerprint(text), None)
+        if registration is None or time.monotonic() - registration[0] > ECHO_WINDOW_S:
+            return False, None
+        return True, registration[1]
+
     # --- Background Monitoring Loop ---
-    def _monitor_loop(self):
-        """Continuously checks the clipboard for new string content."""
-        while not self.stop_monitoring.is_set():
+    def _read_sources(self):
+        """Reads every source at the same time, so a slow one does not delay the others.
+        Returns [(source, value, error)]."""
+        started_at = time.monotonic()
+        started = []
+        for source in self.sources:
             try:
-                current_value = clipboard.paste()
-
-                # Only process strings
-                if not isinstance(current_value, str):
-                    time.sleep(0.5)
+                started.append((source, source.reader.start(), None))
+            except ClipboardReadTimeout as e:
+                started.append((source, None, e))
+        results = []
+        for source, future, error in started:
+            if error is None:
+                try:
+                    results.append((source, source.reader.wait(future, started_at + source.reader.timeout), None))
                     continue
+                except Exception as e:
+                    error = e
+            results.append((source, None, error))
+        return results
+
+    def _observe(self, source, current_value, now):
+        """Handles a value read from a source: ignored if unchanged, passed to echo_callback if the
+        app wrote it, otherwise offered to the clip stream."""
+        # Only process strings
+        if not isinstance(current_value, str) or not current_value or current_value == source.recent_value:
+            return
+        source.recent_value = current_value
+        if source is self.sources[0]:
+            is_own_write, context = self._take_own_write(current_value)
+            if is_own_write:
+                # Our own copy-back: the history already has it, so skip the ingest pipeline
+                metrics.inc("monitor.echoes")
+                if self.echo_callback:
+                    self.echo_callback(current_value, context)
+                return
+        self.stream.offer(source, current_value, now)
+
+    def _monitor_loop(self, generation):
+        """Continuously checks the clipboard for new string content, until stopped or replaced by the watchdog."""
+        active_profile_request = None
+        while not self.stop_monitoring.is_set() and generation == self.monitor_generation:
+            self.last_heartbeat = time.monotonic()
+            # cProfile only sees the thread that enabled it, so profiling is switched on and off here
+            if self.profile_request is not active_profile_request:
+                if active_profile_request:
+                    active_profile_request.stop()
+                active_profile_request = self.profile_request
+                if active_profile_request:
+                    active_profile_request.start()
+            with metrics.timer("monitor.read_ms"):
+                results = self._read_sources()
+            metrics.inc("monitor.polls")
+            if generation != self.monitor_generation:
+                break # Replaced while the reads were pending; the new loop handles the clipboard
 
-                if current_value != self.recent_value and current_value:
-                    self.recent_value = current_value
-                    # Schedule processing in the main thread via the callback
-                    self.process_callback(current_value)
+            now = time.monotonic()
+            for source, current_value, error in results:
+                if error is None:
+                    source.timeouts_in_a_row = 0
+                    self._observe(source, current_value, now)
+                elif isinstance(error, ClipboardEmpty):
+                    # Handle case where clipboard becomes empty
+                    source.recent_value = ""
+                elif isinstance(error, ClipboardReadTimeout):
+                    # Another application holds the clipboard; keep the last value and try again next poll
+                    source.timeouts_in_a_row += 1
+                    if source.timeouts_in_a_row == 1:
+                        print(f"Clipboard ({source.name}) not responding: {error}")
+                else:
+                    # Log errors but keep monitoring
+                    metrics.inc("monitor.errors")
+                    print(f"Error reading clipboard ({source.name}) in monitor loop: {error}")
+                    # Reset recent value to prevent potential issues with problematic content
+                    source.recent_value = self._get_initial_clipboard(default=source.recent_value, source=source) # Re-fetch safely
 
-            except clipboard.ClipboardEmpty:
-                # Handle case where clipboard becomes empty
-                if self.recent_value != "":
-                    self.recent_value = ""
-            except Exception as e:
-                # Log errors but keep monitoring
-                print(f"Error reading clipboard in monitor loop: {e}")
-                # Reset recent value to prevent potential issues with problematic content
-                self.recent_value = self._get_initial_clipboard() # Re-fetch safely
+            for text, source in self.stream.ready(now):
+                metrics.inc(f"monitor.{source.name}.clips") # The stream's source tag
+                metrics.ingest_detected(text)
+                # Schedule processing in the main thread via the callback
+                self.process_callback(text, None if source is self.sources[0] else source.name)
 
-            time.sleep(0.5) # Polling interval
+            self.stop_monitoring.wait(self.poll_interval) # Polling interval (returns early on stop)
 
+        if active_profile_request:
+            active_profile_request.stop()
         print("Clipboard monitor loop finished.")
 
     # --- Content Categorization ---
@@ -6,6 +6,9 @@ to a JSON file. Provides default settings if the file is missing or corrupted.
 
 import json
 import os
+import time
+
+from metrics import registry as metrics
 
 CONFIG_FILE = "clipboard_manager_config.json"
 
@@ -34,8 +37,14 @@ def load_config():
                 categories[cat] = {
                     "rules": data.get("rules", []),
                     "history": data.get("history", []),
-                    "pinned_history": data.get("pinned_history", [])
+                    "pinned_history": data.get("pinned_history", []),
+                    "added_at": data.get("added_at", {}) if isinstance(data.get("added_at"), dict) else {},
+                    "transforms": data.get("transforms", []) if isinstance(data.get("transforms"), list) else [],
+                    "collapse_near_duplicates": bool(data.get("collapse_near_duplicates", False)),
+                    "versions": data.get("versions", {}) if isinstance(data.get("versions"), dict) else {}
                 }
+                if data.get("fallback_classifier"):
+                    categories[cat]["fallback_classifier"] = True # Only meaningful on Uncategorized
             else:
                 print(f"Warning: Malformed entry for category '{cat}' in config. Resetting.")
                 categories[cat] = {"rules": [], "history": [], "pinned_history": []}
@@ -71,18 +80,33 @@ def save_config(categories_data):
     """Saves the provided categories data (rules and history) to the JSON file."""
     data_to_save = {}
     for cat_name, cat_data in categories_data.items():
-        # Ensure only serializable data (rules, history, pinned_history) is saved
+        # Ensure only serializable data (rules, transforms, options, history, pinned_history, added_at, versions) is saved
+        history = cat_data.get("history", [])
+        pinned_history = cat_data.get("pinned_history", [])
+        added_at = cat_data.get("added_at", {})
+        versions = cat_data.get("versions", {})
         data_to_save[cat_name] = {
             "rules": cat_data.get("rules", []),
-            "history": cat_data.get("history", []),
-            "pinned_history": cat_data.get("pinned_history", [])
+            "transforms": cat_data.get("transforms", []),
+            "collapse_near_duplicates": bool(cat_data.get("collapse_near_duplicates", False)),
+            "history": history,
+            "pinned_history": pinned_history,
+            # Only keep timestamps of items still in the history
+            "added_at": {item: added_at[item] for item in pinned_history + history if item in added_at},
+            "versions": {item: versions[item] for item in pinned_history + history if versions.get(item, 1) > 1}
         }
+        if cat_data.get("fallback_classifier"):
+            data_to_save[cat_name]["fallback_classifier"] = True
 
+    start_time = time.perf_counter()
     try:
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(data_to_save, f, indent=4, ensure_ascii=False)
+        metrics.observe("config.save_ms", (time.perf_counter() - start_time) * 1000)
+        metrics.ingest_persisted()
         print(f"Configuration saved to {CONFIG_FILE}")
         return True # Success
     except Exception as e:
+        metrics.inc("config.save_errors")
         print(f"Error saving configuration to {CONFIG_FILE}: {e}")
         return False # Failure
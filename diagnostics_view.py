@@ -0,0 +1,77 @@
+# diagnostics_view.py
+"""
+Diagnostics window: one tab per report section, each refreshed periodically while visible.
+Sections are (title, provider) pairs, where the provider returns the text to display.
+"""
+
+import customtkinter as ctk
+
+REFRESH_INTERVAL_MS = 1000 # How often the visible section is refreshed
+
+class DiagnosticsWindow(ctk.CTkToplevel):
+    """Top-level window showing live diagnostic reports."""
+
+    def __init__(self, master, sections, actions=None):
+        """`sections` is a list of (title, provider); `actions` an optional list of (button text, command)."""
+        super().__init__(master)
+        self.title("Diagnostics")
+        self.geometry("760x520")
+        self.sections = dict(sections)
+        self.textboxes = {}
+        self.refresh_after_id = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.tab_view = ctk.CTkTabview(self, command=self.refresh)
+        self.tab_view.grid(row=0, column=0, padx=10, pady=(10, 0), sticky="nsew")
+        for title, _ in sections:
+            tab = self.tab_view.add(title)
+            tab.grid_columnconfigure(0, weight=1)
+            tab.grid_rowconfigure(0, weight=1)
+            textbox = ctk.CTkTextbox(tab, font=ctk.CTkFont(family="Courier", size=12), wrap="none")
+            textbox.grid(row=0, column=0, sticky="nsew")
+            self.textboxes[title] = textbox
+
+        button_frame = ctk.CTkFrame(self, fg_color="transparent")
+        button_frame.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
+        ctk.CTkButton(button_frame, text="Refresh", width=90, command=self.refresh).pack(side="left", padx=(0, 5))
+        for text, command in actions or []:
+            ctk.CTkButton(button_frame, text=text, command=command).pack(side="left", padx=5)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self._refresh_loop()
+
+    def refresh(self):
+        """Re-renders the visible section."""
+        title = self.tab_view.get()
+        provider = self.sections.get(title)
+        if provider is None:
+            return
+        try:
+            text = provider()
+        except Exception as e:
+            text = f"Error building report: {e}"
+        textbox = self.textboxes[title]
+        scroll_position = textbox.yview()[0]
+        textbox.configure(state="normal")
+        textbox.delete("1.0", "end")
+        textbox.insert("1.0", text)
+        textbox.configure(state="disabled")
+        textbox.yview_moveto(scroll_position)
+
+    def show_section(self, title):
+        """Switches to a section and refreshes it."""
+        self.tab_view.set(title)
+        self.refresh()
+
+    def _refresh_loop(self):
+        self.refresh()
+        self.refresh_after_id = self.after(REFRESH_INTERVAL_MS, self._refresh_loop)
+
+    def close(self):
+        """Stops refreshing and destroys the window."""
+        if self.refresh_after_id:
+            self.after_cancel(self.refresh_after_id)
+            self.refresh_after_id = None
+        self.destroy()
@@ -0,0 +1,211 @@
+# fallback_classifier.py
+"""
+Learned fallback for clips that match no rule. A multinomial naive Bayes model over hashed
+character n-grams is trained on the categorized history (Uncategorized included, so clips that
+look like the ones nobody sorted stay there) and updated as clips arrive or are moved. It is
+only asked when the rules return Uncategorized, and its suggestion is used when its confidence
+reaches the threshold. Enabled by "fallback_classifier": true on the Uncategorized category.
+Needs NumPy; without it the rules alone decide. NumPy is only imported once the classifier is
+enabled, and callers only import this module then, so the default setup never loads it.
+"""
+
+import threading
+import time
+
+from metrics import registry as metrics
+
+UNCATEGORIZED = "Uncategorized"
+FEATURE_BITS = 16 # Hashed n-gram buckets = 2 ** FEATURE_BITS per category
+NGRAM_SIZES = (2, 3, 4) # Character n-gram lengths
+MAX_CLASSIFY_CHARS = 2000 # Only the start of large clips is looked at
+CONFIDENCE_THRESHOLD = 0.8 # Posterior probability needed to accept a suggestion
+MIN_TRAINING_ITEMS = 5 # Categories with fewer examples are never suggested
+SMOOTHING = 0.1 # Additive smoothing of the n-gram counts
+HASH_MULTIPLIER = 0x100000001B3 # FNV prime, combines characters into an n-gram hash
+HASH_MIX = 0x9E3779B97F4A7C15 # Fibonacci hashing constant, spreads n-gram hashes over the buckets
+
+np = None # NumPy, imported by _load_numpy()
+
+def _load_numpy():
+    """Imports NumPy on first use; returns False if it is not installed."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+def is_enabled(categories):
+    """True if the config asks for the fallback classifier and NumPy is installed (importing it)."""
+    return bool(categories.get(UNCATEGORIZED, {}).get("fallback_classifier")) and _load_numpy()
+
+def features(text):
+    """Hashed character n-grams of a text as (bucket indices, counts), or None if it is too short."""
+    codes = np.frombuffer(text[:MAX_CLASSIFY_CHARS].lower().encode("utf-32-le", errors="replace"), dtype=np.uint32).astype(np.uint64)
+    hashed = []
+    for size in NGRAM_SIZES:
+        count = len(codes) - size + 1
+        if count <= 0:
+            continue
+        ngram_hash = np.full(count, size, dtype=np.uint64)
+        for offset in range(size):
+            ngram_hash = ngram_hash * np.uint64(HASH_MULTIPLIER) + codes[offset:offset + count] # Wraps modulo 2**64
+        hashed.append((ngram_hash * np.uint64(HASH_MIX)) >> np.uint64(64 - FEATURE_BITS))
+    if not hashed:
+        return None
+    return np.unique(np.concatenate(hashed), return_counts=True)
+
+def history_examples(categories):
+    """(category, text) training pairs for every item in the history; call where the categories may be
+    touched, then train() on them anywhere."""
+    return [(category_name, item) for category_name, cat_data in categories.items()
+            for item in cat_data.get("pinned_history", []) + cat_data.get("history", [])]
+
+class FallbackClassifier:
+    """Naive Bayes over hashed n-grams; one row of counts per category."""
+
+    def __init__(self, threshold=CONFIDENCE_THRESHOLD):
+        if not _load_numpy():
+            raise ImportError("The fallback classifier needs NumPy")
+        self.threshold = threshold
+        self.category_names = [] # Row order of the arrays below
+        self.feature_counts = None # (categories, buckets) n-gram counts
+        self.feature_totals = None # (categories,) sum of each row
+        self.document_counts = None # (categories,) items learned per category
+        self.log_likelihoods = None # (categories, buckets) log P(n-gram | category), kept in step with the counts
+        self.ready = False # False until the first training finished
+        self._pending = [] # learn() calls made while training runs
+        self._removed = set() # Categories deleted while training runs, dropped from its result
+        self._lock = threading.Lock()
+
+    # --- Training ---
+    def train(self, items):
+        """Trains from scratch on (category, text) pairs; safe to run off the main thread."""
+        start_time = time.perf_counter()
+        category_names = sorted({category_name for category_name, _ in items})
+        rows = {category_name: row for row, category_name in enumerate(category_names)}
+        buckets = 1 << FEATURE_BITS
+        feature_counts = np.zeros((len(category_names), buckets))
+        document_counts = np.zeros(len(category_names))
+        for category_name, text in items:
+            extracted = features(text)
+            if extracted is None:
+                continue
+            indices, counts = extracted
+            feature_counts[rows[category_name], indices] += counts
+            document_counts[rows[category_name]] += 1
+        with self._lock:
+            # Categories deleted since the examples were collected must not come back
+            keep = [row for row, category_name in enumerate(category_names) if category_name not in self._removed]
+            self._removed = set()
+            category_names = [category_names[row] for row in keep]
+            feature_counts = feature_counts[keep]
+            document_counts = document_counts[keep]
+            self.category_names = category_names
+            self.feature_counts = feature_counts
+            self.feature_totals = feature_counts.sum(axis=1)
+            self.document_counts = document_counts
+            self.log_likelihoods = np.zeros_like(feature_counts)
+            for row in range(len(category_names)):
+                self._update_row(row)
+            self.ready = True
+            pending, self._pending = self._pending, []
+        for args in pending:
+            self.learn(*args)
+        metrics.observe("classifier.train_ms", (time.perf_counter() - start_time) * 1000)
+        print(f"Fallback classifier trained on {int(document_counts.sum())} items in {len(category_names)} categories.")
+
+    def _update_row(self, row):
+        buckets = self.feature_counts.shape[1]
+        self.log_likelihoods[row] = (np.log(self.feature_counts[row] + SMOOTHING)
+                                     - np.log(self.feature_totals[row] + SMOOTHING * buckets))
+
+    def _row_for(self, category_name):
+        """Row of a category, adding an empty one for a category seen for the first time."""
+        if category_name in self.category_names:
+            return self.category_names.index(category_name)
+        self.category_names.append(category_name)
+        buckets = self.feature_counts.shape[1]
+        self.feature_counts = np.vstack([self.feature_counts, np.zeros((1, buckets))])
+        self.feature_totals = np.append(self.feature_totals, 0.0)
+        self.document_counts = np.append(self.document_counts, 0.0)
+        self.log_likelihoods = np.vstack([self.log_likelihoods, np.zeros((1, buckets))])
+        return len(self.category_names) - 1
+
+    def learn(self, category_name, text, weight=1):
+        """Adds one item to a category's counts (a negative weight takes it back out)."""
+        extracted = features(text)
+        if extracted is None:
+            return
+        indices, counts = extracted
+        with self._lock:
+            if not self.ready:
+                self._pending.append((category_name, text, weight))
+                return
+            row = self._row_for(category_name)
+            self.feature_counts[row, indices] = np.maximum(self.feature_counts[row, indices] + weight * counts, 0)
+            self.feature_totals[row] = self.feature_counts[row].sum()
+            self.document_counts[row] = max(self.document_counts[row] + weight, 0)
+            self._update_row(row)
+
+    def relabel(self, source_category, destination_category, text):
+        """Moves an item's counts to another category, e.g. after the user dragged it there."""
+        if source_category == destination_category:
+            return
+        self.learn(source_category, text, -1)
+        self.learn(destination_category, text)
+
+    def remove_category(self, category_name):
+        """Forgets a deleted category, also when it is deleted while training runs."""
+        with self._lock:
+            if not self.ready:
+                self._removed.add(category_name)
+                self._pending = [args for args in self._pending if args[0] != category_name]
+                return
+            if category_name not in self.category_names:
+                return
+            row = self.category_names.index(category_name)
+            del self.category_names[row]
+            self.feature_counts = np.delete(self.feature_counts, row, axis=0)
+            self.feature_totals = np.delete(self.feature_totals, row)
+            self.document_counts = np.delete(self.document_counts, row)
+            self.log_likelihoods = np.delete(self.log_likelihoods, row, axis=0)
+
+    # --- Classification ---
+    def suggest(self, text):
+        """Returns (category, confidence) of the most likely category, or (None, 0.0) if there is no
+        model yet. Log-likelihoods are averaged per n-gram, so long clips are not overconfident."""
+        extracted = features(text)
+        with self._lock:
+            if not self.ready or extracted is None:
+                return None, 0.0
+            eligible = self.document_counts >= MIN_TRAINING_ITEMS
+            if eligible.sum() < 2:
+                return None, 0.0
+            indices, counts = extracted
+            log_priors = np.log(np.maximum(self.document_counts, 1) / self.document_counts.sum())
+            scores = log_priors + (self.log_likelihoods[:, indices] @ counts) / counts.sum()
+            scores[~eligible] = -np.inf
+            probabilities = np.exp(scores - scores.max())
+            probabilities /= probabilities.sum()
+            best = int(probabilities.argmax())
+            return self.category_names[best], float(probabilities[best])
+
+    def categorize(self, text, rule_category, known_categories=None):
+        """The category for a clip the rules put in `rule_category`: a confident suggestion when the
+        rules found nothing, the rule category otherwise. Rule matches are learned as examples.
+        A suggestion missing from `known_categories` (if given) is rejected."""
+        if rule_category != UNCATEGORIZED:
+            self.learn(rule_category, text)
+            return rule_category
+        with metrics.timer("classifier.suggest_ms"):
+            category_name, confidence = self.suggest(text)
+        if category_name is None or category_name == UNCATEGORIZED or confidence < self.threshold or \
+           (known_categories is not None and category_name not in known_categories):
+            metrics.inc("classifier.rejected")
+            self.learn(UNCATEGORIZED, text)
+            return UNCATEGORIZED
+        metrics.inc("classifier.accepted")
+        return category_name
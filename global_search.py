@@ -0,0 +1,147 @@
+# global_search.py
+"""
+Ranked fuzzy search across every category, pinned and normal history alike.
+Candidates are matched in batches over one joined text blob per batch, with a single anchored regex
+match per candidate item (so the per-item work happens in C); only the matched items are scored and
+the top results kept.
+"""
+
+import bisect
+import heapq
+import re
+
+GLOBAL_SEARCH_LIMIT = 100 # Max number of ranked results returned
+FUZZY_WEIGHT = 0.7 # Share of the final score coming from match quality
+RECENCY_WEIGHT = 0.3 # Share of the final score coming from position in history
+RECENCY_HALF_LIFE = 20 # History position at which the recency score drops to one half
+SEPARATOR = "\x00" # Joins items in the blob; never matched by the fuzzy pattern
+SCORING_BATCH_SIZE = 2000 # Rows matched per batch, between cancellation checks
+
+def build_fuzzy_pattern(query):
+    """Compiles a pattern matching the query's characters in order, within a single item.
+    Each gap (`[^c]*c`) stops at the next wanted character, so the match found is the leftmost
+    one and cannot backtrack past it. Meant to be anchored with `match()` (see _first_matches)."""
+    chars = [c for c in query.lower() if c != SEPARATOR and not c.isspace()]
+    if not chars:
+        return None
+    parts = [re.escape(chars[0])]
+    for c in chars[1:]:
+        parts.append(f"[^{re.escape(c)}{SEPARATOR}]*{re.escape(c)}")
+    return re.compile("".join(parts))
+
+def _first_matches(pattern, first_char, blob, offsets):
+    """Yields (item index, match) for each item of a joined blob that the fuzzy pattern matches.
+    Only the first occurrence of the query's first character is tried per item: if the rest of
+    the query does not follow it, it cannot follow a later one either. This keeps a batch to
+    about one pass over the blob, where an unanchored search would retry from every occurrence."""
+    item_count = len(offsets)
+    position = 0
+    while True:
+        start = blob.find(first_char, position)
+        if start < 0:
+            return
+        index = bisect.bisect_right(offsets, start) - 1
+        match = pattern.match(blob, start)
+        if match is not None:
+            yield index, match
+        if index + 1 >= item_count:
+            return
+        position = offsets[index + 1] # Skip the rest of this item
+
+def collect_rows(categories_data, matchers=None):
+    """Flattens all categories into (category, item, is_pinned, position) rows.
+    Position is the item's place in its list, used as a recency signal (0 = newest).
+    If `matchers` ({category: predicate or None}) is given, only rows passing their
+    category's (item, is_pinned) predicate are kept and categories mapped to None are skipped."""
+    rows = []
+    for cat_name, cat_data in categories_data.items():
+        matcher = matchers.get(cat_name) if matchers is not None else None
+        if matchers is not None and matcher is None:
+            continue
+        for position, item in enumerate(cat_data.get("pinned_history", [])):
+            if matcher is None or matcher(item, True):
+                rows.append((cat_name, str(item), True, position))
+        for position, item in enumerate(cat_data.get("history", [])):
+            if matcher is None or matcher(item, False):
+                rows.append((cat_name, str(item), False, position))
+    return rows
+
+def _match_score(query, text, start, end):
+    """Scores a fuzzy match between 0 and 1. Tighter and earlier matches score higher."""
+    span = max(end - start, 1)
+    score = min(len(query) / span, 1.0) * 0.6 # Compactness
+    if query in text:
+        score += 0.25 # Exact substring
+    if start == 0 or not text[start - 1].isalnum():
+        score += 0.15 # Starts at a word boundary
+    return score
+
+def _recency_score(is_pinned, position):
+    """Scores recency between 0 and 1. Pinned items always count as fresh."""
+    if is_pinned:
+        return 1.0
+    return RECENCY_HALF_LIFE / (RECENCY_HALF_LIFE + position)
+
+def rank_rows(rows, query, limit=GLOBAL_SEARCH_LIMIT, batch_size=SCORING_BATCH_SIZE, should_stop=None):
+    """Ranks rows against the query in batches, newest rows first.
+    Yields the current top `limit` results as (score, row) tuples, best first, after each batch,
+    so callers can show early results before the whole history has been scored.
+    An empty query ranks the rows by recency alone.
+    Stops without yielding further results once `should_stop` returns True."""
+    if not rows:
+        yield []
+        return
+    if build_fuzzy_pattern(query) is None:
+        ranked = sorted(rows, key=lambda row: _recency_score(row[2], row[3]), reverse=True)[:limit]
+        yield [(RECENCY_WEIGHT * _recency_score(row[2], row[3]), row) for row in ranked]
+        return
+    # Score the freshest rows first so the first batch already holds the likely winners
+    rows = sorted(rows, key=lambda row: (not row[2], row[3]))
+    batches = (rows[batch_start:batch_start + batch_size] for batch_start in range(0, len(rows), batch_size))
+    yield from rank_batches(batches, query, limit=limit, should_stop=should_stop)
+
+def rank_batches(batches, query, limit=GLOBAL_SEARCH_LIMIT, should_stop=None):
+    """Ranks rows arriving in batches (e.g. streamed from the archive) in their given order.
+    Only the current batch and the top `limit` results are held, so the rows never have to fit
+    in memory at once. Yields the current top results, best first, after each batch."""
+    pattern = build_fuzzy_pattern(query)
+    query = "".join(c for c in query.lower() if not c.isspace())
+    first_char = query.replace(SEPARATOR, "")[0] if pattern is not None else None
+    heap = [] # Min-heap of (score, row number, row) holding the current top results
+    row_number = 0
+
+    for batch in batches:
+        if should_stop and should_stop():
+            return
+        if pattern is None:
+            # No text to match: recency alone
+            matches = ((index, None) for index in range(len(batch)))
+        else:
+            # One lowercase blob per batch; offsets map a match position back to its row
+            lowered = [row[1].lower() for row in batch]
+            blob = SEPARATOR.join(lowered)
+            offsets = []
+            position = 0
+            for text in lowered:
+                offsets.append(position)
+                position += len(text) + 1
+            matches = _first_matches(pattern, first_char, blob, offsets)
+
+        for index, match in matches:
+            _, _, is_pinned, item_position = batch[index]
+            score = RECENCY_WEIGHT * _recency_score(is_pinned, item_position)
+            if match is not None:
+                item_start = offsets[index]
+                score += FUZZY_WEIGHT * _match_score(query, lowered[index], match.start() - item_start, match.end() - item_start)
+            entry = (score, row_number + index, batch[index])
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+        row_number += len(batch)
+
+        yield [(score, row) for score, _, row in sorted(heap, reverse=True)]
+
+def merge_ranked(*ranked_lists, limit=GLOBAL_SEARCH_LIMIT):
+    """Merges (score, row) lists ranked separately (e.g. hot history and archive) into one top list."""
+    return heapq.nlargest(limit, (entry for ranked in ranked_lists for entry in ranked), key=lambda entry: entry[0])
@@ -0,0 +1,288 @@
+# history_api.py
+"""
+Scripting API for the clipboard history, served over the local socket (see ipc_protocol.py).
+Commands: list, search, get, add, pin, unpin, move, delete and batch. Both the daemon and the
+standalone window serve it. The owner supplies a `run(fn)` that executes fn where the history may
+be touched (under the daemon's lock, or on the Tk thread). Only the snapshot and the edits run
+there; filtering, ranking and paging happen on the connection's own thread. Searches and
+`list` with `archived: true` also read the on-disk archive of trimmed items, a batch at a time,
+and `delete` hides items there too.
+Added items go through the same categorization and transforms as copied ones.
+"""
+
+import itertools
+
+from global_search import collect_rows, rank_rows, rank_batches, merge_ranked
+from history_archive import archive_rows
+from query_planner import parse_query, build_matcher
+from ipc_protocol import RequestError
+
+DEFAULT_PAGE_SIZE = 100 # Items per page (or per streamed chunk) when the request does not say
+MAX_PAGE_SIZE = 1000 # Largest accepted page or chunk
+MAX_SEARCH_RESULTS = 5000 # Ranked results kept per search
+MAX_BATCH_REQUESTS = 1000 # Sub-requests accepted in one batch
+MAX_ADD_ITEMS = 10000 # Items accepted in one add request
+
+class HistoryApi:
+    """Serves scripting requests against a categories dictionary owned by someone else."""
+
+    def __init__(self, categories, run, categorize, transform_many, store_clip, apply_op, archive=None):
+        """`run(fn)` calls fn in the owner's context and returns its result.
+        `categorize(text)` returns a category, `store_clip(category, text, transformed)` adds one item
+        and `apply_op(op, args)` runs a HistoryStore edit; these are only called inside `run`.
+        `transform_many([(category, text)])` applies the category transforms and is called outside it.
+        `archive` is the HistoryArchive holding trimmed items, if any."""
+        self.categories = categories
+        self.run = run
+        self.categorize = categorize
+        self.transform_many = transform_many
+        self.store_clip = store_clip
+        self.apply_op = apply_op
+        self.archive = archive
+
+    def handle(self, command, message, connection):
+        """Serves one request; returns the result or raises RequestError."""
+        handler = getattr(self, f"_cmd_{command}", None) if isinstance(command, str) else None
+        if handler is None:
+            raise RequestError(f"Unknown command '{command}'")
+        return handler(message, connection)
+
+    @staticmethod
+    def _category(message, key="category"):
+        """The category name in a request field, which must be given."""
+        cat_name = message.get(key)
+        if not isinstance(cat_name, str) or not cat_name:
+            raise RequestError(f"'{key}' is required")
+        return cat_name
+
+    # --- Reads ---
+    def _snapshot(self, category_name=None):
+        """Shallow copies of the lists, taken in the owner's context."""
+        def take():
+            names = [category_name] if category_name else list(self.categories)
+            snapshot = {}
+            for cat_name in names:
+                if cat_name not in self.categories:
+                    raise RequestError(f"Unknown category '{cat_name}'")
+                cat_data = self.categories[cat_name]
+                snapshot[cat_name] = {"history": list(cat_data.get("history", [])),
+                                      "pinned_history": list(cat_data.get("pinned_history", [])),
+                                      "added_at": dict(cat_data.get("added_at", {})),
+                                      "versions": dict(cat_data.get("versions", {}))}
+            return snapshot
+        return self.run(take)
+
+    @staticmethod
+    def _item(snapshot, cat_name, text, is_pinned, position, score=None):
+        hot_length = len(snapshot[cat_name]["history"])
+        archived = not is_pinned and position >= hot_length # Archive positions continue after the hot history
+        item = {"category": cat_name, "text": text, "pinned": is_pinned, "position": position,
+                "added_at": snapshot[cat_name]["added_at"].get(text), "archived": archived,
+                "versions": snapshot[cat_name]["versions"].get(text, 1)}
+        if score is not None:
+            item["score"] = round(score, 4)
+        return item
+
+    def _archived_batches(self, snapshot, parsed_query):
+        """Streams archived rows of the snapshot's categories passing the query's filters (not its text),
+        one category after the other; only one batch is decoded at a time."""
+        if self.archive is None:
+            return
+        for cat_name, cat_data in snapshot.items():
+            hot_items = set(cat_data["history"]) | set(cat_data["pinned_history"])
+            yield from archive_rows(self.archive, cat_name, parsed_query, start_position=len(cat_data["history"]),
+                                    include_text=False, exclude=hot_items)
+
+    def _cmd_list(self, message, connection):
+        """Items of one or all categories, pinned first then newest first; archived ones with `archived`."""
+        snapshot = self._snapshot(self._category(message) if message.get("category") is not None else None)
+        if message.get("archived"):
+            return self._list_archived(snapshot, message, connection)
+        pinned_filter = message.get("pinned")
+        rows = [row for row in collect_rows(snapshot) if pinned_filter is None or row[2] == bool(pinned_filter)]
+        items = [self._item(snapshot, *row) for row in rows]
+        return self._page(items, message, connection)
+
+    def _list_archived(self, snapshot, message, connection):
+        """Pages through archived items, newest first. The cursor counts archived records, so a page
+        seeks straight to it in the offset index instead of decoding the records before it. Records
+        hidden because they are back in the hot history or deleted are skipped but still counted in
+        `total` and the cursor, so a page can end early in a stream of hidden ones."""
+        limit, cursor = self._paging(message)
+        counts = [(cat_name, self.archive.count(cat_name) if self.archive is not None else 0) for cat_name in snapshot]
+        total = sum(count for _, count in counts)
+
+        def entries():
+            """(cursor after the item, item) from `cursor` on, across categories."""
+            first_record = 0 # Cursor of the category's newest archived record
+            for cat_name, count in counts:
+                skip = cursor - first_record
+                if skip < count:
+                    cat_data = snapshot[cat_name]
+                    hot_length = len(cat_data["history"])
+                    hot_items = set(cat_data["history"]) | set(cat_data["pinned_history"])
+                    for rows in archive_rows(self.archive, cat_name, parse_query(""), start_position=hot_length,
+                                             exclude=hot_items, skip=max(skip, 0)):
+                        for row in rows:
+                            yield first_record + row[3] - hot_length + 1, self._item(snapshot, *row)
+                first_record += count
+
+        if message.get("stream"):
+            if connection is None:
+                raise RequestError("Streaming is not available inside a batch")
+            sent, chunk = 0, []
+            for _, item in entries():
+                chunk.append(item)
+                if len(chunk) == limit:
+                    connection.send({"id": message.get("id"), "ok": True, "partial": chunk})
+                    sent, chunk = sent + len(chunk), []
+            if chunk:
+                connection.send({"id": message.get("id"), "ok": True, "partial": chunk})
+            return {"count": sent + len(chunk), "total": total}
+        page = list(itertools.islice(entries(), limit + 1))
+        next_cursor = page[limit - 1][0] if len(page) > limit else None
+        return {"items": [item for _, item in page[:limit]], "total": total, "next_cursor": next_cursor}
+
+    def _cmd_search(self, message, connection):
+        """Ranked search using the same query syntax as the global search box."""
+        parsed_query = parse_query(str(message.get("query", "")))
+        if parsed_query.errors:
+            raise RequestError(parsed_query.errors[0])
+        snapshot = self._snapshot()
+        matchers = None
+        if parsed_query.has_filters:
+            matchers = {cat_name: build_matcher(parsed_query, cat_name, cat_data, include_text=False)
+                        for cat_name, cat_data in snapshot.items()}
+        # The hot history and the archive are ranked separately, then merged; the archive is
+        # streamed through the ranking so only its top results are kept
+        hot_results = []
+        for hot_results in rank_rows(collect_rows(snapshot, matchers), parsed_query.text, limit=MAX_SEARCH_RESULTS):
+            pass # Only the final ranking is used
+        archived_results = []
+        for archived_results in rank_batches(self._archived_batches(snapshot, parsed_query), parsed_query.text,
+                                             limit=MAX_SEARCH_RESULTS):
+            pass
+        results = merge_ranked(hot_results, archived_results, limit=MAX_SEARCH_RESULTS)
+        items = [self._item(snapshot, *row, score=score) for score, row in results]
+        return self._page(items, message, connection)
+
+    def _cmd_get(self, message, connection):
+        """One item by category, list (pinned or not) and position."""
+        cat_name = self._category(message)
+        is_pinned = bool(message.get("pinned", False))
+        position = message.get("position", 0)
+        snapshot = self._snapshot(cat_name)
+        items = snapshot[cat_name]["pinned_history" if is_pinned else "history"]
+        if not isinstance(position, int) or not 0 <= position < len(items):
+            raise RequestError(f"No item at position {position} in '{cat_name}'")
+        return self._item(snapshot, cat_name, items[position], is_pinned, position)
+
+    @staticmethod
+    def _paging(message):
+        """The validated (limit, cursor) of a request."""
+        limit = message.get("limit", DEFAULT_PAGE_SIZE)
+        cursor = message.get("cursor") or 0
+        if not isinstance(limit, int) or not 0 < limit <= MAX_PAGE_SIZE:
+            raise RequestError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+        if not isinstance(cursor, int) or cursor < 0:
+            raise RequestError("'cursor' must be a non-negative integer")
+        return limit, cursor
+
+    def _page(self, items, message, connection):
+        """Returns one page of items, or streams them all as partial responses when `stream` is set."""
+        limit, cursor = self._paging(message)
+        if message.get("stream"):
+            if connection is None:
+                raise RequestError("Streaming is not available inside a batch")
+            for start in range(cursor, len(items), limit):
+                connection.send({"id": message.get("id"), "ok": True, "partial": items[start:start + limit]})
+            return {"count": max(len(items) - cursor, 0), "total": len(items)}
+        next_cursor = cursor + limit if cursor + limit < len(items) else None
+        return {"items": items[cursor:cursor + limit], "total": len(items), "next_cursor": next_cursor}
+
+    # --- Writes ---
+    @staticmethod
+    def _texts(message):
+        """The item(s) of a write request, from `text` or `items`."""
+        texts = message.get("items")
+        if texts is None and "text" in message:
+            texts = [message["text"]]
+        if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+            raise RequestError("Pass 'text' or a non-empty list of strings in 'items'")
+        return texts
+
+    def _cmd_add(self, message, connection):
+        """Categorizes, transforms and stores items as if they had been copied; returns the category of each."""
+        texts = [text for text in self._texts(message) if text.strip()]
+        if len(texts) > MAX_ADD_ITEMS:
+            raise RequestError(f"At most {MAX_ADD_ITEMS} items per add request")
+        category_names = self.run(lambda: [self.categorize(text) for text in texts])
+        # Transforms run on their pool between the two owner calls, never in the owner's context
+        transformed = self.transform_many(list(zip(category_names, texts)))
+        stored = self.run(lambda: [self.store_clip(category_name, text, result)
+                                   for category_name, text, result in zip(category_names, texts, transformed)])
+        return {"categories": category_names, "stored": stored}
+
+    def _edit_many(self, op, message):
+        cat_name = self._category(message)
+        texts = self._texts(message)
+        def edit():
+            if cat_name not in self.categories:
+                raise RequestError(f"Unknown category '{cat_name}'")
+            count, missing = self.apply_op(op, [cat_name, texts])
+            return {"count": count, "missing": list(missing)}
+        return self.run(edit)
+
+    def _cmd_pin(self, message, connection):
+        return self._edit_many("pin_many", message)
+
+    def _cmd_unpin(self, message, connection):
+        return self._edit_many("unpin_many", message)
+
+    def _cmd_delete(self, message, connection):
+        """Deletes items from a category; items only found in its archive are hidden there."""
+        cat_name = self._category(message)
+        wanted = set(self._texts(message))
+        archived = set()
+        if self.archive is not None and self.archive.count(cat_name):
+            # Looked up on this thread, before the delete hides them
+            for rows in archive_rows(self.archive, cat_name, parse_query(""), include_text=False):
+                archived.update(row[1] for row in rows if row[1] in wanted)
+        result = self._edit_many("delete_many", message)
+        found = [text for text in result["missing"] if text in archived]
+        return {"count": result["count"] + len(found), "missing": [text for text in result["missing"] if text not in archived]}
+
+    def _cmd_move(self, message, connection):
+        """Moves items from `category` to the top of `destination`."""
+        source, destination = self._category(message), self._category(message, "destination")
+        texts = self._texts(message)
+        def edit():
+            for cat_name in (source, destination):
+                if cat_name not in self.categories:
+                    raise RequestError(f"Unknown category '{cat_name}'")
+            moved, missing = 0, []
+            for text in texts:
+                removed, _ = self.apply_op("move", [source, destination, text])
+                if removed:
+                    moved += 1
+                else:
+                    missing.append(text)
+            return {"count": moved, "missing": missing}
+        return self.run(edit)
+
+    # --- Batches ---
+    def _cmd_batch(self, message, connection):
+        """Runs several requests in order; each gets its own ok/result or error entry."""
+        requests = message.get("requests")
+        if not isinstance(requests, list) or len(requests) > MAX_BATCH_REQUESTS:
+            raise RequestError(f"'requests' must be a list of at most {MAX_BATCH_REQUESTS} requests")
+        responses = []
+        for request in requests:
+            command = request.get("cmd") if isinstance(request, dict) else None
+            try:
+                if command == "batch":
+                    raise RequestError("Batches cannot be nested")
+                responses.append({"ok": True, "result": self.handle(command, request, None)})
+            except RequestError as e:
+                responses.append({"ok": False, "error": str(e)})
+        return responses
@@ -0,0 +1,295 @@
+# history_archive.py
+"""
+Cold storage for history items trimmed beyond HISTORY_LIMIT_PER_CATEGORY.
+Each category has an append-only data file of length-prefixed records (length, copy time, UTF-8
+text) and an index file of 8-byte record offsets. Both are read through `mmap`, so an archive of
+any size costs page cache rather than Python objects. Items are never rewritten. Readers see only
+records whose offset is already in the index, which is written after the record itself.
+Deleting an item appends a tombstone (a digest of its text and the record count at the time) to a
+third file; readers skip the records it covers, while copies archived later stay visible. The
+deleted text itself stays in the data file until the category is deleted.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+
+import config_manager
+from query_planner import build_matcher
+
+ARCHIVE_DIR_NAME = "clipboard_archive" # Created next to the config file
+RECORD_HEADER = struct.Struct("<Id") # Text length in bytes, copy time
+OFFSET = struct.Struct("<Q") # One index entry
+TOMBSTONE = struct.Struct("<16sIQ") # Text digest, text length in bytes, records archived when it was deleted
+ARCHIVE_BATCH_SIZE = 500 # Records decoded per batch when scanning
+
+def default_archive_dir():
+    """Archive directory next to the current config file."""
+    return os.path.join(os.path.dirname(os.path.abspath(config_manager.CONFIG_FILE)), ARCHIVE_DIR_NAME)
+
+def _file_stem(category_name):
+    """A file name that is safe on every platform and unique per category name."""
+    readable = re.sub(r"[^A-Za-z0-9_-]+", "_", category_name)[:40]
+    digest = hashlib.sha1(category_name.encode("utf-8")).hexdigest()[:10]
+    return f"{readable}-{digest}"
+
+def _digest(payload):
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+def _map(path):
+    """Read-only map of a whole file, or None if it is missing or empty."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+class CategoryArchive:
+    """The archive files of one category."""
+
+    def __init__(self, directory, category_name, read_only=False):
+        stem = _file_stem(category_name)
+        self.data_path = os.path.join(directory, stem + ".log")
+        self.index_path = os.path.join(directory, stem + ".idx")
+        self.tombstone_path = os.path.join(directory, stem + ".del")
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._maps = None # (data map, index map, record count), replaced (never closed) when the files grow
+        self._mapped_index_size = -1
+        self._tombstones = {} # {text digest: records archived when it was deleted}
+        self._tombstone_lengths = set() # Byte lengths of the deleted texts, checked before hashing a record
+        self._tombstone_size = 0 # Bytes of the tombstone file already loaded
+        if not read_only:
+            self._repair_index()
+
+    def _repair_index(self):
+        """Indexes records written after the last index entry (e.g. after a crash between the two writes)."""
+        if not os.path.exists(self.data_path):
+            return
+        data_size = os.path.getsize(self.data_path)
+        index_size = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        index_size -= index_size % OFFSET.size
+        position = 0
+        if index_size:
+            with open(self.index_path, "rb") as f:
+                f.seek(index_size - OFFSET.size)
+                last_offset = OFFSET.unpack(f.read(OFFSET.size))[0]
+            with open(self.data_path, "rb") as f:
+                f.seek(last_offset)
+                header = f.read(RECORD_HEADER.size)
+            if len(header) == RECORD_HEADER.size:
+                position = last_offset + RECORD_HEADER.size + RECORD_HEADER.unpack(header)[0]
+        missing = []
+        with open(self.data_path, "rb") as f:
+            while position + RECORD_HEADER.size <= data_size:
+                f.seek(position)
+                length, _ = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                if position + RECORD_HEADER.size + length > data_size:
+                    break
+                missing.append(position)
+                position += RECORD_HEADER.size + length
+        if position < data_size:
+            # A record cut short by a crash; drop it so the next append starts on a record boundary
+            with open(self.data_path, "r+b") as f:
+                f.truncate(position)
+        with open(self.index_path, "r+b" if os.path.exists(self.index_path) else "wb") as f:
+            f.truncate(index_size) # Drop a partially written entry
+            f.seek(index_size)
+            for offset in missing:
+                f.write(OFFSET.pack(offset))
+        if missing:
+            print(f"Re-indexed {len(missing)} archived items in {self.data_path}")
+
+    def append(self, items):
+        """Appends (text, copy time) pairs; the last one becomes the newest archived item."""
+        if self.read_only or not items:
+            return
+        with self._lock:
+            with open(self.data_path, "ab") as data_file:
+                offset = data_file.tell()
+                offsets = []
+                for text, added_at in items:
+                    payload = str(text).encode("utf-8")
+                    data_file.write(RECORD_HEADER.pack(len(payload), added_at or 0.0))
+                    data_file.write(payload)
+                    offsets.append(offset)
+                    offset += RECORD_HEADER.size + len(payload)
+            # The index is written second, so readers never see an offset without its record
+            with open(self.index_path, "ab") as index_file:
+                index_file.write(b"".join(OFFSET.pack(o) for o in offsets))
+
+    def forget(self, texts):
+        """Hides every archived copy of the given texts (e.g. after the user deleted them).
+        Copies archived later are not affected."""
+        if self.read_only:
+            return
+        count = len(self)
+        if not count:
+            return
+        with self._lock:
+            with open(self.tombstone_path, "ab") as tombstone_file:
+                payloads = [str(text).encode("utf-8") for text in texts]
+                tombstone_file.write(b"".join(TOMBSTONE.pack(_digest(payload), len(payload), count) for payload in payloads))
+
+    def _current_tombstones(self):
+        """The tombstones, re-read when the file grew (e.g. written by the daemon)."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.tombstone_path)
+            except OSError:
+                size = 0
+            if size < self._tombstone_size:
+                self._tombstones, self._tombstone_lengths, self._tombstone_size = {}, set(), 0 # Files deleted and recreated
+            if size - self._tombstone_size >= TOMBSTONE.size:
+                with open(self.tombstone_path, "rb") as f:
+                    f.seek(self._tombstone_size)
+                    data = f.read(size - self._tombstone_size)
+                data = data[:len(data) - len(data) % TOMBSTONE.size] # Ignore a partially written entry
+                for digest, length, count in TOMBSTONE.iter_unpack(data):
+                    self._tombstones[digest] = max(count, self._tombstones.get(digest, 0))
+                    self._tombstone_lengths.add(length)
+                self._tombstone_size += len(data)
+            return self._tombstones, self._tombstone_lengths
+
+    def _current_maps(self):
+        with self._lock:
+            try:
+                index_size = os.path.getsize(self.index_path)
+            except OSError:
+                return None, None, 0
+            if index_size != self._mapped_index_size:
+                # Map the index first; the data file is at least as long as every record it points to
+                index_map = _map(self.index_path)
+                data_map = _map(self.data_path)
+                count = (len(index_map) // OFFSET.size) if index_map is not None and data_map is not None else 0
+                self._maps = (data_map, index_map, count)
+                self._mapped_index_size = index_size
+            return self._maps
+
+    def __len__(self):
+        return self._current_maps()[2]
+
+    def iter_batches(self, batch_size=ARCHIVE_BATCH_SIZE, skip=0):
+        """Yields lists of (age, text, copy time), newest archived item first; age 0 is the newest.
+        The `skip` newest records are passed over without being read. Deleted items are left out."""
+        data_map, index_map, count = self._current_maps()
+        tombstones, tombstone_lengths = self._current_tombstones()
+        for end in range(count - skip, 0, -batch_size):
+            batch = []
+            for index in range(end - 1, max(end - batch_size, 0) - 1, -1):
+                offset = OFFSET.unpack_from(index_map, index * OFFSET.size)[0]
+                length, added_at = RECORD_HEADER.unpack_from(data_map, offset)
+                start = offset + RECORD_HEADER.size
+                payload = data_map[start:start + length]
+                if length in tombstone_lengths and index < tombstones.get(_digest(payload), 0):
+                    continue
+                batch.append((count - 1 - index, payload.decode("utf-8", errors="replace"), added_at))
+            yield batch
+
+    def size_on_disk(self):
+        """Bytes used by the data and index files."""
+        return sum(os.path.getsize(path) for path in (self.data_path, self.index_path, self.tombstone_path) if os.path.exists(path))
+
+    def delete_files(self):
+        """Removes both files (when the category is deleted)."""
+        with self._lock:
+            for path in (self.data_path, self.index_path, self.tombstone_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self._maps = None
+            self._mapped_index_size = -1
+            self._tombstones, self._tombstone_lengths, self._tombstone_size = {}, set(), 0
+
+class HistoryArchive:
+    """Archives of every category, opened on first use."""
+
+    def __init__(self, directory=None, read_only=False):
+        self.directory = directory or default_archive_dir()
+        self.read_only = read_only
+        self._archives = {}
+        self._lock = threading.Lock()
+
+    def get(self, category_name):
+        """The CategoryArchive of a category (its files may not exist yet)."""
+        with self._lock:
+            archive = self._archives.get(category_name)
+            if archive is None:
+                if not self.read_only:
+                    os.makedirs(self.directory, exist_ok=True)
+                archive = CategoryArchive(self.directory, category_name, self.read_only)
+                self._archives[category_name] = archive
+            return archive
+
+    def append(self, category_name, items):
+        """Archives (text, copy time) pairs trimmed from a category, oldest first."""
+        if self.read_only or not items:
+            return
+        try:
+            self.get(category_name).append(items)
+        except OSError as e:
+            print(f"Error archiving history of '{category_name}': {e}")
+
+    def forget(self, category_name, items):
+        """Hides the archived copies of items deleted from a category."""
+        if self.read_only or not items:
+            return
+        try:
+            self.get(category_name).forget(items)
+        except OSError as e:
+            print(f"Error deleting archived history of '{category_name}': {e}")
+
+    def remove_category(self, category_name):
+        """Deletes a category's archive."""
+        if self.read_only:
+            return
+        self.get(category_name).delete_files()
+        with self._lock:
+            self._archives.pop(category_name, None)
+
+    def count(self, category_name):
+        try:
+            return len(self.get(category_name))
+        except (OSError, ValueError):
+            return 0
+
+def archive_rows(archive, category_name, parsed_query, start_position=0, include_text=True, exclude=(), should_stop=None, skip=0):
+    """Yields batches of (category, item, False, position) rows of archived items matching a parsed query.
+    Positions continue after the hot history (`start_position`), so archived items rank as older;
+    the archived item at position start_position + n is the n-th newest. The `skip` newest are passed over.
+    Items in `exclude` (those back in the hot history) and deleted ones are skipped, and a text archived
+    more than once is yielded only for its newest copy (among the records read from `skip` on).
+    Timestamps are looked up per batch, so `since:` works without loading the whole archive."""
+    if archive is None:
+        return
+    added_at = {} # Copy times of the current batch only
+    yielded = set() # Digests of the texts already yielded, so rows stay unique without keeping the texts
+    matcher = build_matcher(parsed_query, category_name, {"added_at": added_at}, include_text=include_text)
+    if matcher is None:
+        return # Category excluded by the query
+    try:
+        batches = archive.get(category_name).iter_batches(skip=skip)
+        for batch in batches:
+            if should_stop and should_stop():
+                return
+            added_at.clear()
+            for _, text, copy_time in batch:
+                added_at.setdefault(text, copy_time) # Newest copy first
+            rows = []
+            for age, text, _ in batch:
+                if text in exclude or not matcher(text, False):
+                    continue
+                digest = _digest(text.encode("utf-8", errors="replace"))
+                if digest not in yielded:
+                    yielded.add(digest)
+                    rows.append((category_name, text, False, start_position + age))
+            if rows:
+                yield rows
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error reading the archive of '{category_name}': {e}")
@@ -0,0 +1,272 @@
+# history_store.py
+"""
+History data operations, independent of the GUI.
+HistoryStore owns the edits to each category's `history`, `pinned_history` and `added_at`,
+and keeps the search index in step with them. Items trimmed beyond the limit are handed to the
+archive (history_archive.py) when one is given, and deleting an item also hides it there.
+Categories with "collapse_near_duplicates" set replace a near duplicate of a new item
+(near_duplicates.py) and count it in `versions`.
+The GUI wraps these calls with rendering, status messages and saving; the load harness and
+benchmarks drive the store directly.
+"""
+
+import time
+
+HISTORY_LIMIT_PER_CATEGORY = 1000 # Rows are virtualized, so this only bounds memory and save size
+
+class HistoryStore:
+    """Adds, pins, unpins, deletes and moves history items of a categories dictionary."""
+
+    def __init__(self, categories, search_index=None, limit=HISTORY_LIMIT_PER_CATEGORY, archive=None, near_duplicates=None,
+                 on_collapse=None):
+        """Works on `categories` in place; `search_index` (optional) is updated alongside and
+        items trimmed beyond the limit go to `archive` (a HistoryArchive, optional).
+        `near_duplicates` (a NearDuplicateIndex, optional) enables collapsing near duplicates, and
+        `on_collapse(category, item, replaced item)` is called after each collapse."""
+        self.categories = categories
+        self.search_index = search_index
+        self.limit = limit
+        self.archive = archive
+        self.near_duplicates = near_duplicates
+        self.on_collapse = on_collapse
+
+    def _lists(self, category_name):
+        """Returns (cat_data, history, pinned_history), creating missing lists."""
+        cat_data = self.categories[category_name]
+        if not isinstance(cat_data.get("history"), list):
+            cat_data["history"] = []
+        if not isinstance(cat_data.get("pinned_history"), list):
+            cat_data["pinned_history"] = []
+        return cat_data, cat_data["history"], cat_data["pinned_history"]
+
+    def _index_add(self, category_name, item):
+        if self.search_index is not None:
+            self.search_index.add(category_name, item)
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(category_name, item)
+
+    def _index_remove(self, category_name, item):
+        if self.search_index is not None:
+            self.search_index.remove(category_name, item)
+        if self.near_duplicates is not None:
+            self.near_duplicates.remove(category_name, item)
+
+    def _near_duplicate(self, category_name, cat_data, item):
+        """An unpinned item the new one should replace, if the category collapses near duplicates."""
+        if self.near_duplicates is None:
+            return None
+        if not cat_data.get("collapse_near_duplicates"):
+            self.near_duplicates.remove_category(category_name) # Free the signatures of a switched-off category
+            return None
+        if not self.near_duplicates.is_built(category_name):
+            self.prepare_near_duplicates(category_name)
+            return None # Nothing is collapsed until the background build is done
+        for match in self.near_duplicates.find(category_name, item):
+            if match in cat_data["history"]:
+                return match
+        return None
+
+    def prepare_near_duplicates(self, category_name=None):
+        """Starts fingerprinting, off this thread, the categories (or the one given) that collapse near
+        duplicates and have no index yet. Call at startup and when collapsing is switched on."""
+        if self.near_duplicates is None:
+            return
+        for cat_name in ([category_name] if category_name else list(self.categories)):
+            cat_data = self.categories.get(cat_name, {})
+            if cat_data.get("collapse_near_duplicates") and not self.near_duplicates.is_built(cat_name):
+                self.near_duplicates.build_async(cat_name, list(cat_data.get("history", [])))
+
+    def version_count(self, category_name, item):
+        """How many near-duplicate versions an item stands for (1 if it was never collapsed)."""
+        return self.categories.get(category_name, {}).get("versions", {}).get(item, 1)
+
+    # --- Single Items ---
+    def add(self, category_name, item, added_time=None):
+        """Puts an item at the top of a category's normal history, trimming it to the limit.
+        Returns the list of trimmed items, or None if the category does not exist."""
+        if category_name not in self.categories:
+            return None
+        cat_data, history, pinned_history = self._lists(category_name)
+
+        # If item exists anywhere (pinned or not), remove it first
+        if item in history: history.remove(item)
+        if item in pinned_history: pinned_history.remove(item)
+
+        # A near duplicate is replaced the same way, and the new item inherits its version count
+        near_match = self._near_duplicate(category_name, cat_data, item)
+        if near_match is not None:
+            self.absorb(category_name, item, near_match)
+
+        history.insert(0, item)
+        self._index_add(category_name, item)
+        cat_data.setdefault("added_at", {})[item] = added_time or time.time() # Used by 'since:' searches
+
+        # Trim *normal* history if it exceeds the limit
+        trimmed_items = []
+        if len(history) > self.limit:
+            trimmed_items = history[self.limit:]
+            archived = []
+            for trimmed_item in trimmed_items:
+                self._index_remove(category_name, trimmed_item)
+                archived.append((trimmed_item, cat_data["added_at"].pop(trimmed_item, None)))
+                cat_data.get("versions", {}).pop(trimmed_item, None)
+            del history[self.limit:]
+            if self.archive is not None:
+                self.archive.append(category_name, archived[::-1]) # Oldest first, so the newest is read first
+        return trimmed_items
+
+    def absorb(self, category_name, item, near_match):
+        """Drops `near_match` from a category's history in favour of `item`, which inherits its version
+        count. add() does this for near duplicates; attached windows apply the daemon's decisions with it.
+        Returns True if near_match was in the history."""
+        if category_name not in self.categories:
+            return False
+        cat_data, history, _ = self._lists(category_name)
+        if near_match == item or near_match not in history:
+            return False
+        history.remove(near_match)
+        self._index_remove(category_name, near_match)
+        cat_data.get("added_at", {}).pop(near_match, None)
+        versions = cat_data.setdefault("versions", {})
+        versions[item] = versions.get(item, 1) + versions.pop(near_match, 1)
+        if self.on_collapse:
+            self.on_collapse(category_name, item, near_match)
+        return True
+
+    def pin(self, category_name, item):
+        """Moves an item from history to the top of pinned_history. Returns True if it moved."""
+        if category_name not in self.categories:
+            return False
+        _, history, pinned_history = self._lists(category_name)
+        if item not in history:
+            return False
+        history.remove(item)
+        if item not in pinned_history:
+            pinned_history.insert(0, item) # Add to top of pinned
+        return True
+
+    def unpin(self, category_name, item):
+        """Moves a pinned item back to the top of history. Returns True if it moved."""
+        if category_name not in self.categories:
+            return False
+        _, history, pinned_history = self._lists(category_name)
+        if item not in pinned_history:
+            return False
+        pinned_history.remove(item)
+        if item in history:
+            history.remove(item)
+        history.insert(0, item) # Add to top of normal history
+        return True
+
+    def bump(self, category_name, item):
+        """Moves an unpinned item to the top of its history, keeping its copy time, e.g. when the app
+        copied it back to the clipboard. Returns True if the item is in the history."""
+        if category_name not in self.categories:
+            return False
+        _, history, _ = self._lists(category_name)
+        if item not in history:
+            return False
+        if history[0] != item:
+            history.remove(item)
+            history.insert(0, item)
+        return True
+
+    def is_pinned(self, category_name, item):
+        """True if the item is in the category's pinned history."""
+        return item in self.categories.get(category_name, {}).get("pinned_history", [])
+
+    def delete(self, category_name, item):
+        """Removes an item from both lists of a category and hides its archived copies.
+        Returns True if it was found in the lists."""
+        if category_name not in self.categories:
+            return False
+        cat_data, history, pinned_history = self._lists(category_name)
+        item_deleted = False
+        if item in pinned_history:
+            pinned_history.remove(item)
+            item_deleted = True
+        if item in history:
+            history.remove(item)
+            item_deleted = True
+        if item_deleted:
+            self._index_remove(category_name, item)
+            cat_data.get("added_at", {}).pop(item, None)
+            cat_data.get("versions", {}).pop(item, None)
+        if self.archive is not None:
+            self.archive.forget(category_name, [item])
+        return item_deleted
+
+    def move(self, source_category, destination_category, item):
+        """Moves an item to the top of another category's normal history, keeping its copy time.
+        Returns (removed from source, added to destination); an item that is not in the source is
+        not added anywhere."""
+        if source_category not in self.categories:
+            return False, False
+        source_cat_data, history, pinned_history = self._lists(source_category)
+        removed_from_source = False
+        if item in pinned_history:
+            pinned_history.remove(item)
+            removed_from_source = True
+        if item in history:
+            history.remove(item)
+            removed_from_source = True
+        if not removed_from_source:
+            return False, False
+        self._index_remove(source_category, item)
+        added_time = source_cat_data.get("added_at", {}).pop(item, None)
+        versions = source_cat_data.get("versions", {}).pop(item, None)
+
+        if destination_category not in self.categories:
+            return True, False
+        # Keep the original copy time so 'since:' searches still find it
+        self.add(destination_category, item, added_time)
+        if versions:
+            destination_versions = self.categories[destination_category].setdefault("versions", {})
+            destination_versions[item] = destination_versions.get(item, 1) + versions - 1
+        return removed_from_source, True
+
+    # --- Multiple Items ---
+    def delete_many(self, category_name, items):
+        """Deletes several items and hides their archived copies; returns (deleted count, items not
+        found in the lists)."""
+        if category_name not in self.categories:
+            return 0, list(items)
+        cat_data, history, pinned_history = self._lists(category_name)
+        items = set(items)
+        # One pass per list instead of a list.remove() per item
+        found = {item for item in history if item in items} | {item for item in pinned_history if item in items}
+        if found:
+            history[:] = [item for item in history if item not in found]
+            pinned_history[:] = [item for item in pinned_history if item not in found]
+            added_at = cat_data.get("added_at", {})
+            versions = cat_data.get("versions", {})
+            for item in found:
+                self._index_remove(category_name, item)
+                added_at.pop(item, None)
+                versions.pop(item, None)
+        if self.archive is not None:
+            self.archive.forget(category_name, items)
+        return len(found), [item for item in items if item not in found]
+
+    def pin_many(self, category_name, items):
+        """Pins several items; already pinned ones count as pinned. Returns (count, items not found)."""
+        pinned_count = 0
+        missing = []
+        for item in items:
+            if self.pin(category_name, item) or self.is_pinned(category_name, item):
+                pinned_count += 1
+            else:
+                missing.append(item)
+        return pinned_count, missing
+
+    def unpin_many(self, category_name, items):
+        """Unpins several items; items that were not pinned are ignored. Returns (count, items not found)."""
+        unpinned_count = 0
+        missing = []
+        history = self.categories.get(category_name, {}).get("history", [])
+        for item in items:
+            if self.unpin(category_name, item):
+                unpinned_count += 1
+            elif item not in history:
+                missing.append(item)
+        return unpinned_count, missing
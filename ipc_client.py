@@ -0,0 +1,248 @@
+# ipc_client.py
+"""
+Client side of the clipboard daemon's local socket protocol.
+DaemonClient sends requests and receives responses and change events on background threads,
+so callers on the Tk thread never wait on the socket unless they ask for a result.
+Scripts use it for the history API as well (see history_api.py), e.g.
+`python ipc_client.py '{"cmd": "search", "query": "cat:Links github", "limit": 20}'`.
+RemoteHistoryStore is the HistoryStore used by an attached GUI: it applies each edit locally
+and forwards it to the daemon.
+"""
+
+import itertools
+import json
+import queue
+import sys
+import threading
+
+import ipc_protocol
+from history_store import HistoryStore
+
+REQUEST_TIMEOUT_S = 10.0
+
+class DaemonError(Exception):
+    """Raised when the daemon rejects a request or the connection is lost."""
+
+class _PendingRequest:
+    def __init__(self, on_partial=None):
+        self.done = threading.Event()
+        self.response = None
+        self.on_partial = on_partial # Called with each chunk of a streamed result
+
+class DaemonClient:
+    """Connection to a running clipboard daemon."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.on_event = None # Called as on_event(event) on the reader thread
+        self.on_disconnect = None # Called once, on the reader thread, when the connection drops
+        self._sock = None
+        self._ids = itertools.count(1)
+        self._pending = {} # {request id: _PendingRequest}
+        self._lock = threading.Lock()
+        self._outbound = queue.Queue()
+        self._closed = threading.Event()
+
+    # --- Connection ---
+    def connect(self):
+        """Connects and authenticates; raises OSError or DaemonError if the daemon is not reachable."""
+        self._sock, token = ipc_protocol.connect(self.path)
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        threading.Thread(target=self._write_loop, daemon=True).start()
+        self.request("hello", token=token)
+        return self
+
+    def close(self):
+        """Closes the connection; pending requests fail with DaemonError."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+
+    @property
+    def connected(self):
+        return self._sock is not None and not self._closed.is_set()
+
+    # --- Requests ---
+    def request(self, command, timeout=REQUEST_TIMEOUT_S, on_partial=None, **params):
+        """Sends a request and waits for its result.
+        Chunks of a streamed result (`stream=True`) are passed to `on_partial` as they arrive."""
+        request_id = next(self._ids)
+        pending = _PendingRequest(on_partial)
+        with self._lock:
+            self._pending[request_id] = pending
+        self._outbound.put(dict(params, id=request_id, cmd=command))
+        if not pending.done.wait(timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise DaemonError(f"Timed out waiting for '{command}'")
+        response = pending.response
+        if response is None:
+            raise DaemonError("Connection to the daemon was lost")
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Request failed"))
+        return response.get("result")
+
+    def stream(self, command, **params):
+        """Yields the items of a streamed result (list or search) as they arrive."""
+        chunks = queue.Queue()
+        outcome = {}
+        def run():
+            try:
+                outcome["result"] = self.request(command, on_partial=chunks.put, stream=True, **params)
+            except DaemonError as e:
+                outcome["error"] = e
+            chunks.put(None)
+        threading.Thread(target=run, daemon=True).start()
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield from chunk
+        if "error" in outcome:
+            raise outcome["error"]
+
+    def send_async(self, command, **params):
+        """Queues a request without waiting for (or reporting) its result."""
+        if not self._closed.is_set():
+            self._outbound.put(dict(params, id=None, cmd=command))
+
+    def subscribe(self, on_event, on_disconnect=None):
+        """Starts delivering change events to `on_event(event)` (called on a background thread)."""
+        self.on_event = on_event
+        self.on_disconnect = on_disconnect
+        return self.request("subscribe")
+
+    def attach(self, on_event, on_disconnect=None):
+        """Subscribes to change events and returns the daemon's categories as of that moment.
+        The daemon takes the snapshot and subscribes in one step, so every event delivered to
+        `on_event` is a change the snapshot does not contain yet."""
+        self.on_event = on_event
+        self.on_disconnect = on_disconnect
+        return self.request("snapshot", subscribe=True)["categories"]
+
+    # --- Background Threads ---
+    def _write_loop(self):
+        while not self._closed.is_set():
+            try:
+                message = self._outbound.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._sock.sendall(ipc_protocol.encode_message(message))
+            except OSError:
+                self.close()
+
+    def _read_loop(self):
+        try:
+            with self._sock.makefile("rb") as sock_file:
+                for message in ipc_protocol.read_messages(sock_file):
+                    if "event" in message:
+                        if self.on_event:
+                            self.on_event(message)
+                        continue
+                    if "partial" in message:
+                        with self._lock:
+                            pending = self._pending.get(message.get("id"))
+                        if pending and pending.on_partial:
+                            pending.on_partial(message["partial"])
+                        continue
+                    with self._lock:
+                        pending = self._pending.pop(message.get("id"), None)
+                    if pending:
+                        pending.response = message
+                        pending.done.set()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.close()
+            # Wake up everyone still waiting for a response
+            with self._lock:
+                pending_requests = list(self._pending.values())
+                self._pending.clear()
+            for pending in pending_requests:
+                pending.done.set()
+            if self.on_disconnect:
+                self.on_disconnect()
+
+class RemoteHistoryStore(HistoryStore):
+    """HistoryStore that forwards each top-level edit to the daemon after applying it locally."""
+
+    def __init__(self, categories, search_index, client):
+        super().__init__(categories, search_index)
+        self.client = client
+        self._applying = False # True inside an edit, so nested calls (e.g. pin_many -> pin) are not forwarded twice
+
+    def _forward(self, op, args, apply):
+        if self._applying:
+            return apply()
+        self._applying = True
+        try:
+            result = apply()
+        finally:
+            self._applying = False
+        self.client.send_async("op", op=op, args=[list(arg) if isinstance(arg, (set, tuple)) else arg for arg in args])
+        return result
+
+    def _near_duplicate(self, category_name, cat_data, item):
+        return None # The daemon decides what collapses and sends it as an 'absorb' op
+
+    def apply_remote(self, op, args):
+        """Applies an edit received from the daemon without sending it back."""
+        self._applying = True
+        try:
+            return getattr(HistoryStore, op)(self, *args)
+        finally:
+            self._applying = False
+
+    def add(self, category_name, item, added_time=None):
+        return self._forward("add", (category_name, item), lambda: super(RemoteHistoryStore, self).add(category_name, item, added_time))
+
+    def bump(self, category_name, item):
+        return self._forward("bump", (category_name, item), lambda: super(RemoteHistoryStore, self).bump(category_name, item))
+
+    def pin(self, category_name, item):
+        return self._forward("pin", (category_name, item), lambda: super(RemoteHistoryStore, self).pin(category_name, item))
+
+    def unpin(self, category_name, item):
+        return self._forward("unpin", (category_name, item), lambda: super(RemoteHistoryStore, self).unpin(category_name, item))
+
+    def delete(self, category_name, item):
+        return self._forward("delete", (category_name, item), lambda: super(RemoteHistoryStore, self).delete(category_name, item))
+
+    def move(self, source_category, destination_category, item):
+        return self._forward("move", (source_category, destination_category, item),
+                             lambda: super(RemoteHistoryStore, self).move(source_category, destination_category, item))
+
+    def delete_many(self, category_name, items):
+        return self._forward("delete_many", (category_name, items), lambda: super(RemoteHistoryStore, self).delete_many(category_name, items))
+
+    def pin_many(self, category_name, items):
+        return self._forward("pin_many", (category_name, items), lambda: super(RemoteHistoryStore, self).pin_many(category_name, items))
+
+    def unpin_many(self, category_name, items):
+        return self._forward("unpin_many", (category_name, items), lambda: super(RemoteHistoryStore, self).unpin_many(category_name, items))
+
+if __name__ == "__main__":
+    # One request from the command line, e.g. '{"cmd": "list", "category": "Links", "limit": 10}'
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} '<JSON request>'")
+        sys.exit(2)
+    request = json.loads(sys.argv[1])
+    command = request.pop("cmd")
+    request.pop("stream", None)
+    client = DaemonClient(ipc_protocol.default_socket_path()).connect()
+    try:
+        if command in ("list", "search"):
+            for item in client.stream(command, **request):
+                print(json.dumps(item, ensure_ascii=False))
+        else:
+            print(json.dumps(client.request(command, **request), ensure_ascii=False, indent=2))
+    except DaemonError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
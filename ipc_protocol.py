@@ -0,0 +1,109 @@
+# ipc_protocol.py
+"""
+Local socket transport shared by the clipboard daemon and its clients.
+Messages are JSON objects, one per line (UTF-8). A Unix domain socket is used where the platform
+supports it; elsewhere the server listens on a loopback TCP port and writes the port and an access
+token to a file only the current user can read.
+"""
+
+import json
+import os
+import secrets
+import socket
+import tempfile
+
+SOCKET_ENV_VAR = "CLIPBOARD_MANAGER_SOCKET" # Overrides the default socket path
+PROTOCOL_VERSION = 1
+MAX_LINE_BYTES = 64 * 1024 * 1024 # Largest accepted message
+
+class RequestError(Exception):
+    """A request that cannot be served; its message is sent back to the client."""
+
+def _user_suffix():
+    try:
+        return str(os.getuid())
+    except AttributeError:
+        return os.environ.get("USERNAME", "user") # Windows has no getuid
+
+def default_socket_path():
+    """Path of the daemon's Unix socket (or, without AF_UNIX, of its port file)."""
+    override = os.environ.get(SOCKET_ENV_VAR)
+    if override:
+        return override
+    name = f"clipboard-manager-{_user_suffix()}"
+    return os.path.join(tempfile.gettempdir(), name + (".sock" if hasattr(socket, "AF_UNIX") else ".port"))
+
+def create_server_socket(path=None):
+    """Creates a listening socket; returns (socket, token). The token is None for Unix sockets,
+    which are protected by file permissions instead."""
+    path = path or default_socket_path()
+    if hasattr(socket, "AF_UNIX"):
+        if os.path.exists(path):
+            # A socket file left behind by a crashed daemon refuses connections; a live one does not
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                raise OSError(f"A clipboard daemon is already listening on {path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(path)
+            finally:
+                probe.close()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177) # Socket file readable and writable by this user only
+        try:
+            server.bind(path)
+        finally:
+            os.umask(old_umask)
+        server.listen()
+        return server, None
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    token = secrets.token_hex(16)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"port": server.getsockname()[1], "token": token}, f)
+    try:
+        os.chmod(path, 0o600)
+    except OSError:
+        pass
+    return server, token
+
+def remove_server_address(path=None):
+    """Removes the socket or port file of a stopped server."""
+    path = path or default_socket_path()
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def connect(path=None, timeout=2.0):
+    """Connects to the daemon; returns (socket, token to send in `hello`)."""
+    path = path or default_socket_path()
+    if hasattr(socket, "AF_UNIX"):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(timeout)
+        client.connect(path)
+        client.settimeout(None)
+        return client, None
+    with open(path, 'r', encoding='utf-8') as f:
+        address = json.load(f)
+    client = socket.create_connection(("127.0.0.1", address["port"]), timeout=timeout)
+    client.settimeout(None)
+    return client, address["token"]
+
+def encode_message(message):
+    """Serializes a message as one JSON line."""
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+def read_messages(sock_file):
+    """Yields messages read from a socket's binary file object until the connection closes."""
+    while True:
+        line = sock_file.readline(MAX_LINE_BYTES + 1)
+        if not line:
+            return
+        if len(line) > MAX_LINE_BYTES:
+            raise ValueError("Message too large")
+        line = line.strip()
+        if line:
+            yield json.loads(line.decode("utf-8"))
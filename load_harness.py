@@ -0,0 +1,296 @@
+# load_harness.py
+"""
+Headless load generator and clip-stream replay for the ingest pipeline.
+Writes generated or recorded clips to a FakeClipboardBackend at a configurable rate and size
+distribution, lets ClipboardHandler pick them up, and reports ingest throughput, write-to-stored
+latency percentiles and dropped clips (overwritten before the monitor polled them).
+
+Modes:
+  store  ClipboardHandler + HistoryStore, with a worker thread standing in for the Tk loop (no display needed)
+  gui    the real ClipboardManagerApp without a tray icon; needs a display, e.g. `xvfb-run python load_harness.py --mode gui`
+
+Examples:
+  python load_harness.py --rate 50 --count 2000 --sizes lognormal:5,1.5
+  python load_harness.py --replay clips.jsonl --report report.json
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import string
+import tempfile
+import threading
+import time
+
+import config_manager
+from clipboard_backends import FakeClipboardBackend
+from clipboard_handler import ClipboardHandler
+from history_store import HistoryStore
+from metrics import registry as metrics
+
+DEFAULT_RATE = 20.0 # Clips written per second
+DEFAULT_COUNT = 500
+DEFAULT_POLL_INTERVAL_S = 0.05 # Faster than the app's default so the pipeline, not the poller, is measured
+DRAIN_TIMEOUT_S = 5.0 # How long to wait for in-flight clips after the last write
+CLIP_TEMPLATES = (
+    "def handler_{n}(event):\n    return event.payload  # {pad}",
+    "https://example.com/items/{n}?q={pad}",
+    "Meeting notes {n}: {pad}",
+    "import module_{n}\n{pad}",
+    "{pad}",
+)
+
+# --- Clip Streams ---
+def parse_size_distribution(spec):
+    """Returns a function rng -> payload size from `fixed:N`, `uniform:A-B` or `lognormal:MU,SIGMA`."""
+    kind, _, args = spec.partition(":")
+    try:
+        if kind == "fixed":
+            size = int(args)
+            return lambda rng: size
+        if kind == "uniform":
+            low, high = (int(value) for value in args.split("-"))
+            return lambda rng: rng.randint(low, high)
+        if kind == "lognormal":
+            mu, sigma = (float(value) for value in args.split(","))
+            return lambda rng: max(1, int(rng.lognormvariate(mu, sigma)))
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"Invalid size distribution '{spec}' (use fixed:N, uniform:A-B or lognormal:MU,SIGMA)")
+
+def generate_stream(count, rate, size_sampler, seed=0):
+    """Builds `count` unique clips spaced 1/rate seconds apart, as [{"text", "at"}]."""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + " "
+    stream = []
+    for n in range(count):
+        pad = "".join(rng.choice(alphabet) for _ in range(size_sampler(rng)))
+        text = rng.choice(CLIP_TEMPLATES).format(n=n, pad=pad)
+        stream.append({"text": f"{text} #{n}", "at": n / rate}) # The suffix keeps every clip unique
+    return stream
+
+def load_stream(path, rate):
+    """Reads a JSON-lines clip stream; entries without an `at` offset are spaced 1/rate apart."""
+    stream = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                stream.append({"text": entry["text"], "at": entry.get("at", len(stream) / rate)})
+    return stream
+
+def save_stream(stream, path):
+    """Writes a clip stream as JSON lines, for later replay."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for entry in stream:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def drive(backend, stream, done_event):
+    """Writes each clip to the backend at its scheduled offset."""
+    start_time = time.perf_counter()
+    for entry in stream:
+        delay = start_time + entry["at"] - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        backend.write(entry["text"])
+    done_event.set()
+
+# --- Pipelines ---
+class StorePipeline:
+    """ClipboardHandler feeding HistoryStore through a queue drained by one thread, like the Tk loop."""
+
+    def __init__(self, categories, backend, poll_interval):
+        self.categories = categories
+        self.store = HistoryStore(categories)
+        self.completions = {} # {text: perf_counter when stored}
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self.handler = ClipboardHandler(categories, lambda content, selection: self._queue.put(content), backend=backend,
+                                        poll_interval=poll_interval)
+        self._consumer = threading.Thread(target=self._consume, daemon=True)
+
+    def _consume(self):
+        while not self._stop_event.is_set():
+            try:
+                content = self._queue.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            with metrics.timer("ingest.categorize_ms"):
+                category_name = ClipboardHandler.categorize_content(content, self.categories)
+            metrics.ingest_stage(content, "categorized", category_name)
+            with metrics.timer("history.add_ms"):
+                self.store.add(category_name, content)
+            metrics.ingest_stage(content, "stored", category_name)
+            self.completions[content] = time.perf_counter()
+
+    def run(self, stream, backend):
+        """Replays the stream and returns once it has been written and drained."""
+        self._consumer.start()
+        self.handler.start_monitoring()
+        done_event = threading.Event()
+        drive(backend, stream, done_event)
+        wait_for_drain(backend, self.completions)
+        self.handler.stop()
+        self.handler.join()
+        self._stop_event.set()
+        self._consumer.join(timeout=1.0)
+
+def wait_for_drain(backend, completions, timeout=DRAIN_TIMEOUT_S):
+    """Waits until the last clip has been polled and every clip the monitor saw has completed,
+    or the timeout passes."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        seen = [record["text"] for record in backend.writes if record["first_read_at"] is not None]
+        last_polled = not backend.writes or backend.writes[-1]["first_read_at"] is not None
+        if last_polled and all(text in completions for text in seen):
+            return
+        time.sleep(0.05)
+
+def run_gui(categories, backend, stream, poll_interval):
+    """Runs the stream through the real app window; returns the completion times."""
+    from app_gui import ClipboardManagerApp
+
+    completions = {}
+
+    class HarnessApp(ClipboardManagerApp):
+        """The app without a tray icon, recording when each clip has been stored and rendered."""
+
+        def setup_tray_icon(self):
+            self.tray_icon = None
+
+        def process_clipboard_content(self, content, selection=None):
+            super().process_clipboard_content(content, selection)
+            completions[content] = time.perf_counter()
+
+    # Work on a throwaway config so the user's history is neither read nor overwritten
+    config_manager.CONFIG_FILE = os.path.join(tempfile.mkdtemp(prefix="clipboard-harness-"), "config.json")
+    config_manager.save_config(categories)
+
+    def on_startup_complete(app):
+        app.clipboard_handler.poll_interval = poll_interval
+        done_event = threading.Event()
+        threading.Thread(target=drive, args=(backend, stream, done_event), daemon=True).start()
+        app.after(100, check_done, app, done_event)
+
+    def check_done(app, done_event):
+        if not done_event.is_set():
+            app.after(100, check_done, app, done_event)
+            return
+        # Drain on a helper thread so the Tk loop keeps processing the last clips
+        def drain():
+            wait_for_drain(backend, completions)
+            app.after(0, shut_down, app)
+        threading.Thread(target=drain, daemon=True).start()
+
+    def shut_down(app):
+        app.clipboard_handler.stop()
+        app.search_worker.stop()
+        app.destroy()
+
+    app = HarnessApp(on_startup_complete=on_startup_complete, clipboard_backend=backend, api_enabled=False)
+    app.mainloop()
+    return completions
+
+# --- Reporting ---
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    index = min(int(round(percent / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def build_report(stream, backend, completions, elapsed_s):
+    """Summarizes throughput, latency and drops of a run.
+    Throughput is measured from the first write to the last stored clip, so app startup is excluded."""
+    active_s = max(completions.values()) - backend.writes[0]["written_at"] if completions and backend.writes else 0
+    latencies = sorted((completions[record["text"]] - record["written_at"]) * 1000
+                       for record in backend.writes if record["text"] in completions)
+    dropped = len(backend.unread_writes())
+    lost = sum(1 for record in backend.writes if record["first_read_at"] is not None and record["text"] not in completions)
+    return {
+        "clips_written": len(backend.writes),
+        "clips_stored": len(completions),
+        "dropped_before_poll": dropped,
+        "lost_after_detection": lost,
+        "elapsed_s": round(elapsed_s, 3),
+        "offered_rate_per_s": round(len(stream) / stream[-1]["at"], 2) if len(stream) > 1 and stream[-1]["at"] else None,
+        "active_s": round(active_s, 3),
+        "throughput_per_s": round(len(completions) / active_s, 2) if active_s > 0 else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+        "clipboard_reads": backend.reads,
+        "metrics": metrics.snapshot(),
+    }
+
+def format_report(report):
+    """Returns the headline numbers of a report as text."""
+    latency = report["latency_ms"]
+    def ms(value):
+        return "n/a" if value is None else f"{value:.1f} ms"
+    return "\n".join([
+        f"Clips written:        {report['clips_written']} (offered {report['offered_rate_per_s']}/s)",
+        f"Clips stored:         {report['clips_stored']} in {report['active_s']} s ({report['throughput_per_s']}/s)",
+        f"Dropped before poll:  {report['dropped_before_poll']}",
+        f"Lost after detection: {report['lost_after_detection']}",
+        f"Write-to-stored latency: p50 {ms(latency['p50'])}, p90 {ms(latency['p90'])}, p99 {ms(latency['p99'])}, max {ms(latency['max'])}",
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay clipboard streams through the ingest pipeline.")
+    parser.add_argument("--mode", choices=("store", "gui"), default="store")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Clips per second.")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="Number of generated clips.")
+    parser.add_argument("--sizes", type=parse_size_distribution, default=parse_size_distribution("lognormal:4,1"),
+                        help="Payload size distribution: fixed:N, uniform:A-B or lognormal:MU,SIGMA.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", metavar="PATH", help="Replay a JSON-lines stream ({\"text\", \"at\"}) instead of generating one.")
+    parser.add_argument("--save-stream", metavar="PATH", help="Write the stream used as JSON lines.")
+    parser.add_argument("--config", metavar="PATH", help="Config file to take categories and rules from (default: built-in defaults).")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL_S, help="Monitor poll interval in seconds.")
+    parser.add_argument("--read-delay", type=float, default=0.0, help="Simulated seconds per clipboard read.")
+    parser.add_argument("--report", metavar="PATH", help="Write the full report as JSON.")
+    args = parser.parse_args()
+
+    if args.replay:
+        stream = load_stream(args.replay, args.rate)
+    else:
+        stream = generate_stream(args.count, args.rate, args.sizes, args.seed)
+    if not stream:
+        parser.error("The clip stream is empty.")
+    if args.save_stream:
+        save_stream(stream, args.save_stream)
+
+    if args.config:
+        config_manager.CONFIG_FILE = args.config
+        categories = config_manager.load_config()
+    else:
+        categories = config_manager.initialize_default_categories()
+    # Start from empty histories so runs are comparable
+    for cat_data in categories.values():
+        cat_data["history"], cat_data["pinned_history"], cat_data["added_at"] = [], [], {}
+
+    backend = FakeClipboardBackend(read_delay_s=args.read_delay)
+    start_time = time.perf_counter()
+    if args.mode == "gui":
+        completions = run_gui(categories, backend, stream, args.poll_interval)
+    else:
+        pipeline = StorePipeline(categories, backend, args.poll_interval)
+        pipeline.run(stream, backend)
+        completions = pipeline.completions
+    elapsed_s = time.perf_counter() - start_time
+
+    report = build_report(stream, backend, completions, elapsed_s)
+    print(format_report(report))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+        print(f"Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# loop_watchdog.py
+"""
+Optional event-loop latency monitor for the Tk main thread.
+A heartbeat scheduled with `after` measures how late the loop runs it. A helper thread notices
+when the heartbeat is overdue and captures the main thread's stack with `sys._current_frames`,
+so each stall can be attributed to the handler that was running, e.g. `update_history_display`.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+import traceback
+
+WATCHDOG_ENV_VAR = "CLIPBOARD_MANAGER_WATCHDOG" # Set to 1 to enable the watchdog without --watchdog
+HEARTBEAT_INTERVAL_MS = 100 # How often the heartbeat is scheduled on the Tk loop
+STALL_THRESHOLD_MS = 200 # Lag above which the loop counts as stalled
+STALL_BUCKETS_MS = (250, 500, 1000, 2500, 5000) # Histogram upper bounds; longer stalls go in the last bucket
+RECENT_STALLS_KEPT = 50 # Stall records (with stacks) kept for the report
+WATCHED_HANDLERS = (
+    "process_clipboard_content",
+    "update_history_display",
+    "trigger_save_config",
+    "_move_item",
+    "_delete_selected",
+    "update_category_tabs",
+    "update_rule_display",
+)
+UNSAMPLED_HANDLER = "<unsampled>" # Stall ended before the helper thread could look at the stack
+
+def is_enabled_by_env():
+    """True if the watchdog environment variable asks for it."""
+    return os.environ.get(WATCHDOG_ENV_VAR, "").strip().lower() in ("1", "yes", "true")
+
+class StallRecord:
+    """One detected stall of the event loop."""
+
+    def __init__(self, duration_ms, handler, stack_text):
+        self.duration_ms = duration_ms
+        self.handler = handler
+        self.stack_text = stack_text
+        self.time = time.time()
+
+class EventLoopWatchdog:
+    """Measures Tk event-loop lag and captures the main thread's stack during stalls."""
+
+    def __init__(self, widget, interval_ms=HEARTBEAT_INTERVAL_MS, threshold_ms=STALL_THRESHOLD_MS):
+        """Uses `widget` to schedule the heartbeat; start() must be called from the Tk thread."""
+        self.widget = widget
+        self.interval = interval_ms / 1000.0
+        self.threshold = threshold_ms / 1000.0
+        self.histogram = {} # {handler: [count per bucket in STALL_BUCKETS_MS, plus one overflow bucket]}
+        self.recent_stalls = collections.deque(maxlen=RECENT_STALLS_KEPT)
+        self.max_lag_ms = 0.0
+        self.beats = 0
+        self._lock = threading.Lock()
+        self._expected_time = None # When the pending heartbeat should run
+        self._sample = None # (handler, stack text) captured during the current stall
+        self._main_thread_id = None
+        self._after_id = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # --- Control ---
+    def start(self):
+        """Starts the heartbeat and the sampling thread."""
+        if self._thread is not None:
+            return
+        self._main_thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._schedule_heartbeat()
+        self._thread = threading.Thread(target=self._sampler_loop, daemon=True)
+        self._thread.start()
+        print(f"Event loop watchdog started (threshold {self.threshold * 1000:.0f} ms).")
+
+    def stop(self):
+        """Stops the heartbeat and the sampling thread."""
+        self._stop_event.set()
+        if self._after_id:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass # Widget already destroyed
+            self._after_id = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    # --- Heartbeat (Tk thread) ---
+    def _schedule_heartbeat(self):
+        with self._lock:
+            self._expected_time = time.perf_counter() + self.interval
+        self._after_id = self.widget.after(int(self.interval * 1000), self._heartbeat)
+
+    def _heartbeat(self):
+        """Runs on the Tk loop; its lateness is the time the loop spent busy elsewhere."""
+        self._after_id = None
+        if self._stop_event.is_set():
+            return
+        now = time.perf_counter()
+        with self._lock:
+            lag = max(now - self._expected_time, 0.0)
+            sample = self._sample
+            self._sample = None
+        self.beats += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag * 1000)
+        if lag >= self.threshold:
+            handler, stack_text = sample if sample else (UNSAMPLED_HANDLER, "")
+            self._record_stall(lag * 1000, handler, stack_text)
+        self._schedule_heartbeat()
+
+    def _record_stall(self, duration_ms, handler, stack_text):
+        buckets = self.histogram.setdefault(handler, [0] * (len(STALL_BUCKETS_MS) + 1))
+        index = len(STALL_BUCKETS_MS)
+        for bucket_index, upper_bound in enumerate(STALL_BUCKETS_MS):
+            if duration_ms <= upper_bound:
+                index = bucket_index
+                break
+        buckets[index] += 1
+        self.recent_stalls.append(StallRecord(duration_ms, handler, stack_text))
+        print(f"Watchdog: event loop stalled for {duration_ms:.0f} ms in {handler}")
+
+    # --- Sampling (helper thread) ---
+    def _sampler_loop(self):
+        """Checks whether the heartbeat is overdue and, once per stall, captures the main stack."""
+        poll_interval = max(self.threshold / 4, 0.01)
+        while not self._stop_event.wait(poll_interval):
+            with self._lock:
+                overdue = self._expected_time is not None and \
+                          time.perf_counter() - self._expected_time >= self.threshold
+                already_sampled = self._sample is not None
+            if overdue and not already_sampled:
+                sample = self._capture_main_stack()
+                if sample:
+                    with self._lock:
+                        self._sample = sample
+
+    def _capture_main_stack(self):
+        """Returns (handler, formatted stack) for the main thread, or None if it cannot be read."""
+        frame = sys._current_frames().get(self._main_thread_id)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+        return attribute_stack(stack), "".join(traceback.format_list(stack))
+
+    # --- Reporting ---
+    def report(self):
+        """Returns a human readable summary of the stall histogram and the latest stall stacks."""
+        header = "".join(f"{'<=' + str(bound):>8}" for bound in STALL_BUCKETS_MS) + f"{'>' + str(STALL_BUCKETS_MS[-1]):>8}"
+        lines = [f"Event loop watchdog: {self.beats} heartbeats, max lag {self.max_lag_ms:.0f} ms",
+                 f"  {'handler (stall ms)':<30}{header}"]
+        for handler, buckets in sorted(self.histogram.items(), key=lambda entry: -sum(entry[1])):
+            lines.append(f"  {handler:<30}" + "".join(f"{count:>8}" for count in buckets))
+        if not self.histogram:
+            lines.append("  No stalls recorded.")
+        for stall in list(self.recent_stalls)[-3:]:
+            lines.append(f"--- {stall.duration_ms:.0f} ms in {stall.handler} ---")
+            if stall.stack_text:
+                lines.append(stall.stack_text.rstrip())
+        return "\n".join(lines)
+
+def attribute_stack(stack):
+    """Names the handler responsible for a stack: the outermost watched handler, otherwise the
+    innermost frame outside the Tk libraries."""
+    for frame_summary in stack:
+        if frame_summary.name in WATCHED_HANDLERS:
+            return frame_summary.name
+    for frame_summary in reversed(stack):
+        filename = frame_summary.filename.replace("\\", "/")
+        if "/tkinter/" not in filename and "/customtkinter/" not in filename and \
+           not filename.endswith("loop_watchdog.py"):
+            return frame_summary.name
+    return stack[-1].name if stack else UNSAMPLED_HANDLER
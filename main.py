@@ -3,12 +3,94 @@
 Main entry point for the Clipboard Category Manager application.
 Initializes the appearance, creates the main application window,
 and starts the Tkinter event loop.
+Run with `--profile-startup` to print per-phase startup timings and exit.
+Run with `--daemon` to monitor the clipboard without a window, and with `--attach` to open
+the window as a client of that daemon. On Linux, `--primary-selection` also captures the
+PRIMARY selection (text selected with the mouse).
 """
 
-import customtkinter as ctk
-from app_gui import ClipboardManagerApp # Import the main application class
+import time
+_start_time = time.perf_counter() # Taken before the heavy imports so they are part of the profile
+
+import argparse
+import sys
+
+def parse_args():
+    """Parses the command line options."""
+    parser = argparse.ArgumentParser(description="Clipboard Category Manager")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print how long each startup phase took, then exit.")
+    parser.add_argument("--profile-output", metavar="PATH",
+                        help="With --profile-startup, also write the timings to a JSON file.")
+    parser.add_argument("--watchdog", action="store_true",
+                        help="Report event loop stalls and the handler that caused them.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Run headless: monitor and store the clipboard without opening a window.")
+    parser.add_argument("--attach", action="store_true",
+                        help="Open the window as a client of a running daemon instead of monitoring itself.")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="Socket path used by --daemon, --attach and the window's scripting API (default: per-user temp path).")
+    parser.add_argument("--primary-selection", action="store_true",
+                        help="On Linux, also capture the PRIMARY selection (needs wl-paste, xclip or xsel).")
+    return parser.parse_args()
+
+def clipboard_sources(primary_selection):
+    """Returns (clipboard backend or None for the default, [extra selection backends])."""
+    if not primary_selection:
+        return None, []
+    from clipboard_backends import linux_selection_backends
+    backends = linux_selection_backends()
+    if backends is None:
+        print("--primary-selection needs wl-paste (Wayland), xclip or xsel (X11); capturing the clipboard only.")
+        return None, []
+    # Both selections are read through the same tool, so their values compare reliably
+    return backends["clipboard"], [backends["primary"]]
+
+def finish_startup_profile(app, profiler, output_path):
+    """Reports the startup profile and closes the app without saving the config."""
+    print(profiler.report())
+    if output_path:
+        profiler.save(output_path)
+    if app.clipboard_handler:
+        app.clipboard_handler.stop()
+    app.search_worker.stop()
+    if app.api_server:
+        app.api_server.stop()
+    if app.loop_watchdog:
+        app.loop_watchdog.stop()
+    if app.tray_icon:
+        try:
+            app.tray_icon.stop()
+        except Exception as e:
+            print(f"Error stopping tray icon: {e}")
+    app.after(0, app.destroy)
+
+def connect_to_daemon(path):
+    """Returns a connected DaemonClient, or None (with a message) when no daemon is reachable."""
+    from ipc_client import DaemonClient, DaemonError
+    try:
+        return DaemonClient(path).connect()
+    except (OSError, DaemonError) as e:
+        print(f"Could not attach to the clipboard daemon ({e}); running standalone.")
+        return None
 
 if __name__ == "__main__":
+    args = parse_args()
+    clipboard_backend, selection_backends = clipboard_sources(args.primary_selection)
+    if args.daemon:
+        # The daemon never imports Tk or customtkinter
+        from clipboard_daemon import run_daemon
+        run_daemon(args.socket, clipboard_backend, selection_backends)
+        sys.exit(0)
+
+    import customtkinter as ctk
+    from app_gui import ClipboardManagerApp # Import the main application class
+    from startup_profile import StartupProfiler
+    from loop_watchdog import is_enabled_by_env
+
+    profiler = StartupProfiler(enabled=args.profile_startup, start_time=_start_time)
+    profiler.mark("imports")
+
     # --- Application Setup ---
     # Configure the visual appearance and theme of the application
     ctk.set_appearance_mode("System") # Options: "System", "Dark", "Light"
@@ -16,5 +98,12 @@ if __name__ == "__main__":
 
     # --- Run Application ---
     # Create an instance of the main application window and run it
-    app = ClipboardManagerApp()
+    on_startup_complete = None
+    if args.profile_startup:
+        on_startup_complete = lambda app: finish_startup_profile(app, profiler, args.profile_output)
+    daemon_client = connect_to_daemon(args.socket) if args.attach else None
+    app = ClipboardManagerApp(startup_profiler=profiler, on_startup_complete=on_startup_complete,
+                              watchdog_enabled=args.watchdog or is_enabled_by_env(),
+                              daemon_client=daemon_client, clipboard_backend=clipboard_backend,
+                              selection_backends=selection_backends, socket_path=args.socket)
     app.mainloop()
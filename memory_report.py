@@ -0,0 +1,142 @@
+# memory_report.py
+"""
+Memory accounting for the clipboard history.
+Reports, per category, the item count, payload size, Python object overhead, search index size
+and the number of Tk widgets under the category's tab. AllocationTracker adds on-demand
+`tracemalloc` snapshots that show the top allocation sites and the growth since the previous
+snapshot, which is where leaks (e.g. widgets piling up across re-renders) show up.
+"""
+
+import sys
+import tracemalloc
+
+TRACEMALLOC_FRAMES = 10 # Frames stored per allocation traceback
+TOP_ALLOCATIONS = 25 # Allocation sites listed per snapshot
+
+def count_widgets(widget):
+    """Counts a Tk widget and all of its descendants."""
+    try:
+        children = widget.winfo_children()
+    except Exception:
+        return 0 # Widget already destroyed
+    return 1 + sum(count_widgets(child) for child in children)
+
+def category_memory(cat_data):
+    """Returns item count, UTF-8 payload bytes and Python object bytes of one category's history."""
+    history = cat_data.get("history", [])
+    pinned_history = cat_data.get("pinned_history", [])
+    added_at = cat_data.get("added_at", {})
+    items = pinned_history + history
+    payload_bytes = sum(len(str(item).encode("utf-8")) for item in items)
+    object_bytes = sum(sys.getsizeof(item) for item in items)
+    # Lists, the timestamp dict and its float values
+    container_bytes = sys.getsizeof(history) + sys.getsizeof(pinned_history) + sys.getsizeof(added_at) + \
+                      sum(sys.getsizeof(timestamp) for timestamp in added_at.values())
+    return {
+        "items": len(items),
+        "payload_bytes": payload_bytes,
+        "object_bytes": object_bytes + container_bytes,
+        "overhead_bytes": object_bytes + container_bytes - payload_bytes,
+    }
+
+def build_memory_report(categories, ui_elements=None, search_index=None, root=None):
+    """Returns {"categories": {name: stats}, "totals": stats, ...} for the whole application."""
+    report = {"categories": {}}
+    totals = {"items": 0, "payload_bytes": 0, "object_bytes": 0, "overhead_bytes": 0, "index_bytes": 0, "widgets": 0, "pooled_rows": 0}
+    for cat_name, cat_data in categories.items():
+        stats = category_memory(cat_data)
+        stats["index_bytes"] = search_index.memory_usage(cat_name) if search_index is not None else 0
+        elements = (ui_elements or {}).get(cat_name, {})
+        stats["widgets"] = count_widgets(elements["tab"]) if "tab" in elements else 0
+        history_list = elements.get("history_list")
+        stats["pooled_rows"] = len(history_list.pool) if history_list is not None else 0
+        report["categories"][cat_name] = stats
+        for key in totals:
+            totals[key] += stats[key]
+    report["totals"] = totals
+    if root is not None:
+        report["all_widgets"] = count_widgets(root)
+        try:
+            # Every bind/command callback registers a Tcl command; a count that keeps growing means leaked callbacks
+            report["tcl_commands"] = len(root.tk.call("info", "commands"))
+        except Exception:
+            report["tcl_commands"] = None
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        report["traced_bytes"] = current
+        report["traced_peak_bytes"] = peak
+    return report
+
+def format_bytes(size):
+    """Formats a byte count with a binary unit."""
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} GiB"
+
+def format_memory_report(report):
+    """Returns a memory report as a text table."""
+    header = f"  {'category':<20}{'items':>8}{'payload':>12}{'objects':>12}{'overhead':>12}{'index':>12}{'widgets':>9}{'rows':>6}"
+    lines = ["Memory by category:", header]
+    rows = list(report["categories"].items()) + [("TOTAL", report["totals"])]
+    for name, stats in rows:
+        lines.append(f"  {name[:19]:<20}{stats['items']:>8}{format_bytes(stats['payload_bytes']):>12}"
+                     f"{format_bytes(stats['object_bytes']):>12}{format_bytes(stats['overhead_bytes']):>12}"
+                     f"{format_bytes(stats['index_bytes']):>12}{stats['widgets']:>9}{stats['pooled_rows']:>6}")
+    lines.append("")
+    if "all_widgets" in report:
+        lines.append(f"Tk widgets in the application: {report['all_widgets']}")
+    if report.get("tcl_commands") is not None:
+        lines.append(f"Tcl commands (callbacks):      {report['tcl_commands']}")
+    if "traced_bytes" in report:
+        lines.append(f"tracemalloc: {format_bytes(report['traced_bytes'])} traced, peak {format_bytes(report['traced_peak_bytes'])}")
+    else:
+        lines.append("tracemalloc: not tracing (take an allocation snapshot to start)")
+    return "\n".join(lines)
+
+class AllocationTracker:
+    """On-demand tracemalloc snapshots with a diff against the previous one."""
+
+    def __init__(self, frames=TRACEMALLOC_FRAMES, top=TOP_ALLOCATIONS):
+        self.frames = frames
+        self.top = top
+        self.previous_snapshot = None
+        self.started_here = False
+        self.last_text = "No allocation snapshot yet. Use 'Allocations Snapshot' to take one."
+
+    def snapshot(self):
+        """Takes a snapshot (starting tracemalloc on first use) and returns the formatted result."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.started_here = True
+            self.previous_snapshot = self._take()
+            self.last_text = "tracemalloc started. Take another snapshot later to see what was allocated since."
+            return self.last_text
+
+        snapshot = self._take()
+        lines = [f"Top {self.top} allocation sites:"]
+        for stat in snapshot.statistics("lineno")[:self.top]:
+            lines.append(f"  {format_bytes(stat.size):>12} {stat.count:>8} blocks  {stat.traceback[0]}")
+        if self.previous_snapshot is not None:
+            lines += ["", "Largest growth since the previous snapshot:"]
+            for stat in snapshot.compare_to(self.previous_snapshot, "lineno")[:self.top]:
+                lines.append(f"  {format_bytes(stat.size_diff):>12} {stat.count_diff:>+8} blocks  {stat.traceback[0]}")
+        self.previous_snapshot = snapshot
+        self.last_text = "\n".join(lines)
+        return self.last_text
+
+    @staticmethod
+    def _take():
+        # Leave out tracemalloc's own bookkeeping
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def stop(self):
+        """Stops tracing if this tracker started it."""
+        if self.started_here and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.started_here = False
+        self.previous_snapshot = None
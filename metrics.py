@@ -0,0 +1,266 @@
+# metrics.py
+"""
+In-process metrics registry: counters, histograms and timers, plus end-to-end tracking of
+each clipboard item through the ingest stages (detected -> categorized -> stored -> rendered -> persisted).
+Everything is thread-safe, since the monitor thread and the Tk thread both record into it.
+"""
+
+import bisect
+import collections
+import json
+import os
+import threading
+import time
+
+METRICS_FILE = "clipboard_metrics.json"
+METRICS_WRITE_INTERVAL_S = 30 # How often MetricsFileWriter rewrites the metrics file
+HISTOGRAM_SAMPLES_KEPT = 2048 # Recent observations kept per histogram for percentiles
+RATE_WINDOW_S = 60 # Window used for the recent per-minute rate of counters
+PENDING_INGEST_LIMIT = 5000 # Items tracked between detection and persistence before the oldest are dropped
+INGEST_STAGES = ("detected", "categorized", "transformed", "stored", "rendered", "persisted")
+
+class Counter:
+    """A monotonically increasing count with a recent-rate estimate."""
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+        self._recent = collections.deque(maxlen=10000) # (timestamp, amount) within the rate window
+
+    def inc(self, amount=1):
+        """Adds `amount` to the counter."""
+        self.value += amount
+        self._recent.append((time.monotonic(), amount))
+
+    def per_minute(self):
+        """Returns the number of increments seen during the last RATE_WINDOW_S seconds, scaled to a minute."""
+        cutoff = time.monotonic() - RATE_WINDOW_S
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return sum(amount for _, amount in self._recent) * 60.0 / RATE_WINDOW_S
+
+    def snapshot(self):
+        return {"value": self.value, "per_minute": round(self.per_minute(), 2)}
+
+class Histogram:
+    """Distribution of observed values (milliseconds by convention)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self._samples = collections.deque(maxlen=HISTOGRAM_SAMPLES_KEPT)
+
+    def observe(self, value):
+        """Records a single value."""
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._samples.append(value)
+
+    def percentile(self, percent):
+        """Returns the given percentile (0-100) over the recent samples, or None if there are none."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(round(percent / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def snapshot(self):
+        def rounded(value):
+            return None if value is None else round(value, 3)
+        return {
+            "count": self.count,
+            "mean": rounded(self.total / self.count) if self.count else None,
+            "min": rounded(self.min),
+            "p50": rounded(self.percentile(50)),
+            "p95": rounded(self.percentile(95)),
+            "p99": rounded(self.percentile(99)),
+            "max": rounded(self.max),
+        }
+
+class _Timer:
+    """Context manager observing its elapsed milliseconds into a histogram."""
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.registry.observe(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+class MetricsRegistry:
+    """Named counters and histograms, created on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._pending_ingest = collections.OrderedDict() # {content: {"start", "category", "stages"}}
+        self.started_at = time.time()
+
+    # --- Recording ---
+    def inc(self, name, amount=1):
+        """Increments a counter."""
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                counter = self._counters[name] = Counter(name)
+            counter.inc(amount)
+
+    def observe(self, name, value):
+        """Records a value into a histogram."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(name)
+            histogram.observe(value)
+
+    def timer(self, name):
+        """Returns a context manager timing its block into the `name` histogram (ms)."""
+        return _Timer(self, name)
+
+    # --- Ingest Pipeline ---
+    def ingest_detected(self, content):
+        """Starts tracking a clipboard change seen by the monitor thread."""
+        self.inc("ingest.detected")
+        with self._lock:
+            self._pending_ingest.pop(content, None)
+            self._pending_ingest[content] = {"start": time.perf_counter(), "category": None, "stages": set()}
+            while len(self._pending_ingest) > PENDING_INGEST_LIMIT:
+                self._pending_ingest.popitem(last=False)
+                self._count_locked("ingest.dropped_tracking")
+
+    def ingest_stage(self, content, stage, category_name=None):
+        """Marks one tracked item as having reached `stage`, recording the latency since detection."""
+        with self._lock:
+            entry = self._pending_ingest.get(content)
+            if entry is None or stage in entry["stages"]:
+                return
+            if category_name is not None:
+                entry["category"] = category_name
+            self._reach_stage_locked(entry, stage)
+
+    def ingest_rekey(self, content, new_content):
+        """Keeps tracking an item under its new text after a transform changed it."""
+        if content == new_content:
+            return
+        with self._lock:
+            entry = self._pending_ingest.pop(content, None)
+            if entry is not None:
+                self._pending_ingest[new_content] = entry
+
+    def ingest_rendered(self, category_name):
+        """Marks every stored, not yet rendered item of a category as rendered."""
+        with self._lock:
+            for entry in self._pending_ingest.values():
+                if entry["category"] == category_name and "stored" in entry["stages"] and "rendered" not in entry["stages"]:
+                    self._reach_stage_locked(entry, "rendered")
+
+    def ingest_persisted(self):
+        """Marks every stored item as persisted and stops tracking it."""
+        with self._lock:
+            for content, entry in list(self._pending_ingest.items()):
+                if "stored" in entry["stages"]:
+                    self._reach_stage_locked(entry, "persisted")
+                    del self._pending_ingest[content]
+
+    def _reach_stage_locked(self, entry, stage):
+        entry["stages"].add(stage)
+        self._count_locked(f"ingest.{stage}")
+        histogram_name = f"ingest.{stage}_latency_ms"
+        histogram = self._histograms.get(histogram_name)
+        if histogram is None:
+            histogram = self._histograms[histogram_name] = Histogram(histogram_name)
+        histogram.observe((time.perf_counter() - entry["start"]) * 1000)
+
+    def _count_locked(self, name):
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = Counter(name)
+        counter.inc()
+
+    # --- Export ---
+    def snapshot(self):
+        """Returns all metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "pending_ingest": len(self._pending_ingest),
+                "counters": {name: counter.snapshot() for name, counter in sorted(self._counters.items())},
+                "histograms": {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())},
+            }
+
+    def format_report(self):
+        """Returns the current metrics as human readable text."""
+        data = self.snapshot()
+        lines = [f"Uptime: {data['uptime_s']:.0f} s    Items in flight: {data['pending_ingest']}", "", "Ingest stages:"]
+        for stage in INGEST_STAGES:
+            counter = data["counters"].get(f"ingest.{stage}", {"value": 0, "per_minute": 0})
+            latency = data["histograms"].get(f"ingest.{stage}_latency_ms")
+            latency_text = ""
+            if latency and stage != "detected":
+                latency_text = f"  latency p50 {latency['p50']:.1f} ms  p95 {latency['p95']:.1f} ms  max {latency['max']:.1f} ms"
+            lines.append(f"  {stage:<12}{counter['value']:>8}  ({counter['per_minute']:.1f}/min){latency_text}")
+        lines += ["", "Counters:"]
+        for name, counter in data["counters"].items():
+            if not name.startswith("ingest."):
+                lines.append(f"  {name:<36}{counter['value']:>10}")
+        lines += ["", "Timings (ms):", f"  {'name':<36}{'count':>8}{'p50':>10}{'p95':>10}{'max':>10}"]
+        for name, histogram in data["histograms"].items():
+            if not name.startswith("ingest."):
+                lines.append(f"  {name:<36}{histogram['count']:>8}{histogram['p50']:>10.2f}{histogram['p95']:>10.2f}{histogram['max']:>10.2f}")
+        return "\n".join(lines)
+
+    def write_json(self, path=METRICS_FILE):
+        """Writes a snapshot to `path` atomically (write then rename)."""
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, indent=4)
+            os.replace(temp_path, path)
+            return True
+        except Exception as e:
+            print(f"Error writing metrics to {path}: {e}")
+            return False
+
+class MetricsFileWriter:
+    """Background thread that periodically writes the registry to a JSON file."""
+
+    def __init__(self, registry, path=METRICS_FILE, interval_s=METRICS_WRITE_INTERVAL_S):
+        self.registry = registry
+        self.path = path
+        self.interval_s = interval_s
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts writing in the background."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the writer after one final write."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.registry.write_json(self.path)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval_s):
+            self.registry.write_json(self.path)
+
+# Process-wide registry shared by the handler, the GUI and config_manager
+registry = MetricsRegistry()
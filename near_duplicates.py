@@ -0,0 +1,190 @@
+# near_duplicates.py
+"""
+Near-duplicate detection for categories with "collapse_near_duplicates" set.
+Each item gets a MinHash signature over its words and word pairs (character trigrams for short
+texts), with every number counted as the same word. Signatures are cut into LSH bands, so a
+lookup only compares the items that share a band bucket with the new one instead of the whole
+history. A candidate is a near duplicate when the
+estimated similarity of the two signatures reaches NEAR_DUPLICATE_SIMILARITY.
+A category's existing items are fingerprinted on a background thread (build_async) when collapsing
+is switched on or the app starts; until that finishes, new items are not collapsed.
+"""
+
+import hashlib
+import re
+import threading
+from array import array
+
+SIGNATURE_SIZE = 128 # MinHash values per item, all cut from one 256-byte digest per feature
+LSH_BANDS = 32 # Bands of SIGNATURE_SIZE // LSH_BANDS values; sharing any band makes a candidate
+NEAR_DUPLICATE_SIMILARITY = 0.6 # Estimated Jaccard similarity needed to collapse two items
+MIN_FEATURES = 5 # Shorter items are never treated as near duplicates
+MAX_FINGERPRINT_CHARS = 10000 # Larger items are not fingerprinted (and never collapsed)
+WORD_PATTERN = re.compile(r"\w+")
+NUMBER_TOKEN = "0" # Stands in for every digit-only word (timestamps, counts, ids)
+
+def features(text):
+    """Words and adjacent word pairs of a text, or its character trigrams when it has few words.
+    Digit-only words are all the same feature, so lines that differ only in numbers match."""
+    text = text.lower()
+    words = [NUMBER_TOKEN if word.isdigit() else word for word in WORD_PATTERN.findall(text)]
+    if len(words) >= MIN_FEATURES:
+        return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    compact = " ".join(text.split())
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+def signature(text):
+    """The MinHash signature of a text (SIGNATURE_SIZE 16-bit values as bytes), or None if it is
+    too short to compare or too large to fingerprint."""
+    if len(text) > MAX_FINGERPRINT_CHARS:
+        return None
+    feature_set = features(text)
+    if len(feature_set) < MIN_FEATURES:
+        return None
+    # One digest per feature holds all of its hash values; column i of the array is hash function i
+    values = array("H", b"".join(hashlib.shake_128(feature.encode("utf-8")).digest(2 * SIGNATURE_SIZE)
+                                 for feature in feature_set))
+    return array("H", [min(values[i::SIGNATURE_SIZE]) for i in range(SIGNATURE_SIZE)]).tobytes()
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return sum(a == b for a, b in zip(array("H", signature_a), array("H", signature_b))) / SIGNATURE_SIZE
+
+def _band_keys(item_signature):
+    width = 2 * SIGNATURE_SIZE // LSH_BANDS # Bytes per band
+    return [(band, item_signature[band * width:(band + 1) * width]) for band in range(LSH_BANDS)]
+
+class NearDuplicateIndex:
+    """Per-category MinHash signatures and LSH buckets. A category is only indexed once
+    build() (or a build_async() thread) has finished for it; add() and remove() ignore the others,
+    except that changes made while a build runs are replayed when it finishes."""
+
+    def __init__(self):
+        self._signatures = {} # {category: {item: signature or None}}
+        self._buckets = {} # {category: {(band, values): set(items)}}
+        self._pending = {} # {category: [(added, item)]} changes made while the category is being built
+        self._found = None # (category, text, signature) of the last find(), reused when that text is added
+        self._lock = threading.Lock()
+
+    def is_built(self, category_name):
+        with self._lock:
+            return category_name in self._signatures
+
+    def is_building(self, category_name):
+        with self._lock:
+            return category_name in self._pending
+
+    def build(self, category_name, items):
+        """Indexes a category with its current items, on the calling thread."""
+        computed = {item: signature(item) for item in items}
+        with self._lock:
+            self._install(category_name, computed)
+
+    def build_async(self, category_name, items):
+        """Indexes a category on a background thread. `items` must be a copy; changes made through
+        add() and remove() until the build finishes are applied afterwards. Does nothing if the
+        category is already indexed or being built."""
+        with self._lock:
+            if category_name in self._signatures or category_name in self._pending:
+                return
+            pending = self._pending[category_name] = []
+        threading.Thread(target=self._build_in_background, args=(category_name, items, pending), daemon=True).start()
+
+    def _build_in_background(self, category_name, items, pending):
+        computed = {item: signature(item) for item in items}
+        with self._lock:
+            if self._pending.get(category_name) is not pending:
+                return # The category was dropped while it was being built
+            del self._pending[category_name]
+            self._install(category_name, computed)
+            for added, item in pending:
+                if added:
+                    self._insert(category_name, item, signature(item))
+                else:
+                    self._discard(category_name, item)
+        print(f"Indexed {len(computed)} items of '{category_name}' for near-duplicate detection.")
+
+    def remove_category(self, category_name):
+        """Stops indexing a category (or cancels its build) and frees its signatures."""
+        with self._lock:
+            self._signatures.pop(category_name, None)
+            self._buckets.pop(category_name, None)
+            self._pending.pop(category_name, None)
+            self._found = None
+
+    def add(self, category_name, item):
+        """Indexes an item of a built category. Adding an already indexed item is a no-op.
+        The signature find() just computed for the same text is reused (the ingest path looks a
+        clip up and then adds it)."""
+        with self._lock:
+            if category_name in self._pending:
+                self._pending[category_name].append((True, item))
+                return
+            if category_name not in self._signatures:
+                return
+            found, self._found = self._found, None
+        if found is not None and found[0] == category_name and found[1] == item:
+            item_signature = found[2]
+        else:
+            item_signature = signature(item) # Hashing happens outside the lock
+        with self._lock:
+            self._insert(category_name, item, item_signature)
+
+    def remove(self, category_name, item):
+        """Removes an item from a category's index, if present."""
+        with self._lock:
+            if category_name in self._pending:
+                self._pending[category_name].append((False, item))
+            self._discard(category_name, item)
+
+    # --- Helpers (called with the lock held) ---
+    def _install(self, category_name, computed):
+        self._signatures[category_name] = {}
+        self._buckets[category_name] = {}
+        for item, item_signature in computed.items():
+            self._insert(category_name, item, item_signature)
+
+    def _insert(self, category_name, item, item_signature):
+        signatures = self._signatures.get(category_name)
+        if signatures is None or item in signatures:
+            return
+        signatures[item] = item_signature
+        if item_signature is not None:
+            buckets = self._buckets[category_name]
+            for key in _band_keys(item_signature):
+                buckets.setdefault(key, set()).add(item)
+
+    def _discard(self, category_name, item):
+        signatures = self._signatures.get(category_name)
+        if signatures is None or item not in signatures:
+            return
+        item_signature = signatures.pop(item)
+        if item_signature is not None:
+            buckets = self._buckets[category_name]
+            for key in _band_keys(item_signature):
+                bucket = buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(item)
+                    if not bucket:
+                        del buckets[key]
+
+    # --- Lookup ---
+    def find(self, category_name, text):
+        """Indexed items of a category similar to `text` (but not equal to it), most similar first."""
+        with self._lock:
+            signatures = self._signatures.get(category_name)
+            cached = signatures.get(text) if signatures is not None else None
+        if signatures is None:
+            return []
+        text_signature = cached or signature(text)
+        with self._lock:
+            self._found = (category_name, text, text_signature)
+            if text_signature is None:
+                return []
+            buckets = self._buckets.get(category_name, {})
+            candidates = set()
+            for key in _band_keys(text_signature):
+                candidates.update(buckets.get(key, ()))
+            candidates.discard(text)
+            scored = [(similarity(text_signature, signatures[item]), item) for item in candidates if item in signatures]
+        return [item for score, item in sorted(scored, key=lambda pair: -pair[0]) if score >= NEAR_DUPLICATE_SIMILARITY]
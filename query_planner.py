@@ -0,0 +1,173 @@
+# query_planner.py
+"""
+Parses and plans structured history search queries.
+Besides plain text, a query may contain filters such as `cat:Links`, `pinned:yes`,
+`since:2h`, `size:>10k` and `re:/pattern/`. The planner orders the resulting predicates
+so cheap and indexed checks reject items before the expensive regex verification runs.
+"""
+
+import re
+import time
+
+# --- Query Syntax ---
+TOKEN_PATTERN = re.compile(
+    r'(?P<regex>re:/(?P<regex_body>(?:\\.|[^/\\])*)/(?P<regex_flags>[a-z]*))'
+    r'|(?P<key>cat|pinned|since|size):(?:"(?P<quoted_value>[^"]*)"|(?P<value>\S+))'
+    r'|(?P<text>\S+)'
+)
+TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024 ** 2}
+SIZE_PATTERN = re.compile(r"^(>=|<=|>|<|=)?(\d+(?:\.\d+)?)([bkm]?)$", re.IGNORECASE)
+SINCE_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$", re.IGNORECASE)
+TRUE_VALUES = ("yes", "y", "true", "1")
+FALSE_VALUES = ("no", "n", "false", "0")
+
+# --- Predicate Costs (lower runs first) ---
+COST_PINNED = 0 # Tuple field check
+COST_TEXT_INDEX = 1 # Set membership against trigram-index verified matches
+COST_SIZE = 2 # len() comparison
+COST_SINCE = 3 # Dictionary lookup of the item's timestamp
+COST_TEXT_SCAN = 50 # Unindexed substring scan of the item
+COST_REGEX = 100 # Full regex scan of the item, always verified last
+
+class ParsedQuery:
+    """Structured representation of a search query."""
+
+    def __init__(self):
+        """Initializes an empty query that matches everything."""
+        self.text = "" # Free text, matched as a single case-insensitive substring
+        self.categories = set() # Lowercase category names (any of them may match)
+        self.pinned = None # True/False to restrict, None for both
+        self.since_seconds = None
+        self.size_op = None
+        self.size_value = None
+        self.regex = None # Compiled pattern
+        self.errors = [] # Human readable problems found while parsing
+
+    @property
+    def has_filters(self):
+        """True if the query contains any structured filter besides free text."""
+        return bool(self.categories) or self.pinned is not None or self.since_seconds is not None or \
+               self.size_op is not None or self.regex is not None
+
+    @property
+    def is_empty(self):
+        """True if the query neither filters nor searches for text."""
+        return not self.text and not self.has_filters
+
+def parse_query(query_text):
+    """Parses a search box string into a ParsedQuery. Unknown `key:` prefixes are kept as text."""
+    parsed = ParsedQuery()
+    text_terms = []
+    for match in TOKEN_PATTERN.finditer(query_text or ""):
+        if match.group("regex"):
+            flags = re.IGNORECASE if "i" in match.group("regex_flags") else 0
+            try:
+                parsed.regex = re.compile(match.group("regex_body").replace("\\/", "/"), flags)
+            except re.error as e:
+                parsed.errors.append(f"Invalid regex: {e}")
+        elif match.group("key"):
+            value = match.group("quoted_value") if match.group("quoted_value") is not None else match.group("value")
+            _apply_filter(parsed, match.group("key"), value, text_terms, match.group(0))
+        else:
+            text_terms.append(match.group("text"))
+    # Free text keeps the old behaviour: the whole phrase is one substring
+    parsed.text = " ".join(text_terms)
+    return parsed
+
+def _apply_filter(parsed, key, value, text_terms, raw_token):
+    """Stores a single `key:value` filter on the parsed query."""
+    if key == "cat":
+        parsed.categories.add(value.lower())
+    elif key == "pinned":
+        if value.lower() in TRUE_VALUES:
+            parsed.pinned = True
+        elif value.lower() in FALSE_VALUES:
+            parsed.pinned = False
+        else:
+            parsed.errors.append(f"Invalid pinned value '{value}' (use yes/no)")
+    elif key == "since":
+        since_match = SINCE_PATTERN.match(value)
+        if since_match:
+            parsed.since_seconds = float(since_match.group(1)) * TIME_UNITS[since_match.group(2).lower()]
+        else:
+            parsed.errors.append(f"Invalid since value '{value}' (e.g. 30m, 2h, 7d)")
+    elif key == "size":
+        size_match = SIZE_PATTERN.match(value)
+        if size_match:
+            parsed.size_op = size_match.group(1) or ">="
+            parsed.size_value = float(size_match.group(2)) * SIZE_UNITS[size_match.group(3).lower()]
+        else:
+            parsed.errors.append(f"Invalid size value '{value}' (e.g. >10k, <500)")
+    else:
+        text_terms.append(raw_token)
+
+# --- Planning ---
+class PlanStep:
+    """A single predicate of a plan, with the cost used to order it."""
+
+    def __init__(self, name, cost, test):
+        self.name = name
+        self.cost = cost
+        self.test = test # Callable (item, is_pinned) -> bool
+
+def plan_category(parsed, category_name, cat_data, search_index=None, include_text=True, now=None):
+    """Builds the ordered predicate steps for one category.
+    Returns None if the category is excluded outright (e.g. by `cat:`), so callers can skip it."""
+    if parsed.categories and category_name.lower() not in parsed.categories:
+        return None
+
+    steps = []
+    if parsed.pinned is not None:
+        wanted = parsed.pinned
+        steps.append(PlanStep("pinned", COST_PINNED, lambda item, is_pinned: is_pinned == wanted))
+
+    if include_text and parsed.text:
+        if search_index is not None:
+            # The index narrows and verifies candidates once; each item is then a set lookup
+            text_test = search_index.matcher(category_name, parsed.text)
+            steps.append(PlanStep("text", COST_TEXT_INDEX, lambda item, is_pinned: text_test(item)))
+        else:
+            lowered_text = parsed.text.lower()
+            steps.append(PlanStep("text", COST_TEXT_SCAN, lambda item, is_pinned: lowered_text in str(item).lower()))
+
+    if parsed.size_op is not None:
+        steps.append(PlanStep("size", COST_SIZE, _size_test(parsed.size_op, parsed.size_value)))
+
+    if parsed.since_seconds is not None:
+        cutoff = (now if now is not None else time.time()) - parsed.since_seconds
+        added_at = cat_data.get("added_at", {})
+        # Items without a recorded time (e.g. from older configs) never match
+        steps.append(PlanStep("since", COST_SINCE, lambda item, is_pinned: added_at.get(item, 0) >= cutoff))
+
+    if parsed.regex is not None:
+        search = parsed.regex.search
+        steps.append(PlanStep("regex", COST_REGEX, lambda item, is_pinned: search(str(item)) is not None))
+
+    steps.sort(key=lambda step: step.cost)
+    return steps
+
+def _size_test(op, size_value):
+    """Returns a predicate comparing an item's length in characters against a size."""
+    if op == ">":
+        return lambda item, is_pinned: len(item) > size_value
+    if op == "<":
+        return lambda item, is_pinned: len(item) < size_value
+    if op == "<=":
+        return lambda item, is_pinned: len(item) <= size_value
+    if op == "=":
+        return lambda item, is_pinned: len(item) == size_value
+    return lambda item, is_pinned: len(item) >= size_value
+
+def build_matcher(parsed, category_name, cat_data, search_index=None, include_text=True, now=None):
+    """Returns a predicate (item, is_pinned) -> bool for a category, or None if the category is excluded."""
+    steps = plan_category(parsed, category_name, cat_data, search_index, include_text, now)
+    if steps is None:
+        return None
+    tests = [step.test for step in steps]
+    if not tests:
+        return lambda item, is_pinned: True
+    if len(tests) == 1:
+        return tests[0]
+    # all() short-circuits, so later (expensive) steps only see survivors of the cheap ones
+    return lambda item, is_pinned: all(test(item, is_pinned) for test in tests)
@@ -0,0 +1,191 @@
+# runtime_profiler.py
+"""
+On-demand profiling of a running app, without a restart.
+A session trace-profiles the Tk thread and the clipboard monitor thread with cProfile and,
+alongside, samples both threads' stacks into collapsed-stack (flame graph) format.
+Output files are tagged with the history size and rule count at the time of the run.
+"""
+
+import collections
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+PROFILE_ENV_VAR = "CLIPBOARD_MANAGER_PROFILE" # Seconds to profile right after startup, e.g. 30
+PROFILE_DURATION_S = 30 # Default session length when started from the tray
+PROFILE_OUTPUT_DIR = "profiles"
+SAMPLE_INTERVAL_MS = 5 # Stack sampling period
+MONITOR_RELEASE_TIMEOUT_S = 2.0 # How long to wait for the monitor thread to stop its profiler
+
+def duration_from_env():
+    """Returns the startup profiling duration requested through the environment, or None."""
+    value = os.environ.get(PROFILE_ENV_VAR, "").strip()
+    if not value:
+        return None
+    try:
+        duration = float(value)
+    except ValueError:
+        print(f"Ignoring {PROFILE_ENV_VAR}={value!r}: expected a number of seconds.")
+        return None
+    return duration if duration > 0 else None
+
+class ThreadProfileRequest:
+    """A cProfile run that another thread enables and disables on itself (cProfile is per thread)."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.released = threading.Event()
+        self.error = None
+        self.active = False
+
+    def start(self):
+        """Enables profiling; must be called from the thread to profile."""
+        try:
+            self.profile.enable()
+            self.active = True
+        except ValueError as e:
+            # Python 3.12+ allows only one active cProfile per process; the stack samples still cover this thread
+            self.error = str(e)
+            self.released.set()
+
+    def stop(self):
+        """Disables profiling; must be called from the same thread as start()."""
+        if self.active:
+            self.profile.disable()
+            self.active = False
+        self.released.set()
+
+class StackSampler:
+    """Samples the stacks of selected threads into collapsed-stack counts."""
+
+    def __init__(self, threads, interval_ms=SAMPLE_INTERVAL_MS):
+        """`threads` maps thread names to thread idents."""
+        self.threads = threads
+        self.interval = interval_ms / 1000.0
+        self.counts = collections.Counter() # {"thread;outer;...;inner": samples}
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_name, thread_id in self.threads.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                names.append(thread_name)
+                self.counts[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        """Writes `stack count` lines, the input format of flamegraph.pl and speedscope."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+class ProfilingSession:
+    """Profiles the Tk and monitor threads for a fixed duration, then writes the results."""
+
+    def __init__(self, widget, clipboard_handler, duration_s, tags, output_dir=PROFILE_OUTPUT_DIR, on_done=None):
+        """`widget` schedules the end of the run; `on_done(path_prefix or None)` is called from a worker thread."""
+        self.widget = widget
+        self.clipboard_handler = clipboard_handler
+        self.duration_s = duration_s
+        self.tags = tags
+        self.output_dir = output_dir
+        self.on_done = on_done
+        self.tk_profile = cProfile.Profile()
+        self.monitor_request = None
+        self.sampler = None
+        self.finish_after_id = None
+        self.started_at = None
+        self.finished = False
+
+    def start(self):
+        """Starts profiling; must be called from the Tk thread."""
+        self.started_at = time.time()
+        threads = {"tk": threading.get_ident()}
+        monitor_thread = self.clipboard_handler.monitor_thread if self.clipboard_handler else None
+        if monitor_thread is not None and monitor_thread.is_alive():
+            threads["monitor"] = monitor_thread.ident
+            self.monitor_request = ThreadProfileRequest()
+            self.clipboard_handler.profile_request = self.monitor_request # Picked up on the next poll
+        self.sampler = StackSampler(threads)
+        self.sampler.start()
+        self.tk_profile.enable()
+        self.finish_after_id = self.widget.after(int(self.duration_s * 1000), self.finish)
+        print(f"Profiling started for {self.duration_s:g} s ({', '.join(threads)} threads).")
+
+    def finish(self):
+        """Stops profiling (early if called before the duration ends) and writes output off the Tk thread."""
+        if self.finished:
+            return
+        self.finished = True
+        if self.finish_after_id:
+            try:
+                self.widget.after_cancel(self.finish_after_id)
+            except Exception:
+                pass
+            self.finish_after_id = None
+        self.tk_profile.disable()
+        self.sampler.stop()
+        if self.monitor_request:
+            self.clipboard_handler.profile_request = None # The monitor loop stops its profiler on the next poll
+        threading.Thread(target=self._write_results, daemon=True).start()
+
+    def _write_results(self):
+        path_prefix = None
+        try:
+            if self.monitor_request:
+                self.monitor_request.released.wait(MONITOR_RELEASE_TIMEOUT_S)
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+            path_prefix = os.path.join(self.output_dir, f"profile-{stamp}-h{self.tags.get('history_items', 0)}-r{self.tags.get('rules', 0)}")
+
+            self._dump_stats(self.tk_profile, path_prefix + "-tk.pstats")
+            if self.monitor_request and self.monitor_request.released.is_set() and not self.monitor_request.error:
+                self._dump_stats(self.monitor_request.profile, path_prefix + "-monitor.pstats")
+            self.sampler.write_collapsed(path_prefix + "-stacks.collapsed")
+
+            metadata = dict(self.tags)
+            metadata.update({
+                "started_at": self.started_at,
+                "duration_s": self.duration_s,
+                "stack_samples": self.sampler.samples,
+                "monitor_profile_error": self.monitor_request.error if self.monitor_request else "monitor thread not running",
+            })
+            with open(path_prefix + "-meta.json", 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=4)
+            print(f"Profile written to {path_prefix}-*")
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+            path_prefix = None
+        if self.on_done:
+            self.on_done(path_prefix)
+
+    @staticmethod
+    def _dump_stats(profile, path):
+        try:
+            stats = pstats.Stats(profile)
+        except TypeError:
+            return # Nothing was recorded (e.g. the thread stayed idle in C code)
+        stats.dump_stats(path)
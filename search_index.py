@@ -0,0 +1,124 @@
+# search_index.py
+"""
+In-memory trigram index over clipboard history.
+Maps lowercase character trigrams to the history items containing them, per category,
+so substring searches only verify a small candidate set instead of scanning every item.
+"""
+
+import sys
+import threading
+
+NGRAM_SIZE = 3
+
+def _ngrams(text):
+    """Returns the set of lowercase n-grams contained in a piece of text."""
+    lowered = text.lower()
+    return {lowered[i:i + NGRAM_SIZE] for i in range(len(lowered) - NGRAM_SIZE + 1)}
+
+class HistorySearchIndex:
+    """Trigram inverted index, updated incrementally as items are added, moved or deleted."""
+
+    def __init__(self):
+        """Initializes an empty index."""
+        self._postings = {} # {category: {ngram: set(items)}}
+        self._items = {} # {category: set(items)}
+        self._lock = threading.Lock() # Searches may run outside the main thread
+
+    # --- Building and Updating ---
+    def rebuild(self, categories_data):
+        """Rebuilds the index from scratch for all categories (pinned and normal history)."""
+        with self._lock:
+            self._postings = {}
+            self._items = {}
+        for cat_name, cat_data in categories_data.items():
+            for item in cat_data.get("pinned_history", []) + cat_data.get("history", []):
+                self.add(cat_name, item)
+
+    def add(self, category_name, item):
+        """Indexes an item under a category. Adding an already indexed item is a no-op."""
+        item = str(item)
+        with self._lock:
+            items = self._items.setdefault(category_name, set())
+            if item in items:
+                return
+            items.add(item)
+            postings = self._postings.setdefault(category_name, {})
+            for gram in _ngrams(item):
+                postings.setdefault(gram, set()).add(item)
+
+    def remove(self, category_name, item):
+        """Removes an item from a category's index, if present."""
+        item = str(item)
+        with self._lock:
+            items = self._items.get(category_name)
+            if not items or item not in items:
+                return
+            items.discard(item)
+            postings = self._postings.get(category_name, {})
+            for gram in _ngrams(item):
+                bucket = postings.get(gram)
+                if bucket is not None:
+                    bucket.discard(item)
+                    if not bucket:
+                        del postings[gram]
+
+    def move(self, source_category, destination_category, item):
+        """Re-indexes an item that moved between categories."""
+        self.remove(source_category, item)
+        self.add(destination_category, item)
+
+    def remove_category(self, category_name):
+        """Drops every index entry belonging to a category."""
+        with self._lock:
+            self._postings.pop(category_name, None)
+            self._items.pop(category_name, None)
+
+    def memory_usage(self, category_name):
+        """Approximate bytes used by a category's index structures (the item strings are shared with the history)."""
+        with self._lock:
+            postings = self._postings.get(category_name, {})
+            items = self._items.get(category_name, set())
+            total = sys.getsizeof(postings) + sys.getsizeof(items)
+            for gram, bucket in postings.items():
+                total += sys.getsizeof(gram) + sys.getsizeof(bucket)
+            return total
+
+    # --- Querying ---
+    def candidates(self, category_name, query):
+        """Returns the items that may contain the query, or None if the query is too short to narrow.
+        Candidates still need to be verified with a real substring check."""
+        grams = _ngrams(query)
+        if not grams:
+            return None
+        with self._lock:
+            postings = self._postings.get(category_name, {})
+            # Intersect the smallest posting lists first
+            buckets = sorted((postings.get(gram, set()) for gram in grams), key=len)
+            if not buckets[0]:
+                return set()
+            result = set(buckets[0])
+            for bucket in buckets[1:]:
+                result &= bucket
+                if not result:
+                    break
+            return result
+
+    def matcher(self, category_name, query):
+        """Returns a predicate telling whether an item of the category contains the query."""
+        query = query.lower()
+        if not query:
+            return lambda item: True
+
+        candidates = self.candidates(category_name, query)
+        if candidates is None:
+            # Query shorter than an n-gram, fall back to a per-item check
+            return lambda item: query in str(item).lower()
+
+        matches = {item for item in candidates if query in item.lower()}
+        return matches.__contains__
+
+    def filter_items(self, category_name, query, items):
+        """Returns the items (in their original order) that contain the query, case-insensitively."""
+        if not query:
+            return list(items)
+        return list(filter(self.matcher(category_name, query), items))
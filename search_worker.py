@@ -0,0 +1,125 @@
+# search_worker.py
+"""
+Background search execution for the history search boxes.
+Runs one search at a time on a worker thread, streams matches back in batches,
+and cancels a category's running search as soon as a newer query replaces it.
+"""
+
+import queue
+import threading
+
+SEARCH_BATCH_SIZE = 200 # Items checked between cancellation checks / result flushes
+
+class SearchJob:
+    """A single search request. Cancelled jobs stop at the next batch boundary."""
+
+    def __init__(self, key, rows, make_predicate, on_batch, on_done, more_batches=None, initial_matches=0):
+        """Stores the snapshot of rows to scan and the callbacks to report results."""
+        self.key = key
+        self.rows = rows # List of (item, is_pinned) tuples, snapshotted by the caller
+        self.make_predicate = make_predicate # Builds a (item, is_pinned) predicate on the worker thread
+        self.on_batch = on_batch # Called from the worker thread with (job, matched_rows)
+        self.on_done = on_done # Called from the worker thread with (job, match_count)
+        self.more_batches = more_batches # Optional callable(job) yielding further, already matched, row batches (e.g. archived items)
+        self.initial_matches = initial_matches # Matches shown before this job started, included in the done count
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Marks the job as cancelled."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        """Scans the rows in batches, streaming matches back as they are found."""
+        predicate = self.make_predicate()
+        match_count = self.initial_matches
+        for start in range(0, len(self.rows), SEARCH_BATCH_SIZE):
+            if self.cancelled:
+                return
+            batch = [row for row in self.rows[start:start + SEARCH_BATCH_SIZE] if predicate(*row)]
+            if batch:
+                match_count += len(batch)
+                self.on_batch(self, batch)
+        if self.more_batches is not None:
+            for batch in self.more_batches(self):
+                if self.cancelled:
+                    return
+                match_count += len(batch)
+                self.on_batch(self, batch)
+        if not self.cancelled:
+            self.on_done(self, match_count)
+
+class ResultStreamJob(SearchJob):
+    """A search whose producer yields successive (improving) result snapshots."""
+
+    def __init__(self, key, produce, on_result):
+        """Stores the producer, a generator function taking the job, and the result callback."""
+        super().__init__(key, rows=None, make_predicate=None, on_batch=None, on_done=None)
+        self.produce = produce
+        self.on_result = on_result # Called from the worker thread with (job, result)
+
+    def run(self):
+        """Forwards every snapshot the producer yields until it finishes or the job is cancelled."""
+        for result in self.produce(self):
+            if self.cancelled:
+                return
+            self.on_result(self, result)
+
+class SearchWorker:
+    """Single worker thread that executes SearchJobs, newest query wins per key."""
+
+    def __init__(self):
+        """Initializes the job queue and starts the worker thread."""
+        self._jobs = queue.Queue()
+        self._active = {} # {key: latest SearchJob}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, rows, make_predicate, on_batch, on_done, more_batches=None):
+        """Queues a filtering search, cancelling any previous search for the same key."""
+        return self.submit_job(SearchJob(key, rows, make_predicate, on_batch, on_done, more_batches))
+
+    def submit_job(self, job):
+        """Queues an already constructed job, cancelling any previous search for the same key."""
+        key = job.key
+        with self._lock:
+            previous = self._active.get(key)
+            if previous:
+                previous.cancel()
+            self._active[key] = job
+        self._jobs.put(job)
+        return job
+
+    def cancel(self, key):
+        """Cancels the running or queued search for a key, if any."""
+        with self._lock:
+            job = self._active.pop(key, None)
+        if job:
+            job.cancel()
+
+    def is_current(self, job):
+        """Returns True if the job is still the latest, uncancelled search for its key."""
+        with self._lock:
+            return not job.cancelled and self._active.get(job.key) is job
+
+    def stop(self):
+        """Stops the worker thread after the current batch."""
+        self._jobs.put(None)
+
+    # --- Worker Loop ---
+    def _run(self):
+        """Processes queued jobs, skipping ones that were superseded before they started."""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            if job.cancelled:
+                continue
+            try:
+                job.run()
+            except Exception as e:
+                print(f"Error running search for '{job.key}': {e}")
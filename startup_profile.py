@@ -0,0 +1,46 @@
+# startup_profile.py
+"""
+Per-phase timing of application startup (time to first window and to fully initialized).
+Used by `main.py --profile-startup`; when profiling is off every call is a cheap no-op.
+"""
+
+import json
+import time
+
+class StartupProfiler:
+    """Records named startup phases and the time each one took."""
+
+    def __init__(self, enabled=False, start_time=None):
+        """Starts the clock at `start_time` (a time.perf_counter() value) or now."""
+        self.enabled = enabled
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.last_time = self.start_time
+        self.phases = [] # [(phase name, seconds spent, seconds since start)]
+
+    def mark(self, phase_name):
+        """Ends the current phase, naming it `phase_name`."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase_name, now - self.last_time, now - self.start_time))
+        self.last_time = now
+
+    def report(self):
+        """Returns a human readable table of the recorded phases."""
+        lines = ["Startup profile:", f"  {'phase':<34}{'took (ms)':>12}{'at (ms)':>12}"]
+        for phase_name, duration, elapsed in self.phases:
+            lines.append(f"  {phase_name:<34}{duration * 1000:>12.1f}{elapsed * 1000:>12.1f}")
+        return "\n".join(lines)
+
+    def save(self, path):
+        """Writes the recorded phases as JSON, e.g. for comparison in CI."""
+        data = {
+            "phases": [{"name": name, "ms": round(duration * 1000, 3), "at_ms": round(elapsed * 1000, 3)}
+                       for name, duration, elapsed in self.phases]
+        }
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+            print(f"Startup profile saved to {path}")
+        except Exception as e:
+            print(f"Error saving startup profile to {path}: {e}")
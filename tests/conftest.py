@@ -0,0 +1,7 @@
+# conftest.py
+"""Puts the application modules (in the repository root) on the import path for the tests."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
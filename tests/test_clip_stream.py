@@ -0,0 +1,75 @@
+# test_clip_stream.py
+"""Tests for merging clipboard and selection changes into one stream (clipboard_handler.py)."""
+
+import threading
+
+from clipboard_backends import FakeClipboardBackend
+from clipboard_handler import ClipboardHandler, ClipboardSource, ClipStream, DUPLICATE_WINDOW_S
+
+def make_sources():
+    clipboard = ClipboardSource(FakeClipboardBackend())
+    primary_backend = FakeClipboardBackend()
+    primary_backend.name = "primary"
+    primary = ClipboardSource(primary_backend, settle_s=0.5, min_interval_s=2.0)
+    return clipboard, primary
+
+def test_clips_come_out_in_detection_order():
+    clipboard, primary = make_sources()
+    stream = ClipStream()
+    stream.offer(primary, "selected", 10.0)
+    stream.offer(clipboard, "copied", 10.1)
+    assert stream.ready(10.2) == [] # The settling selection holds back the later clip
+    assert stream.ready(10.6) == [("selected", primary), ("copied", clipboard)]
+
+def test_text_seen_on_two_sources_is_ingested_once():
+    clipboard, primary = make_sources()
+    stream = ClipStream()
+    stream.offer(primary, "same text", 10.0)
+    assert stream.ready(10.5) == [("same text", primary)]
+    stream.offer(clipboard, "same text", 11.0) # Selected, then copied
+    assert stream.ready(11.0) == []
+    stream.offer(clipboard, "same text", 11.0 + DUPLICATE_WINDOW_S)
+    assert stream.ready(11.0 + DUPLICATE_WINDOW_S) == [("same text", clipboard)]
+
+def test_a_selection_still_growing_is_only_ingested_once_settled():
+    _, primary = make_sources()
+    stream = ClipStream()
+    for step, text in enumerate(["h", "he", "hel", "hello"]):
+        stream.offer(primary, text, 10.0 + step * 0.1)
+    assert stream.ready(10.5) == []
+    assert stream.ready(10.8) == [("hello", primary)]
+
+def test_selection_clips_are_rate_limited():
+    clipboard, primary = make_sources()
+    stream = ClipStream()
+    stream.offer(primary, "first", 10.0)
+    assert stream.ready(10.5) == [("first", primary)]
+    stream.offer(primary, "second", 11.0)
+    assert stream.ready(11.6) == [] # Settled, but within min_interval_s of "first"
+    assert stream.ready(12.5) == [("second", primary)]
+    stream.offer(clipboard, "copied", 12.6) # The clipboard has no limits
+    assert stream.ready(12.6) == [("copied", clipboard)]
+
+def test_handler_names_the_selection_a_clip_came_from():
+    clipboard_backend = FakeClipboardBackend()
+    primary_backend = FakeClipboardBackend()
+    primary_backend.name = "primary"
+    clips = []
+    received = threading.Event()
+    def process(text, selection):
+        clips.append((text, selection))
+        if len(clips) == 2:
+            received.set()
+    handler = ClipboardHandler({}, process, backend=clipboard_backend, poll_interval=0.01,
+                               selection_backends=[primary_backend])
+    for source in handler.sources[1:]:
+        source.settle_s = source.min_interval_s = 0.0
+    handler.start_monitoring()
+    try:
+        clipboard_backend.write("from the clipboard")
+        primary_backend.write("from the selection")
+        assert received.wait(5)
+    finally:
+        handler.stop()
+        handler.join()
+    assert sorted(clips) == [("from the clipboard", None), ("from the selection", "primary")]
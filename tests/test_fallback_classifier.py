@@ -0,0 +1,51 @@
+# test_fallback_classifier.py
+"""Tests for the learned fallback category (fallback_classifier.py); skipped without NumPy."""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from fallback_classifier import FallbackClassifier, UNCATEGORIZED
+
+def examples():
+    links = [("Links", f"https://example.com/articles/{word}/index.html") for word in
+             ("alpha", "beta", "gamma", "delta", "epsilon", "zeta")]
+    notes = [(UNCATEGORIZED, f"remember to {word} the groceries tomorrow morning") for word in
+             ("buy", "pick up", "order", "collect", "fetch", "bring")]
+    return links + notes
+
+def test_confident_suggestion_is_used_only_without_a_rule_match():
+    classifier = FallbackClassifier()
+    classifier.train(examples())
+    assert classifier.categorize("https://example.com/articles/theta/index.html", UNCATEGORIZED) == "Links"
+    assert classifier.categorize("https://example.com/articles/theta/index.html", "Code") == "Code"
+
+def test_suggestion_for_an_unknown_category_is_rejected():
+    classifier = FallbackClassifier()
+    classifier.train(examples())
+    clip = "https://example.com/articles/theta/index.html"
+    assert classifier.categorize(clip, UNCATEGORIZED, {UNCATEGORIZED: {}}) == UNCATEGORIZED
+
+def test_category_deleted_while_training_does_not_come_back():
+    classifier = FallbackClassifier()
+    classifier.learn("Links", "https://example.com/articles/eta/index.html") # Queued until trained
+    classifier.remove_category("Links")
+    classifier.train(examples())
+    assert "Links" not in classifier.category_names
+    assert classifier.suggest("https://example.com/articles/theta/index.html")[0] != "Links"
+
+def test_category_deleted_after_training_is_forgotten():
+    classifier = FallbackClassifier()
+    classifier.train(examples())
+    classifier.remove_category("Links")
+    assert classifier.category_names == [UNCATEGORIZED]
+    assert len(classifier.document_counts) == 1
+
+def test_relabel_moves_an_item_between_categories():
+    classifier = FallbackClassifier()
+    classifier.train(examples())
+    before = dict(zip(classifier.category_names, classifier.document_counts))
+    classifier.relabel(UNCATEGORIZED, "Links", "remember to buy the groceries tomorrow morning")
+    after = dict(zip(classifier.category_names, classifier.document_counts))
+    assert after["Links"] == before["Links"] + 1
+    assert after[UNCATEGORIZED] == before[UNCATEGORIZED] - 1
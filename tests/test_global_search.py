@@ -0,0 +1,58 @@
+# test_global_search.py
+"""Tests for ranked fuzzy search (global_search.py)."""
+
+import time
+
+from global_search import build_fuzzy_pattern, collect_rows, rank_rows, rank_batches, merge_ranked
+
+def test_fuzzy_pattern_matches_characters_in_order_within_one_item():
+    pattern = build_fuzzy_pattern("gh c")
+    assert pattern.match("github.com")
+    assert not pattern.match("cgh")
+    assert not pattern.match("gh\x00com") # Never spans the separator between items
+    assert build_fuzzy_pattern("   ") is None
+
+def test_fuzzy_pattern_escapes_regex_characters():
+    assert build_fuzzy_pattern("a.b").match("a.xb")
+    assert not build_fuzzy_pattern("a.b").match("axxb")
+
+def test_collect_rows_applies_matchers_and_skips_excluded_categories():
+    data = {"A": {"history": ["x", "y"], "pinned_history": ["p"]}, "B": {"history": ["z"], "pinned_history": []}}
+    assert collect_rows(data) == [("A", "p", True, 0), ("A", "x", False, 0), ("A", "y", False, 1), ("B", "z", False, 0)]
+    rows = collect_rows(data, {"A": lambda item, is_pinned: not is_pinned, "B": None})
+    assert rows == [("A", "x", False, 0), ("A", "y", False, 1)]
+
+def test_rank_rows_prefers_tight_and_recent_matches():
+    rows = [("A", "g x x x x h", False, 0), ("A", "github", False, 5), ("A", "nothing", False, 1)]
+    results = list(rank_rows(rows, "gh"))[-1]
+    assert [row[1] for _, row in results] == ["github", "g x x x x h"]
+
+def test_rank_rows_with_empty_query_ranks_by_recency():
+    rows = [("A", "old", False, 9), ("A", "pinned", True, 3), ("A", "new", False, 0)]
+    results = list(rank_rows(rows, ""))[-1]
+    assert [row[1] for _, row in results] == ["pinned", "new", "old"]
+
+def test_rank_rows_keeps_only_the_limit_and_yields_per_batch():
+    rows = [("A", f"item {i}", False, i) for i in range(50)]
+    rankings = list(rank_rows(rows, "item", limit=5, batch_size=10))
+    assert len(rankings) == 5
+    assert [row[3] for _, row in rankings[-1]] == [0, 1, 2, 3, 4]
+
+def test_rank_rows_stops_when_cancelled():
+    rows = [("A", "item", False, i) for i in range(30)]
+    assert list(rank_rows(rows, "item", batch_size=10, should_stop=lambda: True)) == []
+
+def test_rank_batches_matches_rank_rows():
+    rows = [("A", f"entry {i} {'x' * (i % 7)}", False, i) for i in range(100)]
+    expected = list(rank_rows(rows, "ex", limit=10, batch_size=25))[-1]
+    batches = (rows[start:start + 25] for start in range(0, len(rows), 25))
+    assert list(rank_batches(batches, "ex", limit=10))[-1] == expected
+
+def test_failing_match_on_a_long_item_is_linear():
+    started = time.perf_counter()
+    assert list(rank_rows([("A", "a" * 20000, False, 0)], "az"))[-1] == []
+    assert time.perf_counter() - started < 0.5
+
+def test_merge_ranked_keeps_the_best_entries():
+    merged = merge_ranked([(0.9, "a"), (0.1, "b")], [(0.5, "c")], limit=2)
+    assert merged == [(0.9, "a"), (0.5, "c")]
@@ -0,0 +1,86 @@
+# test_history_archive.py
+"""Tests for the on-disk archive of trimmed history (history_archive.py)."""
+
+import os
+
+from history_archive import HistoryArchive, CategoryArchive, RECORD_HEADER, OFFSET, archive_rows
+from query_planner import parse_query
+
+def texts(archive, category_name="Text", query="", **kwargs):
+    return [row[1] for rows in archive_rows(archive, category_name, parse_query(query), **kwargs) for row in rows]
+
+def test_items_are_read_newest_first_in_batches(tmp_path):
+    archive = HistoryArchive(str(tmp_path))
+    archive.append("Text", [(f"item {i}", float(i)) for i in range(7)])
+    batches = list(archive.get("Text").iter_batches(batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert batches[0][0] == (0, "item 6", 6.0)
+    assert batches[-1][0] == (6, "item 0", 0.0)
+
+def test_skip_passes_over_the_newest_records(tmp_path):
+    archive = HistoryArchive(str(tmp_path))
+    archive.append("Text", [(f"item {i}", 0.0) for i in range(5)])
+    rows = [row for rows in archive_rows(archive, "Text", parse_query(""), start_position=10, skip=2) for row in rows]
+    assert [(row[1], row[3]) for row in rows] == [("item 2", 12), ("item 1", 13), ("item 0", 14)]
+
+def test_forget_hides_only_copies_archived_before_it(tmp_path):
+    archive = HistoryArchive(str(tmp_path))
+    archive.append("Text", [("secret", 1.0), ("other", 2.0)])
+    archive.forget("Text", ["secret"])
+    assert texts(archive) == ["other"]
+    archive.append("Text", [("secret", 3.0)]) # Copied and trimmed again after the delete
+    assert texts(archive) == ["secret", "other"]
+
+def test_tombstones_written_by_another_process_are_picked_up(tmp_path):
+    writer = HistoryArchive(str(tmp_path))
+    writer.append("Text", [("secret", 1.0), ("other", 2.0)])
+    reader = HistoryArchive(str(tmp_path), read_only=True)
+    assert texts(reader) == ["other", "secret"]
+    writer.forget("Text", ["secret"])
+    assert texts(reader) == ["other"]
+
+def test_repeated_copies_are_yielded_once_with_the_newest_position(tmp_path):
+    archive = HistoryArchive(str(tmp_path))
+    archive.append("Text", [("same", 1.0), ("a", 2.0), ("same", 3.0), ("b", 4.0)])
+    category_archive = archive.get("Text")
+    rows = [row for rows in archive_rows(archive, "Text", parse_query("")) for row in rows]
+    assert [(row[1], row[3]) for row in rows] == [("b", 0), ("same", 1), ("a", 2)]
+    # Across batches too
+    archive.append("Text", [("same", 5.0)] + [(f"filler {i}", 6.0) for i in range(600)])
+    found = texts(archive)
+    assert found.count("same") == 1
+    assert len(found) == len(set(found)) == 603
+    assert len(category_archive) == 605
+
+def test_since_filter_uses_the_newest_copy_time(tmp_path):
+    import time
+    archive = HistoryArchive(str(tmp_path))
+    archive.append("Text", [("same", 1.0), ("same", time.time())])
+    assert texts(archive, query="since:1h") == ["same"]
+
+def test_exclude_skips_items_back_in_the_history(tmp_path):
+    archive = HistoryArchive(str(tmp_path))
+    archive.append("Text", [("hot again", 1.0), ("cold", 2.0)])
+    assert texts(archive, exclude={"hot again"}) == ["cold"]
+
+def test_repair_indexes_records_missing_from_the_index(tmp_path):
+    archive = CategoryArchive(str(tmp_path), "Text")
+    archive.append([("one", 1.0), ("two", 2.0)])
+    with open(archive.index_path, "r+b") as f:
+        f.truncate(OFFSET.size + 3) # Lost the second entry and left half of it behind
+    with open(archive.data_path, "ab") as f:
+        f.write(RECORD_HEADER.pack(100, 3.0) + b"cut short") # A record interrupted by a crash
+    repaired = CategoryArchive(str(tmp_path), "Text")
+    assert len(repaired) == 2
+    assert [text for batch in repaired.iter_batches() for _, text, _ in batch] == ["two", "one"]
+    assert os.path.getsize(repaired.index_path) == 2 * OFFSET.size
+    repaired.append([("three", 4.0)]) # Appends start on a record boundary again
+    assert [text for batch in repaired.iter_batches() for _, text, _ in batch] == ["three", "two", "one"]
+
+def test_remove_category_deletes_the_files(tmp_path):
+    archive = HistoryArchive(str(tmp_path))
+    archive.append("Text", [("one", 1.0)])
+    archive.forget("Text", ["nothing"])
+    archive.remove_category("Text")
+    assert archive.count("Text") == 0
+    assert os.listdir(tmp_path) == []
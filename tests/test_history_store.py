@@ -0,0 +1,120 @@
+# test_history_store.py
+"""Tests for history edits (history_store.py)."""
+
+from history_store import HistoryStore
+from near_duplicates import NearDuplicateIndex
+from search_index import HistorySearchIndex
+
+def make_store(limit=5, near_duplicates=None, collapse=False):
+    categories = {
+        "Text": {"rules": [], "history": [], "pinned_history": [], "collapse_near_duplicates": collapse},
+        "Code": {"rules": [], "history": [], "pinned_history": []},
+    }
+    index = HistorySearchIndex()
+    return HistoryStore(categories, index, limit=limit, near_duplicates=near_duplicates), categories, index
+
+def test_add_puts_item_on_top_and_trims_to_limit():
+    store, categories, index = make_store(limit=3)
+    for item in ["a", "b", "c", "d"]:
+        trimmed = store.add("Text", item)
+    assert trimmed == ["a"]
+    assert categories["Text"]["history"] == ["d", "c", "b"]
+    assert "a" not in categories["Text"]["added_at"]
+    assert index.candidates("Text", "aaa") == set()
+
+def test_add_to_unknown_category_returns_none():
+    store, _, _ = make_store()
+    assert store.add("Missing", "x") is None
+
+def test_re_adding_a_pinned_item_unpins_it():
+    store, categories, _ = make_store()
+    store.add("Text", "keep me")
+    assert store.pin("Text", "keep me")
+    store.add("Text", "keep me")
+    assert categories["Text"]["pinned_history"] == []
+    assert categories["Text"]["history"] == ["keep me"]
+
+def test_pin_and_unpin():
+    store, categories, _ = make_store()
+    store.add("Text", "one")
+    store.add("Text", "two")
+    assert store.pin("Text", "one")
+    assert not store.pin("Text", "one")
+    assert categories["Text"]["pinned_history"] == ["one"]
+    assert store.unpin("Text", "one")
+    assert categories["Text"]["history"] == ["one", "two"]
+
+def test_bump_moves_only_unpinned_items():
+    store, categories, _ = make_store()
+    for item in ["one", "two", "three"]:
+        store.add("Text", item)
+    store.pin("Text", "two")
+    assert store.bump("Text", "one")
+    assert categories["Text"]["history"] == ["one", "three"]
+    assert not store.bump("Text", "two")
+
+def test_move_keeps_copy_time_and_versions():
+    store, categories, index = make_store()
+    store.add("Text", "print('hi')", added_time=100.0)
+    categories["Text"]["versions"] = {"print('hi')": 3}
+    assert store.move("Text", "Code", "print('hi')") == (True, True)
+    assert categories["Text"]["history"] == []
+    assert categories["Code"]["history"] == ["print('hi')"]
+    assert categories["Code"]["added_at"]["print('hi')"] == 100.0
+    assert store.version_count("Code", "print('hi')") == 3
+    assert index.candidates("Text", "print") == set()
+    assert index.candidates("Code", "print") == {"print('hi')"}
+
+def test_move_of_missing_item_adds_nothing():
+    store, categories, _ = make_store()
+    assert store.move("Text", "Code", "never copied") == (False, False)
+    assert store.move("Missing", "Code", "never copied") == (False, False)
+    assert categories["Code"]["history"] == []
+
+def test_move_to_unknown_destination_only_removes():
+    store, categories, _ = make_store()
+    store.add("Text", "orphan")
+    assert store.move("Text", "Missing", "orphan") == (True, False)
+    assert categories["Text"]["history"] == []
+
+def test_delete_many_reports_missing_items():
+    store, categories, index = make_store()
+    for item in ["one", "two", "three"]:
+        store.add("Text", item)
+    store.pin("Text", "two")
+    deleted, missing = store.delete_many("Text", ["one", "two", "nope"])
+    assert deleted == 2
+    assert missing == ["nope"]
+    assert categories["Text"]["history"] == ["three"]
+    assert categories["Text"]["pinned_history"] == []
+    assert index.candidates("Text", "one") == set()
+
+def test_pin_many_and_unpin_many():
+    store, categories, _ = make_store()
+    for item in ["one", "two"]:
+        store.add("Text", item)
+    assert store.pin_many("Text", ["one", "two", "nope"]) == (2, ["nope"])
+    assert store.pin_many("Text", ["one"]) == (1, []) # Already pinned counts
+    assert store.unpin_many("Text", ["one", "nope"]) == (1, ["nope"])
+    assert categories["Text"]["history"] == ["one"]
+
+def test_near_duplicates_collapse_into_the_newest_item():
+    near_duplicates = NearDuplicateIndex()
+    near_duplicates.build("Text", [])
+    collapses = []
+    store, categories, _ = make_store(near_duplicates=near_duplicates, collapse=True)
+    store.on_collapse = lambda *collapse: collapses.append(collapse)
+    first = "Build 1041 finished in 12 seconds with 0 warnings on branch main"
+    second = "Build 1042 finished in 15 seconds with 0 warnings on branch main"
+    store.add("Text", first)
+    store.add("Text", second)
+    assert categories["Text"]["history"] == [second]
+    assert store.version_count("Text", second) == 2
+    assert collapses == [("Text", second, first)]
+
+def test_absorb_ignores_items_not_in_history():
+    store, categories, _ = make_store()
+    store.add("Text", "kept")
+    assert not store.absorb("Text", "kept", "gone")
+    assert not store.absorb("Text", "kept", "kept")
+    assert categories["Text"]["history"] == ["kept"]
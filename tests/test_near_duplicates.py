@@ -0,0 +1,78 @@
+# test_near_duplicates.py
+"""Tests for MinHash near-duplicate detection (near_duplicates.py)."""
+
+import threading
+
+import near_duplicates
+from near_duplicates import NearDuplicateIndex, signature, similarity, features, SIGNATURE_SIZE, MAX_FINGERPRINT_CHARS
+
+BUILD_LOG = "Build 1041 finished in 12 seconds with 0 warnings on branch main"
+BUILD_LOG_AGAIN = "Build 1042 finished in 15 seconds with 0 warnings on branch main"
+UNRELATED = "Remember to water the plants on the balcony before leaving for the weekend"
+
+def test_numbers_count_as_the_same_word():
+    assert features(BUILD_LOG) == features(BUILD_LOG_AGAIN)
+    assert similarity(signature(BUILD_LOG), signature(BUILD_LOG_AGAIN)) == 1.0
+
+def test_signature_size_and_limits():
+    assert len(signature(BUILD_LOG)) == 2 * SIGNATURE_SIZE
+    assert signature("ok") is None
+    assert signature("word " * (MAX_FINGERPRINT_CHARS // 5 + 1)) is None
+
+def test_find_returns_similar_items_but_not_the_text_itself():
+    index = NearDuplicateIndex()
+    index.build("Text", [BUILD_LOG, UNRELATED])
+    assert index.find("Text", BUILD_LOG_AGAIN) == [BUILD_LOG]
+    assert index.find("Text", BUILD_LOG) == []
+    assert index.find("Other", BUILD_LOG) == []
+
+def test_add_and_remove_only_touch_built_categories():
+    index = NearDuplicateIndex()
+    index.add("Text", BUILD_LOG)
+    assert not index.is_built("Text")
+    index.build("Text", [])
+    index.add("Text", BUILD_LOG)
+    assert index.find("Text", BUILD_LOG_AGAIN) == [BUILD_LOG]
+    index.remove("Text", BUILD_LOG)
+    assert index.find("Text", BUILD_LOG_AGAIN) == []
+
+def test_add_reuses_the_signature_computed_by_find(monkeypatch):
+    index = NearDuplicateIndex()
+    index.build("Text", [BUILD_LOG])
+    calls = []
+    def counting_signature(text):
+        calls.append(text)
+        return signature(text)
+    monkeypatch.setattr(near_duplicates, "signature", counting_signature)
+    index.find("Text", BUILD_LOG_AGAIN)
+    index.add("Text", BUILD_LOG_AGAIN)
+    assert calls == [BUILD_LOG_AGAIN]
+    index.add("Text", UNRELATED) # A different text is hashed as usual
+    assert calls == [BUILD_LOG_AGAIN, UNRELATED]
+
+def test_changes_during_a_background_build_are_replayed(monkeypatch):
+    release = threading.Event()
+    def slow_signature(text):
+        release.wait(5)
+        return signature(text)
+    monkeypatch.setattr(near_duplicates, "signature", slow_signature)
+    index = NearDuplicateIndex()
+    index.build_async("Text", [BUILD_LOG, UNRELATED])
+    assert index.is_building("Text") and not index.is_built("Text")
+    index.remove("Text", UNRELATED)
+    index.add("Text", BUILD_LOG_AGAIN)
+    release.set()
+    for _ in range(500):
+        if index.is_built("Text"):
+            break
+        threading.Event().wait(0.01)
+    assert index.is_built("Text") and not index.is_building("Text")
+    assert index.find("Text", BUILD_LOG) == [BUILD_LOG_AGAIN]
+    assert index.find("Text", UNRELATED) == []
+
+def test_remove_category_drops_the_index():
+    index = NearDuplicateIndex()
+    index.build("Text", [BUILD_LOG])
+    index.remove_category("Text")
+    assert not index.is_built("Text")
+    assert index.find("Text", BUILD_LOG_AGAIN) == []
@@ -0,0 +1,45 @@
+# test_query_planner.py
+"""Tests for search query parsing and planning (query_planner.py)."""
+
+from query_planner import parse_query, plan_category, build_matcher, COST_REGEX
+
+def test_parse_query_reads_filters_and_free_text():
+    parsed = parse_query('cat:Links cat:"My Notes" pinned:yes since:2h size:>10k re:/foo\\/bar/i hello world')
+    assert parsed.categories == {"links", "my notes"}
+    assert parsed.pinned is True
+    assert parsed.since_seconds == 7200
+    assert (parsed.size_op, parsed.size_value) == (">", 10 * 1024)
+    assert parsed.regex.search("FOO/BAR")
+    assert parsed.text == "hello world"
+    assert not parsed.errors
+
+def test_parse_query_reports_invalid_values():
+    parsed = parse_query("pinned:maybe since:soon size:huge re:/(/")
+    assert len(parsed.errors) == 4
+
+def test_unknown_keys_stay_text():
+    parsed = parse_query("http://example.com")
+    assert parsed.text == "http://example.com"
+    assert not parsed.has_filters
+    assert parse_query("").is_empty
+
+def test_plan_excludes_other_categories():
+    assert plan_category(parse_query("cat:links"), "Notes", {}) is None
+    assert plan_category(parse_query("cat:links"), "Links", {}) == []
+
+def test_plan_runs_cheap_steps_before_the_regex():
+    steps = plan_category(parse_query("re:/x/ size:<5 pinned:no text"), "A", {})
+    assert [step.name for step in steps] == ["pinned", "size", "text", "regex"]
+    assert steps[-1].cost == COST_REGEX
+
+def test_matcher_combines_every_filter():
+    cat_data = {"added_at": {"new abc": 1000.0, "old abc": 0.0}}
+    matcher = build_matcher(parse_query("abc since:1m pinned:no"), "A", cat_data, now=1030.0)
+    assert matcher("new abc", False)
+    assert not matcher("old abc", False)
+    assert not matcher("new abc", True)
+
+def test_matcher_without_text_when_text_is_ranked_elsewhere():
+    matcher = build_matcher(parse_query("zzz size:<=3"), "A", {}, include_text=False)
+    assert matcher("abc", False)
+    assert not matcher("abcd", False)
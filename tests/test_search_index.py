@@ -0,0 +1,48 @@
+# test_search_index.py
+"""Tests for the trigram history index (search_index.py)."""
+
+from search_index import HistorySearchIndex
+
+def make_index():
+    index = HistorySearchIndex()
+    index.rebuild({
+        "Links": {"history": ["https://github.com/foo", "https://example.com"], "pinned_history": ["GitHub docs"]},
+        "Notes": {"history": ["buy milk"], "pinned_history": []},
+    })
+    return index
+
+def test_candidates_are_narrowed_per_category():
+    index = make_index()
+    assert index.candidates("Links", "github") == {"https://github.com/foo", "GitHub docs"}
+    assert index.candidates("Notes", "github") == set()
+
+def test_short_query_cannot_narrow():
+    assert make_index().candidates("Links", "gi") is None
+
+def test_matcher_is_case_insensitive_and_verifies_candidates():
+    index = make_index()
+    matches = index.matcher("Links", "GITHUB.COM")
+    assert matches("https://github.com/foo")
+    assert not matches("GitHub docs")
+
+def test_filter_items_keeps_order_and_handles_short_queries():
+    index = make_index()
+    items = ["https://github.com/foo", "https://example.com"]
+    assert index.filter_items("Links", "https", items) == items
+    assert index.filter_items("Links", "ex", items) == ["https://example.com"]
+    assert index.filter_items("Links", "", items) == items
+
+def test_add_remove_and_move_keep_the_index_in_step():
+    index = make_index()
+    index.add("Notes", "github issue")
+    assert index.candidates("Notes", "github") == {"github issue"}
+    index.move("Notes", "Links", "github issue")
+    assert index.candidates("Notes", "github") == set()
+    assert "github issue" in index.candidates("Links", "github")
+    index.remove("Links", "github issue")
+    assert "github issue" not in index.candidates("Links", "github")
+
+def test_remove_category_drops_its_entries():
+    index = make_index()
+    index.remove_category("Links")
+    assert index.candidates("Links", "github") == set()
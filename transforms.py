@@ -0,0 +1,179 @@
+# transforms.py
+"""
+Per-category transforms applied to a clip after it is categorized and before it is stored.
+A category's "transforms" list holds specs such as "trim", "normalize_newlines",
+"strip_tracking", "redact_tokens" or "replace:PATTERN=>REPLACEMENT". Each list is compiled once
+into a TransformPipeline and reused until it changes. TransformRunner runs the pipelines on a
+small thread pool, so transforms never run on the Tk thread. Results come back in submission order.
+"""
+
+import collections
+import concurrent.futures
+import re
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from metrics import registry as metrics
+
+TRANSFORM_WORKERS = 2 # Threads running transform pipelines
+REPLACE_PREFIX = "replace:" # "replace:PATTERN=>REPLACEMENT", PATTERN being a regex
+REPLACE_SEPARATOR = "=>"
+REDACTED = "[REDACTED]"
+
+# --- Built-in Transforms ---
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_eid|mc_cid|igshid|yclid|_hsenc|_hsmi|ref_src)$", re.IGNORECASE)
+URL_PATTERN = re.compile(r"https?://[^\s<>\"']+")
+# Group 1 is kept (e.g. "Bearer "), the rest is replaced
+TOKEN_PATTERNS = [
+    re.compile(r"()\bAKIA[0-9A-Z]{16}\b"), # AWS access key id
+    re.compile(r"()\bgh[pousr]_[A-Za-z0-9]{36,}\b"), # GitHub tokens
+    re.compile(r"()\bxox[abprs]-[A-Za-z0-9-]{10,}\b"), # Slack tokens
+    re.compile(r"()\bsk-[A-Za-z0-9_-]{20,}\b"), # API secret keys
+    re.compile(r"()\beyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\b"), # JWTs
+    re.compile(r"(?i)(\bbearer\s+)[A-Za-z0-9._~+/-]{16,}=*"), # Authorization: Bearer ...
+    re.compile(r"(?i)(\b(?:password|passwd|secret|token|api_key|apikey)\s*[=:]\s*)[^\s&;]+"), # key=value secrets
+]
+
+def _trim(text):
+    return text.strip()
+
+def _normalize_newlines(text):
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+def _strip_url_tracking(match):
+    url = match.group(0)
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(key)]
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
+
+def _strip_tracking(text):
+    if "?" not in text:
+        return text
+    return URL_PATTERN.sub(_strip_url_tracking, text)
+
+def _redact_tokens(text):
+    for pattern in TOKEN_PATTERNS:
+        text = pattern.sub(lambda match: match.group(1) + REDACTED, text)
+    return text
+
+BUILTIN_TRANSFORMS = {
+    "trim": _trim,
+    "normalize_newlines": _normalize_newlines,
+    "strip_tracking": _strip_tracking,
+    "redact_tokens": _redact_tokens,
+}
+
+def compile_transform(spec):
+    """Returns (name, function) for one transform spec; raises ValueError for an unknown or invalid spec."""
+    if spec in BUILTIN_TRANSFORMS:
+        return spec, BUILTIN_TRANSFORMS[spec]
+    if spec.startswith(REPLACE_PREFIX) and REPLACE_SEPARATOR in spec:
+        pattern_text, replacement = spec[len(REPLACE_PREFIX):].split(REPLACE_SEPARATOR, 1)
+        try:
+            pattern = re.compile(pattern_text)
+        except re.error as e:
+            raise ValueError(f"Invalid regex in transform '{spec}': {e}")
+        return "replace", lambda text: pattern.sub(replacement, text)
+    raise ValueError(f"Unknown transform '{spec}'")
+
+class TransformPipeline:
+    """The compiled transforms of one category, applied in order."""
+
+    def __init__(self, specs):
+        self.steps = [] # (name, function)
+        for spec in specs:
+            try:
+                self.steps.append(compile_transform(spec))
+            except ValueError as e:
+                print(f"Warning: {e}. Skipping it.")
+
+    def apply(self, text):
+        """Runs every step, timing each one; a failing step leaves the text unchanged."""
+        for name, function in self.steps:
+            start_time = time.perf_counter()
+            try:
+                text = function(text)
+            except Exception as e:
+                metrics.inc("transform.errors")
+                print(f"Error in transform '{name}': {e}")
+            metrics.observe(f"transform.{name}_ms", (time.perf_counter() - start_time) * 1000)
+        return text
+
+# --- Runner ---
+class TransformRunner:
+    """Runs category pipelines on a thread pool and hands results back in submission order."""
+
+    def __init__(self, categories, on_ready=None, workers=TRANSFORM_WORKERS):
+        """`categories` is read for each category's "transforms"; `on_ready()` is called (from a pool
+        thread, or the submitting one when there was nothing to transform) whenever drain_ready() may
+        have results."""
+        self.categories = categories
+        self.on_ready = on_ready
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transform")
+        self._pipelines = {} # {category: (specs tuple, TransformPipeline)}
+        self._pending = collections.deque() # (category, original, future, selection), oldest first
+        self._lock = threading.Lock()
+
+    def pipeline_for(self, category_name):
+        """Returns the category's compiled pipeline, compiling it again only if its specs changed."""
+        specs = tuple(self.categories.get(category_name, {}).get("transforms", []) or ())
+        with self._lock:
+            cached = self._pipelines.get(category_name)
+            if cached is None or cached[0] != specs:
+                cached = (specs, TransformPipeline(specs))
+                self._pipelines[category_name] = cached
+        return cached[1]
+
+    def _run(self, pipeline, text, submitted_at):
+        metrics.observe("transform.queue_ms", (time.perf_counter() - submitted_at) * 1000)
+        with metrics.timer("transform.total_ms"):
+            return pipeline.apply(text)
+
+    def submit(self, category_name, content, selection=None):
+        """Queues a clip; its result is returned by drain_ready() once it and every earlier clip are done.
+        `selection` (the selection the clip came from, if any) is handed back with it."""
+        pipeline = self.pipeline_for(category_name)
+        future = concurrent.futures.Future()
+        if pipeline.steps:
+            future = self.executor.submit(self._run, pipeline, content, time.perf_counter())
+        else:
+            future.set_result(content) # Nothing to do; still queued so the order is kept
+        with self._lock:
+            self._pending.append((category_name, content, future, selection))
+        if self.on_ready:
+            future.add_done_callback(lambda _: self.on_ready())
+
+    def drain_ready(self):
+        """Returns [(category, original, transformed, selection)] for finished clips at the head of the queue."""
+        ready = []
+        with self._lock:
+            while self._pending and self._pending[0][2].done():
+                category_name, content, future, selection = self._pending.popleft()
+                ready.append((category_name, content, future.result(), selection))
+        return ready
+
+    def transform_many(self, items):
+        """Transforms [(category, text)] on the pool and waits; for bulk imports, not the Tk thread."""
+        submitted_at = time.perf_counter()
+        results = []
+        for category_name, text in items:
+            pipeline = self.pipeline_for(category_name)
+            results.append(self.executor.submit(self._run, pipeline, text, submitted_at) if pipeline.steps else text)
+        return [result.result() if isinstance(result, concurrent.futures.Future) else result for result in results]
+
+    def shutdown(self, wait=False):
+        """Stops the pool; queued clips are still finished, before returning if `wait` is set."""
+        self.executor.shutdown(wait=wait)
+
+def finish_transform(content, transformed, category_name):
+    """Records the transform stage of a tracked clip; returns the text to store, or None if the
+    transforms left nothing (e.g. a whitespace-only clip after "trim")."""
+    metrics.ingest_stage(content, "transformed", category_name)
+    metrics.ingest_rekey(content, transformed)
+    if not isinstance(transformed, str) or not transformed.strip():
+        metrics.inc("transform.dropped")
+        return None
+    return transformed
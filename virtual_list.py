@@ -0,0 +1,294 @@
+# virtual_list.py
+"""
+Virtualized history list for CustomTkinter.
+Only the rows that are visible (plus a small overscan) get widgets. Row widgets are kept in
+a fixed pool and rebound to different history items as the user scrolls, so rendering cost
+stays the same no matter how long the history is. Updates are reconciled by item key: rows
+whose item stays in view keep their widget and are only moved or restyled if needed.
+"""
+
+import math
+import customtkinter as ctk
+from chunked_renderer import ChunkedRenderer
+
+ROW_HEIGHT = 34 # Fixed pixel height of a history row
+OVERSCAN_ROWS = 2 # Extra rows kept bound below the visible area
+WHEEL_SCROLL_ROWS = 3 # Rows scrolled per mouse wheel notch
+DISPLAY_MAX_LEN = 55 # Max characters shown per row (checkbox and 3 buttons share the width)
+ROW_BUTTON_WIDTH = 45
+
+def format_display_text(item_text, is_pinned, versions=1):
+    """Returns the single-line, truncated text shown for a history item."""
+    display_text = item_text.replace('\n', ' ').strip()
+    if len(display_text) > DISPLAY_MAX_LEN: display_text = display_text[:DISPLAY_MAX_LEN-3] + "..."
+    if is_pinned:
+        display_text = f"📌 {display_text}"
+    if versions > 1:
+        display_text = f"{display_text} (×{versions})" # Near duplicates collapsed into this item
+    return display_text
+
+class HistoryRow:
+    """A reusable row widget (checkbox, label, Pin/Copy/X buttons) bound to one item at a time."""
+
+    def __init__(self, history_list):
+        """Creates the row's widgets and event bindings once; they are reused for every item it shows."""
+        self.history_list = history_list
+        self.item = None
+        self.is_pinned = False
+        self.versions = 1
+        self.selected = False
+        self.y = None # Current place() offset, None while hidden
+
+        self.frame = ctk.CTkFrame(history_list.viewport, height=ROW_HEIGHT, fg_color="transparent", corner_radius=3)
+        self.frame.grid_propagate(False) # Keep the fixed row height
+        self.frame.grid_rowconfigure(0, weight=1)
+        # Configure columns: Checkbox, Label (stretches), Pin, Copy, Delete
+        self.frame.grid_columnconfigure(0, weight=0)
+        self.frame.grid_columnconfigure(1, weight=1)
+        self.frame.grid_columnconfigure((2, 3, 4), weight=0)
+
+        self.checkbox_var = ctk.StringVar(value="off")
+        self.checkbox = ctk.CTkCheckBox(self.frame, text="", variable=self.checkbox_var, onvalue="on", offvalue="off",
+                                        width=0, command=self._on_toggle)
+        self.checkbox.grid(row=0, column=0, sticky="w", padx=(5, 5))
+
+        self.label = ctk.CTkLabel(self.frame, text="", anchor="w")
+        self.label.grid(row=0, column=1, sticky="ew", padx=(0, 5))
+
+        self.pin_button = ctk.CTkButton(self.frame, text="Pin", width=ROW_BUTTON_WIDTH, command=self._on_pin)
+        self.pin_button.grid(row=0, column=2, sticky="e", padx=(0, 5))
+        self.copy_button = ctk.CTkButton(self.frame, text="Copy", width=ROW_BUTTON_WIDTH, command=self._on_copy)
+        self.copy_button.grid(row=0, column=3, sticky="e", padx=(0, 5))
+        self.delete_button = ctk.CTkButton(self.frame, text="X", width=25, fg_color="red", hover_color="darkred",
+                                           command=self._on_delete)
+        self.delete_button.grid(row=0, column=4, sticky="e", padx=(0, 5))
+
+        # Drag and drop bindings on the frame and label, as events might trigger on either
+        for widget in (self.frame, self.label):
+            widget.bind("<ButtonPress-1>", self._on_press)
+            widget.bind("<B1-Motion>", history_list.on_drag_motion)
+            widget.bind("<ButtonRelease-1>", history_list.on_drag_drop)
+        for widget in (self.frame, self.checkbox, self.label, self.pin_button, self.copy_button, self.delete_button):
+            history_list.bind_wheel(widget)
+
+    def bind_item(self, item, is_pinned, selected, versions=1):
+        """Points the row at an item, reconfiguring only what differs from what it shows now.
+        Returns True if any widget had to be reconfigured."""
+        changed = False
+        if item != self.item or is_pinned != self.is_pinned or versions != self.versions:
+            self.label.configure(text=format_display_text(str(item), is_pinned, versions))
+            changed = True
+        if is_pinned != self.is_pinned or self.item is None:
+            self.pin_button.configure(text="Unpin" if is_pinned else "Pin")
+            changed = True
+        if selected != self.selected or self.item is None:
+            self.frame.configure(fg_color=self.history_list.selected_color if selected else "transparent")
+            self.checkbox_var.set("on" if selected else "off")
+            changed = True
+        self.item = item
+        self.is_pinned = is_pinned
+        self.versions = versions
+        self.selected = selected
+        return changed
+
+    def move_to(self, y):
+        """Places the row at a vertical offset. Returns True if it actually moved."""
+        if y == self.y:
+            return False
+        self.frame.place(x=0, y=y, relwidth=1.0)
+        self.y = y
+        return True
+
+    def unbind_item(self):
+        """Hides the row; it keeps its widgets for the next item it is bound to."""
+        self.frame.place_forget()
+        self.item = None
+        self.y = None
+
+    # --- Event Forwarding ---
+    def _on_toggle(self):
+        if self.item is not None: self.history_list.on_toggle(self.item)
+
+    def _on_pin(self):
+        if self.item is None: return
+        if self.is_pinned:
+            self.history_list.on_unpin(self.item)
+        else:
+            self.history_list.on_pin(self.item)
+
+    def _on_copy(self):
+        if self.item is not None: self.history_list.on_copy(self.item)
+
+    def _on_delete(self):
+        if self.item is not None: self.history_list.on_delete(self.item)
+
+    def _on_press(self, event):
+        if self.item is not None: self.history_list.on_drag_start(event, self.item, self.frame)
+
+class VirtualHistoryList(ctk.CTkFrame):
+    """Scrollable list of (item, is_pinned) rows that only builds widgets for the visible window."""
+
+    def __init__(self, master, label_text="", is_selected=None, on_toggle=None, on_pin=None, on_unpin=None,
+                 on_copy=None, on_delete=None, on_drag_start=None, on_drag_motion=None, on_drag_drop=None,
+                 version_count=None, **kwargs):
+        """Creates the header, viewport and scrollbar. Callbacks receive the bound item text;
+        `version_count(item)` returns how many near duplicates an item stands for."""
+        super().__init__(master, **kwargs)
+        self.is_selected = is_selected or (lambda item: False)
+        self.version_count = version_count or (lambda item: 1)
+        self.on_toggle = on_toggle
+        self.on_pin = on_pin
+        self.on_unpin = on_unpin
+        self.on_copy = on_copy
+        self.on_delete = on_delete
+        self.on_drag_start = on_drag_start
+        self.on_drag_motion = on_drag_motion
+        self.on_drag_drop = on_drag_drop
+        self.selected_color = ctk.ThemeManager.theme["CTkButton"]["fg_color"][0]
+
+        self.rows = [] # [(item, is_pinned)] in display order
+        self.pool = [] # Every HistoryRow widget ever created for this list
+        self.bound_rows = {} # {item: HistoryRow} for items currently in the window
+        self.free_rows = [] # Pool rows not bound to any item
+        self.last_reconcile = {"inserted": 0, "moved": 0, "restyled": 0, "removed": 0}
+        self.scroll_y = 0 # Pixel offset of the viewport into the full list
+        self.viewport_height = 0
+        self.renderer = ChunkedRenderer(self) # Builds overscan rows in time slices
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+        if label_text:
+            ctk.CTkLabel(self, text=label_text).grid(row=0, column=0, columnspan=2, padx=5, pady=(5, 0), sticky="ew")
+
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.grid(row=1, column=0, padx=(5, 0), pady=5, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, orientation="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, padx=(0, 5), pady=5, sticky="ns")
+        self.empty_label = ctk.CTkLabel(self.viewport, text="", text_color="gray")
+
+        self.viewport.bind("<Configure>", self._on_viewport_configure)
+        self.bind_wheel(self.viewport)
+
+    # --- Data ---
+    def set_rows(self, rows, empty_text="(History is empty)"):
+        """Replaces the displayed rows. Only the visible window is (re)bound."""
+        self.rows = list(rows)
+        self.empty_label.configure(text=empty_text)
+        self._clamp_scroll()
+        self._layout()
+
+    def append_rows(self, rows):
+        """Appends rows to the end of the list, e.g. streamed search results."""
+        self.rows.extend(rows)
+        self._layout()
+
+    def refresh(self):
+        """Re-applies the current selection state to the visible rows."""
+        self._layout()
+
+    # --- Scrolling ---
+    def bind_wheel(self, widget):
+        """Routes mouse wheel events over a widget to this list."""
+        widget.bind("<MouseWheel>", self._on_mouse_wheel) # Windows / macOS
+        widget.bind("<Button-4>", lambda event: self.scroll_by(-WHEEL_SCROLL_ROWS * ROW_HEIGHT)) # Linux up
+        widget.bind("<Button-5>", lambda event: self.scroll_by(WHEEL_SCROLL_ROWS * ROW_HEIGHT)) # Linux down
+
+    def scroll_by(self, pixels):
+        """Scrolls the list by a number of pixels."""
+        self.scroll_y += pixels
+        self._clamp_scroll()
+        self._layout()
+
+    def _on_mouse_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS reports small deltas
+        notches = event.delta / 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_by(int(-notches * WHEEL_SCROLL_ROWS * ROW_HEIGHT))
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        """Handles the scrollbar's 'moveto' and 'scroll' commands."""
+        if action == "moveto":
+            self.scroll_y = int(float(amount) * self._total_height())
+        elif action == "scroll":
+            step = self.viewport_height if unit == "pages" else ROW_HEIGHT
+            self.scroll_y += int(float(amount) * step)
+        self._clamp_scroll()
+        self._layout()
+
+    def _total_height(self):
+        return len(self.rows) * ROW_HEIGHT
+
+    def _clamp_scroll(self):
+        max_scroll = max(0, self._total_height() - self.viewport_height)
+        self.scroll_y = min(max(0, self.scroll_y), max_scroll)
+
+    def _on_viewport_configure(self, event):
+        """Grows the row pool to cover the new viewport height."""
+        # Configure reports real pixels, while CTk scales the row heights and place() offsets we pass
+        height = int(event.height / self.viewport._get_widget_scaling())
+        if height == self.viewport_height:
+            return
+        self.viewport_height = height
+        self._clamp_scroll()
+        self.ensure_pool()
+
+    def ensure_pool(self):
+        """Grows the row pool to cover the viewport. Rows for the visible area are built right away,
+        the overscan rows in time slices afterwards."""
+        visible_rows = math.ceil(self.viewport_height / ROW_HEIGHT) + 1
+        missing = visible_rows + OVERSCAN_ROWS - len(self.pool)
+        if missing > 0:
+            self.renderer.render("pool", range(missing), lambda _, index: self._add_pool_row(),
+                                 first_count=max(0, visible_rows - len(self.pool)), on_done=self._layout)
+        self._layout()
+
+    def cancel_pending_render(self):
+        """Stops building overscan rows, e.g. when the list's tab is hidden. ensure_pool() resumes it."""
+        self.renderer.cancel("pool")
+
+    def _add_pool_row(self):
+        row = HistoryRow(self)
+        self.pool.append(row)
+        self.free_rows.append(row)
+
+    # --- Layout ---
+    def _layout(self):
+        """Reconciles the pool rows with the items in the current scroll window.
+        Rows keep their widget while their item stays in view; only items entering the window
+        take a free row, and only rows whose position or state changed are touched."""
+        stats = {"inserted": 0, "moved": 0, "restyled": 0, "removed": 0}
+        first_index = self.scroll_y // ROW_HEIGHT
+        pixel_shift = self.scroll_y % ROW_HEIGHT
+        window = self.rows[first_index:first_index + len(self.pool)]
+        wanted_items = {item for item, _ in window}
+
+        # Release rows whose item was removed or scrolled out of the window
+        for item in [item for item in self.bound_rows if item not in wanted_items]:
+            row = self.bound_rows.pop(item)
+            row.unbind_item()
+            self.free_rows.append(row)
+            stats["removed"] += 1
+
+        for offset, (item, is_pinned) in enumerate(window):
+            row = self.bound_rows.get(item)
+            if row is None:
+                if not self.free_rows:
+                    break # Safety net, the window never holds more items than the pool
+                row = self.free_rows.pop()
+                self.bound_rows[item] = row
+                row.bind_item(item, is_pinned, self.is_selected(item), self.version_count(item))
+                row.move_to(offset * ROW_HEIGHT - pixel_shift)
+                stats["inserted"] += 1
+                continue
+            if row.bind_item(item, is_pinned, self.is_selected(item), self.version_count(item)):
+                stats["restyled"] += 1
+            if row.move_to(offset * ROW_HEIGHT - pixel_shift):
+                stats["moved"] += 1
+        self.last_reconcile = stats
+
+        if not self.rows:
+            self.empty_label.place(x=5, y=5)
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.empty_label.place_forget()
+        total_height = self._total_height()
+        self.scrollbar.set(self.scroll_y / total_height, min(1.0, (self.scroll_y + self.viewport_height) / total_height))